@@ -3,10 +3,43 @@ import azure.functions as func
 from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 from datetime import datetime, timedelta, timezone
 import os
+import time
 import requests
 
 app = func.FunctionApp()
 
+# 変換サーバーが混雑時に返すステータス（Retry-After 付き）
+CONVERTER_BUSY_STATUSES = (429, 503)
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class ConverterBusyError(Exception):
+    """変換サーバーが混雑していて受け付けられなかった"""
+
+
+def post_to_converter(flask_endpoint: str, sas_url: str) -> requests.Response:
+    """
+    変換サーバーに blob_url を送信する（429 / 503 の場合は Retry-After だけ待って再送）
+
+    環境変数:
+        CONVERTER_MAX_ATTEMPTS: 送信回数の上限（既定 3）。上限に達した場合は ConverterBusyError
+    """
+    max_attempts = max(1, int(os.environ.get("CONVERTER_MAX_ATTEMPTS", "3")))
+    for attempt in range(1, max_attempts + 1):
+        response = requests.post(flask_endpoint, json={"blob_url": sas_url}, timeout=60)
+        if response.status_code not in CONVERTER_BUSY_STATUSES:
+            return response
+
+        try:
+            retry_after = int(response.headers.get("Retry-After", "30"))
+        except ValueError:
+            retry_after = 30
+        logging.warning(f"⏳ 変換サーバー混雑 ({response.status_code}) attempt={attempt}/{max_attempts}, Retry-After={retry_after}s")
+        if attempt < max_attempts:
+            time.sleep(min(max(1, retry_after), MAX_RETRY_AFTER_SECONDS))
+
+    raise ConverterBusyError(f"変換サーバーが混雑しています (status={response.status_code})")
+
 @app.function_name(name="HandleAudioUploadEvent")
 @app.event_grid_trigger(arg_name="event")
 def handle_audio_upload_event(event: func.EventGridEvent):
@@ -47,8 +80,12 @@ def handle_audio_upload_event(event: func.EventGridEvent):
         logging.info(f"🔑 SAS URL 生成成功")
 
         # Flask API に送信
-        response = requests.post(flask_endpoint, json={"blob_url": sas_url}, timeout=60)
+        response = post_to_converter(flask_endpoint, sas_url)
         logging.info(f"📤 Flask POST レスポンス: {response.status_code} - {response.text}")
 
+    except ConverterBusyError:
+        # 例外で終了して Event Grid の再配信に任せる（SAS URL は再配信時に作り直す）
+        logging.exception("❌ HandleAudioUploadEvent 変換サーバー混雑")
+        raise
     except Exception as e:
         logging.exception("❌ HandleAudioUploadEvent エラー")
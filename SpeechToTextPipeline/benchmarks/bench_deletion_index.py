@@ -0,0 +1,187 @@
+"""
+削除候補の除去（DeletionIndex）の出力一致確認とベンチマーク
+
+1. golden/deletion_index.json の固定ケース（記号・全角空白・連続出現など）で remove の出力を確認する
+2. 乱数で生成した文字列で、正規表現による基準実装 remove_delete_candidate と出力を比較する
+3. 合成データのステップ4出力のハッシュを golden ファイルと比較し、処理時間を表示する
+
+golden ファイルは基準実装（正規表現）で生成する。基準実装の仕様を変えたときのみ --update-golden で更新すること。
+同じ確認は tests/test_deletion_index.py（pytest）でも行う。
+
+merge_floor_s は除去を行わない（何もしない除去関数の）ステップ4の時間で、除去をどれだけ速くしても
+ステップ4全体はこれより速くならない。ステップ4の時間の大半はブロック結合のため、全体の差は数割に留まる。
+
+使用例:
+    cd SpeechToTextPipeline
+    python benchmarks/bench_deletion_index.py
+    python benchmarks/bench_deletion_index.py --segments 50000 --repeat 5
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pipeline_processing.deletion_index import DeletionIndex  # noqa: E402
+from pipeline_processing.merge_engine import merge_speaker_blocks, remove_delete_candidate  # noqa: E402
+from benchmarks.synthetic_transcripts import generate_processing_records  # noqa: E402
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "golden" / "deletion_index.json"
+GOLDEN_SEEDS = [0, 1, 2, 3, 4]
+GOLDEN_SEGMENTS = 2000
+
+# remove の固定ケース（expected は golden ファイル側に保存する）
+REMOVE_CASES = [
+    ("承知しました。来週までに見積もりをお送りします。", "承知しました。"),
+    ("承知しました。。来週までに", "承知しました"),
+    ("承知しました \u3000\t来週までに", "承知しました"),
+    ("来週まで。承知しました。 承知しました。承知", "承知しました。"),
+    ("あああ。ああ", "ああ"),
+    ("価格は(1+2)*3です。[要確認]", "(1+2)*3"),
+    ("価格は.*です。", ".*"),
+    ("末尾の文。", "末尾の文。"),
+    ("一致しない文です。", "別の文。"),
+    ("", "何か。"),
+    ("  前後に空白。  ", "  前後に空白。  "),
+    ("改行の前\n\n改行の後", "改行の前"),
+    ("ノーブレーク\u00a0空白\u2003全角\u3000後", "ノーブレーク"),
+    ("。。。", "。"),
+]
+
+FUZZ_ALPHABET = ["あ", "い", "。", " ", "\u3000", "\u00a0", "\n", "(", ".", "*", "承知"]
+
+
+def merge_digest(rows: list) -> str:
+    payload = json.dumps(
+        [(r["line_no"], r["speaker"], r["merged_text"], r["offset_seconds"]) for r in rows],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_golden() -> dict:
+    """基準実装（正規表現）で golden を生成する"""
+    return {
+        "remove_cases": [
+            {"text": text, "word": word, "expected": remove_delete_candidate(text, word)}
+            for text, word in REMOVE_CASES
+        ],
+        "merge": [
+            {
+                "seed": seed,
+                "segments": GOLDEN_SEGMENTS,
+                "sha256": merge_digest(merge_speaker_blocks(
+                    generate_processing_records(GOLDEN_SEGMENTS, seed=seed), remove_delete_candidate
+                )),
+            }
+            for seed in GOLDEN_SEEDS
+        ],
+    }
+
+
+def check_golden(golden: dict) -> list:
+    """golden と一致しない項目の説明のリストを返す"""
+    failures = []
+    index = DeletionIndex()
+    for case in golden["remove_cases"]:
+        actual = index.remove(case["text"], case["word"])
+        if actual != case["expected"]:
+            failures.append(f"remove({case['text']!r}, {case['word']!r}) = {actual!r}, expected {case['expected']!r}")
+
+    for case in golden["merge"]:
+        records = generate_processing_records(case["segments"], seed=case["seed"])
+        actual = merge_digest(merge_speaker_blocks(records))
+        if actual != case["sha256"]:
+            failures.append(f"merge seed={case['seed']} segments={case['segments']}: sha256 が一致しません")
+    return failures
+
+
+def check_fuzz(iterations: int, seed: int) -> list:
+    """ランダムな文字列で基準実装と比較する"""
+    rng = random.Random(seed)
+    index = DeletionIndex()
+    failures = []
+    for _ in range(iterations):
+        text = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 24)))
+        word = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(1, 4)))
+        if not word.strip():
+            continue
+        expected = remove_delete_candidate(text, word)
+        actual = index.remove(text, word)
+        if actual != expected:
+            failures.append(f"fuzz: remove({text!r}, {word!r}) = {actual!r}, expected {expected!r}")
+            if len(failures) >= 10:
+                break
+    return failures
+
+
+def deletion_pairs(records: list) -> list:
+    """ステップ4で除去が行われる (text, delete_candidate_word) の組（非フィラー行の本文 × 全削除候補の一部）"""
+    words = [r["delete_candidate_word"] for r in records if r["delete_candidate_word"]]
+    texts = [r["transcript_text_segment"] for r in records if not r["is_filler"]]
+    return [(texts[i % len(texts)], word) for i, word in enumerate(words)]
+
+
+def keep_text(text: str, delete_candidate_word: str) -> str:
+    """除去を行わない除去関数（ステップ4の下限の計測用）"""
+    return text
+
+
+def best_of(repeat: int, func) -> float:
+    func()  # ウォームアップ（計測順による差をなくす）
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="削除候補の除去（DeletionIndex）の出力一致確認とベンチマーク")
+    parser.add_argument("--segments", type=int, action="append", help="ベンチマークのセグメント数（複数指定可、既定 10000）")
+    parser.add_argument("--repeat", type=int, default=7, help="計測回数（最良値を表示）")
+    parser.add_argument("--fuzz", type=int, default=20000, help="乱数比較の回数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--update-golden", action="store_true", help="基準実装で golden ファイルを再生成する")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        GOLDEN_PATH.write_text(json.dumps(build_golden(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✅ golden を更新しました: {GOLDEN_PATH}")
+        return
+
+    golden = json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+    failures = check_golden(golden) + check_fuzz(args.fuzz, args.seed)
+    for failure in failures:
+        print(f"❌ {failure}")
+    print(f"golden: remove {len(golden['remove_cases'])} 件 / merge {len(golden['merge'])} 件, fuzz: {args.fuzz} 件")
+
+    print("segments\tremovals\tremove_regex_s\tremove_index_s\tmerge_regex_s\tmerge_index_s\tmerge_floor_s\tmerge_speedup")
+    for segment_count in args.segments or [10000]:
+        records = generate_processing_records(segment_count, seed=args.seed)
+        pairs = deletion_pairs(records)
+        index = DeletionIndex()
+        remove_regex_seconds = best_of(args.repeat, lambda: [remove_delete_candidate(t, w) for t, w in pairs])
+        remove_index_seconds = best_of(args.repeat, lambda: [index.remove(t, w) for t, w in pairs])
+        merge_regex_seconds = best_of(args.repeat, lambda: merge_speaker_blocks(records, remove_delete_candidate))
+        merge_index_seconds = best_of(args.repeat, lambda: merge_speaker_blocks(records))
+        merge_floor_seconds = best_of(args.repeat, lambda: merge_speaker_blocks(records, keep_text))
+        print("\t".join([
+            str(segment_count), str(len(pairs)),
+            f"{remove_regex_seconds:.4f}", f"{remove_index_seconds:.4f}",
+            f"{merge_regex_seconds:.4f}", f"{merge_index_seconds:.4f}", f"{merge_floor_seconds:.4f}",
+            f"{merge_regex_seconds / merge_index_seconds:.2f}x",
+        ]))
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
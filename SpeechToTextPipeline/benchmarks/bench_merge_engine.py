@@ -0,0 +1,105 @@
+"""
+ステップ4（話者ブロック統合）のベンチマーク
+
+旧実装（行ごとの SELECT is_filler + ブロックごとの BETWEEN 再取得、sqlite 上で実行）と
+merge_engine（メモリ上の1パス）を同じ合成データで実行し、処理時間・クエリ数・出力一致を表示する。
+
+使用例:
+    cd SpeechToTextPipeline
+    python benchmarks/bench_merge_engine.py --segments 10000 --segments 50000
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pipeline_processing.merge_engine import merge_speaker_blocks  # noqa: E402
+from benchmarks.legacy_step4 import create_sqlite_fixture, legacy_merge_speaker_blocks  # noqa: E402
+from benchmarks.synthetic_transcripts import generate_processing_records  # noqa: E402
+
+MEETING_ID = 1
+
+
+class CountingCursor:
+    """execute の回数を数える sqlite cursor ラッパー"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.queries = 0
+
+    def execute(self, *args):
+        self.queries += 1
+        return self._cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def format_optional(value, fmt: str) -> str:
+    return "-" if value is None else fmt.format(value)
+
+
+def comparable(rows: list) -> list:
+    return [(r["line_no"], r["speaker"], r["merged_text"], r["offset_seconds"]) for r in rows]
+
+
+def run(segment_count: int, seed: int, skip_legacy: bool) -> dict:
+    records = generate_processing_records(segment_count, seed=seed)
+
+    started = time.perf_counter()
+    engine_rows = merge_speaker_blocks(records)
+    engine_seconds = time.perf_counter() - started
+
+    result = {
+        "segments": segment_count,
+        "blocks": len(engine_rows),
+        "engine_seconds": engine_seconds,
+        "legacy_seconds": None,
+        "legacy_queries": None,
+        "identical": None,
+    }
+    if skip_legacy:
+        return result
+
+    conn = create_sqlite_fixture(MEETING_ID, records)
+    cursor = CountingCursor(conn.cursor())
+    started = time.perf_counter()
+    legacy_rows = legacy_merge_speaker_blocks(cursor, MEETING_ID)
+    result["legacy_seconds"] = time.perf_counter() - started
+    result["legacy_queries"] = cursor.queries
+    result["identical"] = comparable(legacy_rows) == comparable(engine_rows)
+    conn.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ステップ4（話者ブロック統合）のベンチマーク")
+    parser.add_argument("--segments", type=int, action="append", help="セグメント数（複数指定可、既定 1000 / 10000）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-legacy", action="store_true", help="旧実装を実行しない")
+    args = parser.parse_args()
+
+    # 旧実装の行ごとの INFO ログは出力しない（ログ文字列の生成コストは計測に含まれる）
+    logging.basicConfig(level=logging.WARNING)
+
+    print("segments\tblocks\tengine_s\tlegacy_s\tlegacy_queries\tspeedup\tidentical")
+    mismatched = False
+    for segment_count in args.segments or [1000, 10000]:
+        r = run(segment_count, args.seed, args.skip_legacy)
+        speedup = r["legacy_seconds"] / r["engine_seconds"] if r["legacy_seconds"] and r["engine_seconds"] else None
+        print("\t".join([
+            str(r["segments"]), str(r["blocks"]), f"{r['engine_seconds']:.4f}",
+            format_optional(r["legacy_seconds"], "{:.4f}"), format_optional(r["legacy_queries"], "{}"),
+            format_optional(speedup, "{:.1f}x"), format_optional(r["identical"], "{}"),
+        ]))
+        mismatched = mismatched or r["identical"] is False
+
+    if mismatched:
+        print("❌ 旧実装と出力が一致しません")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+パイプラインのメモリ上の処理のベンチマーク（基準値との比較つき）
+
+5分〜3時間の合成文字起こし（benchmarks/synthetic_transcripts.py）に対して、各ステージの処理を
+DB のスタンドイン（インメモリ sqlite）と LLM のスタンドイン（tools/mock_openai_server.py）で実行し、
+処理時間・メモリ確保量（tracemalloc のピーク）・クエリ数・LLM 呼び出し数を表示する。
+
+| ケース | 内容 |
+|--------|------|
+| step1_parse | step1_process_transcript（文字起こし結果の分解） |
+| step4_merge | TranscriptProcessingSegments の取得 → merge_speaker_blocks → 一括登録 |
+| offset_parse | extract_offset_from_line（旧ステップ7の行整形・offset 解析） |
+| summary_blocks_fixed / summary_blocks_adaptive | ステップ7のブロック分割 |
+| summary_titles | ブロックごとの generate_summary_title（モックサーバー）と ConversationSummaries への登録 |
+
+件数（items・queries・llm_calls）は基準値と完全一致、時間・メモリは基準値の (1 + 許容率) 倍以内であることを確認し、
+外れた場合は終了コード 1。基準値は benchmarks/golden/pipeline_suite_baseline.json（--update-baseline で更新）。
+基準値にないケースは status=new と表示する。時間は実行環境に依存するため、基準値は比較に使う環境で更新すること。
+
+openai パッケージがない環境では openai_processing を使うケースを skipped として扱う（--update-baseline はエラー）。
+
+使用例:
+    cd SpeechToTextPipeline
+    python benchmarks/bench_pipeline_suite.py
+    python benchmarks/bench_pipeline_suite.py --durations 300,10800 --filler-ratio 0.3 --speakers 4 --no-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pipeline_processing.block_segmentation import build_adaptive_blocks  # noqa: E402
+from pipeline_processing.merge_engine import SEGMENT_KEYS, merge_speaker_blocks  # noqa: E402
+from pipeline_processing.summary_blocks import (  # noqa: E402
+    build_time_blocks, render_block_text, summary_segment_row, to_summary_segments
+)
+from benchmarks.bench_merge_engine import CountingCursor  # noqa: E402
+from benchmarks.legacy_step4 import create_sqlite_fixture  # noqa: E402
+from benchmarks.synthetic_transcripts import generate_transcript_text, records_from_step1  # noqa: E402
+from tools.mock_openai_server import start_mock_server  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "golden" / "pipeline_suite_baseline.json"
+DEFAULT_DURATIONS = [300, 1800, 3600, 10800]
+COUNT_KEYS = ["items", "queries", "llm_calls"]
+MEETING_ID = 1
+# これより短い時間は計測誤差が大きいため基準値と比較しない
+MIN_COMPARABLE_SECONDS = 0.005
+CHECKPOINT_BATCH_SIZE = 10
+
+
+def start_llm_stand_in():
+    """モックサーバーを起動し、openai_processing がそこへ接続するよう環境変数を設定する"""
+    server, state = start_mock_server(latency="fixed:0")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "dummy")
+    return server, state
+
+
+def import_openai_processing():
+    """openai_processing を読み込む（openai 未導入の場合は None）"""
+    try:
+        import openai_processing
+    except ImportError as e:
+        logging.warning(f"openai_processing を読み込めないため一部のケースをスキップします: {e}")
+        return None
+    return openai_processing
+
+
+def create_summary_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE dbo.ConversationSummaries (
+            meeting_id INTEGER, speaker INTEGER, content TEXT, offset_seconds REAL, is_summary INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE dbo.ProcessedTranscriptSegments (
+            meeting_id INTEGER, line_no INTEGER, speaker INTEGER, merged_text TEXT, offset_seconds REAL
+        )
+    """)
+
+
+def case_step1_parse(ctx):
+    segments = ctx["openai_processing"].step1_process_transcript(ctx["transcript_text"])
+    return {"items": len(segments or []), "queries": 0}
+
+
+def case_step4_merge(ctx):
+    cursor = CountingCursor(ctx["conn"].cursor())
+    cursor.execute(f"""
+        SELECT {", ".join(SEGMENT_KEYS)} FROM dbo.TranscriptProcessingSegments
+        WHERE meeting_id = ? ORDER BY line_no
+    """, (MEETING_ID,))
+    records = [dict(zip(SEGMENT_KEYS, row)) for row in cursor.fetchall()]
+    blocks = merge_speaker_blocks(records)
+    cursor.execute("DELETE FROM dbo.ProcessedTranscriptSegments WHERE meeting_id = ?", (MEETING_ID,))
+    cursor.executemany("""
+        INSERT INTO dbo.ProcessedTranscriptSegments (meeting_id, line_no, speaker, merged_text, offset_seconds)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(MEETING_ID, b["line_no"], b["speaker"], b["merged_text"], b["offset_seconds"]) for b in blocks])
+    # executemany も1往復として数える
+    cursor.queries += 1
+    return {"items": len(blocks), "queries": cursor.queries}
+
+
+def case_offset_parse(ctx):
+    extract_offset_from_line = ctx["openai_processing"].extract_offset_from_line
+    parsed = 0
+    for segment in ctx["summary_segments"]:
+        _, offset = extract_offset_from_line(segment.render_line())
+        if offset is not None:
+            parsed += 1
+    return {"items": parsed, "queries": 0}
+
+
+def case_summary_blocks_fixed(ctx):
+    return {"items": len(build_time_blocks(ctx["summary_segments"])), "queries": 0}
+
+
+def case_summary_blocks_adaptive(ctx):
+    return {"items": len(build_adaptive_blocks(ctx["summary_segments"])), "queries": 0}
+
+
+def case_summary_titles(ctx):
+    generate_summary_title = ctx["openai_processing"].generate_summary_title
+    cursor = CountingCursor(ctx["conn"].cursor())
+    cursor.execute("DELETE FROM dbo.ConversationSummaries WHERE meeting_id = ?", (MEETING_ID,))
+    blocks = build_time_blocks(ctx["summary_segments"])
+    pending_rows = []
+
+    def flush():
+        if pending_rows:
+            cursor.executemany("""
+                INSERT INTO dbo.ConversationSummaries (meeting_id, speaker, content, offset_seconds, is_summary)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(MEETING_ID, *row) for row in pending_rows])
+            cursor.queries += 1
+            pending_rows.clear()
+
+    for i, block in enumerate(blocks):
+        title = generate_summary_title(render_block_text(block["segments"]), i, len(blocks))
+        pending_rows.append((0, title, block["start_offset"], 1))
+        pending_rows.extend(summary_segment_row(segment) for segment in block["segments"])
+        if (i + 1) % CHECKPOINT_BATCH_SIZE == 0:
+            flush()
+    flush()
+    return {"items": len(blocks), "queries": cursor.queries}
+
+
+# (ケース名, 関数, openai_processing が必要か)
+CASES = [
+    ("step1_parse", case_step1_parse, True),
+    ("step4_merge", case_step4_merge, False),
+    ("offset_parse", case_offset_parse, True),
+    ("summary_blocks_fixed", case_summary_blocks_fixed, False),
+    ("summary_blocks_adaptive", case_summary_blocks_adaptive, False),
+    ("summary_titles", case_summary_titles, True),
+]
+
+
+def build_context(duration: int, args, openai_processing) -> dict:
+    """1会議分の入力を用意する（ステップ1の結果がない環境では同じ規則で分解した行を使う）"""
+    transcript_text = generate_transcript_text(
+        duration, seed=args.seed, filler_ratio=args.filler_ratio, speaker_count=args.speakers
+    )
+    if openai_processing is not None:
+        segments = openai_processing.step1_process_transcript(transcript_text) or []
+    else:
+        segments = parse_transcript_fallback(transcript_text)
+    records = records_from_step1(segments, seed=args.seed)
+
+    conn = create_sqlite_fixture(MEETING_ID, records)
+    create_summary_table(conn)
+    blocks = merge_speaker_blocks(records)
+    summary_segments, _ = to_summary_segments(
+        [(b["line_no"], b["speaker"], b["merged_text"], b["offset_seconds"]) for b in blocks]
+    )
+    return {
+        "transcript_text": transcript_text,
+        "conn": conn,
+        "summary_segments": summary_segments,
+        "openai_processing": openai_processing,
+        "segment_count": len(records),
+    }
+
+
+def parse_transcript_fallback(transcript_text: str) -> list:
+    """step1_process_transcript と同じ分解（openai_processing を読み込めない環境で入力を作るためだけに使う）"""
+    import re
+    segments = []
+    for match in re.finditer(r"\(Speaker(\d+)\)\[(.*?)\]\(([\d.]+)\)", transcript_text):
+        text = match.group(2).strip()
+        segments.append({
+            "speaker": int(match.group(1)),
+            "text": f"（{text}）" if len(text) < 10 else text,
+            "offset": float(match.group(3)),
+        })
+    return segments
+
+
+def measure(func, ctx, repeat: int, llm_state) -> dict:
+    """最良の処理時間・tracemalloc のピーク・件数を計測する"""
+    best = None
+    counts = None
+    llm_calls = 0
+    for _ in range(repeat):
+        llm_state.reset()
+        started = time.perf_counter()
+        counts = func(ctx)
+        elapsed = time.perf_counter() - started
+        llm_calls = llm_state.snapshot()["requests"]
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    func(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {**counts, "llm_calls": llm_calls, "seconds": best, "peak_kib": round(peak / 1024, 1)}
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """基準値との差分の説明のリストを返す"""
+    problems = []
+    for key in COUNT_KEYS:
+        if result[key] != baseline.get(key):
+            problems.append(f"{key} {baseline.get(key)} → {result[key]}")
+    limit = 1.0 + tolerance
+    if baseline.get("seconds", 0) >= MIN_COMPARABLE_SECONDS and result["seconds"] > baseline["seconds"] * limit:
+        problems.append(f"seconds {baseline['seconds']:.4f} → {result['seconds']:.4f}")
+    if baseline.get("peak_kib") and result["peak_kib"] > baseline["peak_kib"] * limit:
+        problems.append(f"peak_kib {baseline['peak_kib']} → {result['peak_kib']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パイプラインのメモリ上の処理のベンチマーク")
+    parser.add_argument("--durations", default=",".join(str(d) for d in DEFAULT_DURATIONS),
+                        help="会議の長さ（秒、カンマ区切り。既定 300,1800,3600,10800）")
+    parser.add_argument("--filler-ratio", type=float, default=0.15)
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最良値を使用）")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="時間・メモリの許容率（既定 1.0 = 基準値の2倍まで）")
+    parser.add_argument("--no-baseline", action="store_true", help="基準値と比較しない")
+    parser.add_argument("--update-baseline", action="store_true", help="今回の結果で基準値を更新する")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    # 各ステージの INFO ログは出力しない（ログ文字列の生成コストは計測に含まれる）
+    logging.basicConfig(level=logging.WARNING)
+
+    server, llm_state = start_llm_stand_in()
+    openai_processing = import_openai_processing()
+    if args.update_baseline and openai_processing is None:
+        # スキップしたケースが基準値から抜け、以降の比較で検出できなくなるため更新しない
+        parser.error("openai パッケージがない環境では基準値を更新できません（requirements.txt を導入してから実行する）")
+    durations = [int(d) for d in args.durations.split(",") if d.strip()]
+    settings = {"filler_ratio": args.filler_ratio, "speakers": args.speakers, "seed": args.seed}
+
+    baseline = {}
+    if not args.no_baseline and not args.update_baseline and BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        if baseline.get("settings") != settings:
+            print(f"⚠️ 基準値の設定 {baseline.get('settings')} と異なるため比較しません")
+            baseline = {}
+
+    results = []
+    regressions = []
+    for duration in durations:
+        ctx = build_context(duration, args, openai_processing)
+        for name, func, needs_openai in CASES:
+            key = f"{duration}:{name}"
+            if needs_openai and openai_processing is None:
+                results.append({"key": key, "duration": duration, "case": name, "status": "skipped"})
+                continue
+            result = {"key": key, "duration": duration, "case": name, "status": "ok",
+                      "segments": ctx["segment_count"], **measure(func, ctx, args.repeat, llm_state)}
+            expected = baseline.get("results", {}).get(key)
+            if baseline and not expected:
+                result["status"] = "new"
+            elif expected:
+                problems = compare(result, expected, args.tolerance)
+                if problems:
+                    result["status"] = "regression"
+                    regressions.append(f"{key}: " + ", ".join(problems))
+            results.append(result)
+        ctx["conn"].close()
+    server.shutdown()
+
+    if args.update_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        document = {
+            "settings": settings,
+            "results": {r["key"]: {k: r[k] for k in COUNT_KEYS + ["seconds", "peak_kib"]}
+                        for r in results if r["status"] == "ok"},
+        }
+        BASELINE_PATH.write_text(json.dumps(document, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✅ 基準値を更新しました: {BASELINE_PATH}")
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print("duration\tcase\tsegments\titems\tqueries\tllm_calls\tseconds\tpeak_kib\tstatus")
+        for r in results:
+            if r["status"] == "skipped":
+                print(f"{r['duration']}\t{r['case']}\t-\t-\t-\t-\t-\t-\tskipped")
+                continue
+            print("\t".join([
+                str(r["duration"]), r["case"], str(r["segments"]), str(r["items"]), str(r["queries"]),
+                str(r["llm_calls"]), f"{r['seconds']:.4f}", f"{r['peak_kib']:.1f}", r["status"],
+            ]))
+
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+ステップ4（話者ブロック統合）の旧実装
+
+merge_engine 導入前の insert_processed_transcript_segments の統合処理をそのまま残したもの。
+行ごとの SELECT is_filler と、ブロックごとの line_no BETWEEN による再取得を含む。
+ベンチマークと出力一致の確認で、sqlite 上の TranscriptProcessingSegments に対して実行する。
+"""
+import logging
+import re
+import sqlite3
+
+from pipeline_processing.merge_engine import SEGMENT_KEYS
+
+
+def create_sqlite_fixture(meeting_id: int, records: list) -> sqlite3.Connection:
+    """records を dbo.TranscriptProcessingSegments として登録したインメモリ sqlite を返す"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("ATTACH DATABASE ':memory:' AS dbo")
+    conn.execute("""
+        CREATE TABLE dbo.TranscriptProcessingSegments (
+            meeting_id INTEGER, line_no INTEGER, speaker INTEGER, transcript_text_segment TEXT,
+            offset_seconds REAL, is_filler INTEGER, front_score REAL, after_score REAL,
+            merged_text_with_prev TEXT, merged_text_with_next TEXT, delete_candidate_word TEXT
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX dbo.ux_tps_line ON TranscriptProcessingSegments(meeting_id, line_no)")
+    conn.executemany(f"""
+        INSERT INTO dbo.TranscriptProcessingSegments (meeting_id, {", ".join(SEGMENT_KEYS)})
+        VALUES (?, {", ".join("?" for _ in SEGMENT_KEYS)})
+    """, [(meeting_id, *[record[key] for key in SEGMENT_KEYS]) for record in records])
+    conn.commit()
+    return conn
+
+
+def legacy_merge_speaker_blocks(cursor, meeting_id: int) -> list:
+    """旧実装のステップ4①②。processed_blocks（登録前の dict のリスト）を返す"""
+    cursor.execute("""
+        SELECT line_no, speaker, transcript_text_segment, merged_text_with_prev, merged_text_with_next,
+               offset_seconds, delete_candidate_word, front_score, after_score
+        FROM dbo.TranscriptProcessingSegments
+        WHERE meeting_id = ?
+        ORDER BY line_no
+    """, (meeting_id,))
+    segments = cursor.fetchall()
+
+    # ステップ①：発話ブロックの構築（is_filler=Falseの行のみ対象）
+    speaker_blocks = []
+    current_block = None
+
+    for idx, (line_no, speaker, transcript_text, merged_text_with_prev, merged_text_with_next,
+              offset_seconds, delete_candidate_word, front_score, after_score) in enumerate(segments):
+
+        # is_filler判定
+        cursor.execute("""
+            SELECT is_filler FROM dbo.TranscriptProcessingSegments
+            WHERE meeting_id = ? AND line_no = ?
+        """, (meeting_id, line_no))
+        is_filler_row = cursor.fetchone()
+        is_filler = is_filler_row[0] if is_filler_row else 0
+
+        # is_filler=Falseの行のみをブロック対象とする
+        if not is_filler:
+            if current_block is None:
+                # 新しいブロック開始
+                current_block = {
+                    "speaker": speaker,
+                    "start_line_no": line_no,
+                    "end_line_no": line_no,
+                    "start_offset": offset_seconds
+                }
+            elif current_block["speaker"] == speaker:
+                # 同一話者のブロック継続
+                current_block["end_line_no"] = line_no
+            else:
+                # 話者が変わった場合、前のブロックを保存して新しいブロック開始
+                speaker_blocks.append(current_block)
+                current_block = {
+                    "speaker": speaker,
+                    "start_line_no": line_no,
+                    "end_line_no": line_no,
+                    "start_offset": offset_seconds
+                }
+
+    # 最後のブロックも忘れずに保存
+    if current_block is not None:
+        speaker_blocks.append(current_block)
+
+    logging.info(f"[STEP4] Created {len(speaker_blocks)} speaker blocks: {speaker_blocks}")
+
+    # ステップ②：各ブロック内のマージ済み発話を構築
+    processed_blocks = []
+
+    for block in speaker_blocks:
+        speaker = block["speaker"]
+        start_line_no = block["start_line_no"]
+        end_line_no = block["end_line_no"]
+        start_offset = block["start_offset"]
+
+        logging.info(f"[STEP4] Processing block: speaker={speaker}, lines={start_line_no}-{end_line_no}")
+
+        # ブロック内の全セグメントを取得（is_filler=Trueも含む）
+        cursor.execute("""
+            SELECT line_no, transcript_text_segment, merged_text_with_prev, merged_text_with_next,
+                   delete_candidate_word, front_score, after_score, is_filler
+            FROM dbo.TranscriptProcessingSegments
+            WHERE meeting_id = ? AND line_no BETWEEN ? AND ?
+            ORDER BY line_no
+        """, (meeting_id, start_line_no, end_line_no))
+        block_segments = cursor.fetchall()
+
+        logging.info(f"[STEP4] Found {len(block_segments)} segments in block {start_line_no}-{end_line_no}")
+
+        merged_text_parts = []
+
+        for seg_idx, (line_no, transcript_text, merged_text_with_prev, merged_text_with_next,
+                     delete_candidate_word, front_score, after_score, is_filler) in enumerate(block_segments):
+
+            logging.info(f"[STEP4] Processing segment {line_no}, is_filler={is_filler}, "
+                       f"front_score={front_score}, after_score={after_score}")
+
+            if not is_filler:
+                # 非フィラー行：そのまま追加
+                merged_text_parts.append(transcript_text)
+                logging.info(f"[STEP4] Added non-filler text: '{transcript_text[:50]}...'")
+
+                # 前のフィラー行からの補完テキストがある場合は追加
+                if seg_idx > 0:
+                    prev_seg = block_segments[seg_idx - 1]
+                    prev_line_no, prev_transcript_text, prev_merged_text_with_prev, prev_merged_text_with_next, \
+                    prev_delete_candidate_word, prev_front_score, prev_after_score, prev_is_filler = prev_seg
+
+                    if prev_is_filler and prev_after_score >= prev_front_score:
+                        # 前のフィラー行がafter_score >= front_scoreの場合、補完テキストを追加
+                        if prev_merged_text_with_next and prev_merged_text_with_next.strip():
+                            complement_text = f"({prev_merged_text_with_next})"
+                        else:
+                            complement_text = f"({prev_transcript_text})"
+
+                        merged_text_parts[-1] = f"{merged_text_parts[-1]}{complement_text}"
+                        logging.info(f"[STEP4] Added complement from previous filler: '{complement_text[:100]}...'")
+
+            else:
+                # フィラー行：補完処理
+                if delete_candidate_word and delete_candidate_word.strip():
+                    logging.info(f"[STEP4] Processing filler with delete_candidate_word: '{delete_candidate_word}'")
+
+                    if front_score > after_score:
+                        # front_score > after_score: 前の文からdelete_candidate_wordを削除し、merged_text_with_prevを挿入
+                        if seg_idx > 0 and merged_text_parts:
+                            # 前の文からdelete_candidate_wordを削除
+                            delete_pattern = re.escape(delete_candidate_word.strip())
+                            prev_text = merged_text_parts[-1]
+                            cleaned_prev_text = re.sub(f"{delete_pattern}[。]?\\s*", "", prev_text)
+
+                            logging.info(f"[STEP4] Removed '{delete_candidate_word}' from prev_text: '{prev_text}' -> '{cleaned_prev_text}'")
+
+                            # 補完テキストを結合（前の文に追加）
+                            if merged_text_with_prev and merged_text_with_prev.strip():
+                                complement_text = f"({merged_text_with_prev})"
+                            else:
+                                complement_text = f"({transcript_text})"
+
+                            merged_text_parts[-1] = f"{cleaned_prev_text}{complement_text}"
+                            logging.info(f"[STEP4] Applied front_score > after_score merge: '{merged_text_parts[-1][:100]}...'")
+
+                    elif after_score >= front_score:
+                        # after_score >= front_score: 次の文にmerged_text_with_nextを付加し、次のセグメントのdelete_candidate_wordを削除
+
+                        # 次のセグメントが存在し、非フィラーの場合
+                        if seg_idx + 1 < len(block_segments):
+                            next_seg = block_segments[seg_idx + 1]
+                            next_line_no, next_transcript_text, next_merged_text_with_prev, next_merged_text_with_next, \
+                            next_delete_candidate_word, next_front_score, next_after_score, next_is_filler = next_seg
+
+                            if not next_is_filler:
+                                # 次の文からdelete_candidate_wordを削除
+                                if next_delete_candidate_word and next_delete_candidate_word.strip():
+                                    delete_pattern = re.escape(next_delete_candidate_word.strip())
+                                    cleaned_next_text = re.sub(f"{delete_pattern}[。]?\\s*", "", next_transcript_text)
+
+                                    logging.info(f"[STEP4] Removed '{next_delete_candidate_word}' from next_text: '{next_transcript_text}' -> '{cleaned_next_text}'")
+
+                                    # 次のセグメントを更新（後で処理される）
+                                    block_segments[seg_idx + 1] = (next_line_no, cleaned_next_text, next_merged_text_with_prev,
+                                                                   next_merged_text_with_next, next_delete_candidate_word,
+                                                                   next_front_score, next_after_score, next_is_filler)
+
+                                # 次の文に補完テキストを追加
+                                if merged_text_with_next and merged_text_with_next.strip():
+                                    complement_text = f"({merged_text_with_next})"
+                                else:
+                                    complement_text = f"({transcript_text})"
+
+                                # 次のセグメントの処理時に反映されるよう、一時的に保存
+                                # 実際の処理は次のセグメントのループで行われる
+                                logging.info(f"[STEP4] Will add complement to next segment: '{complement_text[:100]}...'")
+
+                                # 次のセグメントの処理時に補完テキストを追加するよう、フラグを設定
+                                # この処理は次のセグメントのループで行われる
+
+                        else:
+                            # 次のセグメントが存在しない場合
+                            logging.info(f"[STEP4] No next segment available for after_score >= front_score merge")
+
+                    else:
+                        # スコアが同じ場合やdelete_candidate_wordがNoneの場合
+                        logging.info(f"[STEP4] Skipping filler line {line_no} (no clear score difference or no delete_candidate_word)")
+                else:
+                    # delete_candidate_wordがNoneの場合
+                    logging.info(f"[STEP4] Skipping filler line {line_no} (no delete_candidate_word)")
+
+        # ブロック内のテキストを結合
+        final_merged_text = " ".join(merged_text_parts).strip()
+
+        processed_blocks.append({
+            "meeting_id": meeting_id,
+            "line_no": start_line_no,  # ブロック内の最初の行を代表として使用
+            "speaker": speaker,
+            "merged_text": final_merged_text,
+            "offset_seconds": start_offset  # ブロック内の最初の行のoffsetを使用
+        })
+
+        logging.info(f"[STEP4] Final block text: speaker={speaker}, text='{final_merged_text[:100]}...'")
+
+    return processed_blocks
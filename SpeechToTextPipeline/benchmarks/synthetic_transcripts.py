@@ -0,0 +1,151 @@
+"""
+ベンチマーク用の合成文字起こしデータ
+
+実データを使わずに、ステップ1の入力となる文字起こし結果や、ステップ4以降の入力となる
+TranscriptProcessingSegments 行を生成する。
+フィラー行のスコアと delete_candidate_word はステップ2-3と同じ規則で設定するため、
+統合処理の削除・補完の分岐がすべて通る。
+"""
+import random
+
+SENTENCES = [
+    "本日はお時間をいただきありがとうございます。",
+    "御社の営業体制について伺えればと思います。",
+    "現在は五名のチームで新規開拓を担当しています。",
+    "月次の目標は前年比で一割増を見込んでいます。",
+    "導入後は問い合わせ対応の時間が半分になりました。",
+    "価格についてはもう少し検討が必要です。",
+    "来週までに見積もりをお送りします。",
+    "それでは次回の打ち合わせで詳細を詰めましょう。",
+    "担当者にも共有しておきます。",
+    "資料の三ページ目をご覧ください。",
+    "他社の事例もあわせてご紹介します。",
+    "承知しました。",
+]
+FILLERS = ["（はい。）", "（えっと。）", "（うん。）", "（そうですね。）", "（あ、）", "（なるほど。）"]
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in text.strip().split("。") if s.strip()]
+
+
+def generate_utterance(rng: random.Random) -> str:
+    return "".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 3)))
+
+
+def generate_processing_records(count: int, seed: int = 0, filler_ratio: float = 0.15,
+                                speaker_count: int = 2, speaker_switch_ratio: float = 0.3) -> list:
+    """
+    TranscriptProcessingSegments 相当の dict を count 行生成する（line_no は 1 始まり）
+
+    Args:
+        filler_ratio: フィラー行の割合
+        speaker_switch_ratio: 行ごとに話者が切り替わる確率
+    """
+    rng = random.Random(seed)
+    records = []
+    speaker = 1
+    offset = 0.0
+
+    for line_no in range(1, count + 1):
+        if line_no > 1 and rng.random() < speaker_switch_ratio:
+            speaker = rng.choice([s for s in range(1, speaker_count + 1) if s != speaker] or [speaker])
+        is_filler = line_no > 1 and rng.random() < filler_ratio
+        text = rng.choice(FILLERS) if is_filler else generate_utterance(rng)
+        records.append({
+            "line_no": line_no,
+            "speaker": speaker,
+            "transcript_text_segment": text,
+            "offset_seconds": round(offset, 1),
+            "is_filler": is_filler,
+            "front_score": None,
+            "after_score": None,
+            "merged_text_with_prev": None,
+            "merged_text_with_next": None,
+            "delete_candidate_word": None,
+        })
+        offset += rng.uniform(1.0, 12.0)
+
+    apply_filler_rules(records, rng)
+    return records
+
+
+def apply_filler_rules(records: list, rng: random.Random) -> list:
+    """ステップ2-3 と同じ規則で補助カラムと delete_candidate_word を設定する（スコアは乱数）"""
+    for index, record in enumerate(records):
+        if not record["is_filler"]:
+            continue
+        prev_text = records[index - 1]["transcript_text_segment"] if index > 0 else ""
+        next_text = records[index + 1]["transcript_text_segment"] if index + 1 < len(records) else ""
+        bracket_text = record["transcript_text_segment"].strip("（）")
+
+        prev_sentences = split_sentences(prev_text)
+        next_sentences = split_sentences(next_text)
+        prev_last = prev_sentences[-1] if prev_sentences else ""
+        next_first = next_sentences[0] if next_sentences else ""
+
+        record["merged_text_with_prev"] = prev_last + bracket_text if prev_last else ""
+        record["merged_text_with_next"] = bracket_text.strip("。") + next_first if next_first else ""
+        record["front_score"] = round(rng.random(), 2)
+        record["after_score"] = round(rng.random(), 2)
+
+        if record["front_score"] > record["after_score"]:
+            record["delete_candidate_word"] = prev_last.rstrip("。") + "。" if record["merged_text_with_prev"] else None
+        else:
+            record["delete_candidate_word"] = next_first.rstrip("。") + "。" if record["merged_text_with_next"] else None
+
+    # 非フィラー行に削除候補が残っているケース（after_score 側の削除分岐）も一部含める
+    for record in records:
+        if not record["is_filler"] and rng.random() < 0.02:
+            sentences = split_sentences(record["transcript_text_segment"])
+            record["delete_candidate_word"] = sentences[0] + "。" if sentences else None
+    return records
+
+    return records
+
+
+def generate_transcript_text(duration_seconds: float, seed: int = 0, filler_ratio: float = 0.15,
+                             speaker_count: int = 2, speaker_switch_ratio: float = 0.3) -> str:
+    """
+    音声 duration_seconds 秒分の文字起こし結果（step1_process_transcript の入力形式）を生成する
+
+    "(Speaker{n})[{text}]({offset_seconds})" を空白区切りで連結した文字列。フィラーは括弧なしで出力する。
+    """
+    rng = random.Random(seed)
+    phrases = []
+    speaker = 1
+    offset = 0.0
+
+    while offset < duration_seconds:
+        if phrases and rng.random() < speaker_switch_ratio:
+            speaker = rng.choice([s for s in range(1, speaker_count + 1) if s != speaker] or [speaker])
+        is_filler = bool(phrases) and rng.random() < filler_ratio
+        text = rng.choice(FILLERS).strip("（）") if is_filler else generate_utterance(rng)
+        phrases.append(f"(Speaker{speaker})[{text}]({round(offset, 1)})")
+        offset += rng.uniform(1.0, 12.0)
+
+    return " ".join(phrases)
+
+
+def records_from_step1(segments: list, seed: int = 0) -> list:
+    """
+    step1_process_transcript の出力から TranscriptProcessingSegments 相当の dict を作る
+
+    is_filler の判定はステップ1の登録処理と同じ（括弧を除いて10文字未満）。
+    """
+    records = [
+        {
+            "line_no": line_no,
+            "speaker": segment["speaker"],
+            "transcript_text_segment": segment["text"],
+            "offset_seconds": segment["offset"],
+            "is_filler": 1 if len(segment["text"].strip("（）")) < 10 else 0,
+            "front_score": None,
+            "after_score": None,
+            "merged_text_with_prev": None,
+            "merged_text_with_next": None,
+            "delete_candidate_word": None,
+        }
+        for line_no, segment in enumerate(segments, start=1)
+    ]
+    return apply_filler_rules(records, random.Random(seed))
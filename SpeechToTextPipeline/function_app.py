@@ -7,19 +7,48 @@ import uuid
 import re
 import requests
 import json
-import openai
+import random
+import base64
+import threading
+import tempfile
 from datetime import datetime, timezone, timedelta
 from azure.identity import ClientSecretCredential
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
 from azure.storage.queue import QueueServiceClient
 import isodate
 import sys
 from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # openai_processing モジュールを import できるように sys.path を調整
 sys.path.append(str(Path(__file__).parent))
 from openai_processing.openai_completion_step1 import step1_process_transcript
 from openai_processing.openai_completion_step2 import evaluate_connection_naturalness_no_period
+from openai_processing.client import create_openai_client, set_llm_call_counter
+from pipeline_processing.stage_metrics import StageMetrics, unwrap_connection, utc_now
+from pipeline_processing.merge_engine import merge_speaker_blocks
+from pipeline_processing.deletion_index import DeletionIndex
+from pipeline_processing.offset_remap import offset_remap_name, parse_offset_remap, to_original_offset
+from pipeline_processing.transcript_chunks import Phrase, chunk_manifest_name, parse_chunk_manifest, stitch_phrases
+from pipeline_processing.db_backend import connect_sqlite, get_backend_name
+from pipeline_processing.pipeline_states import (
+    CLAIMABLE_REASONS, DEFAULT_LEASE_SECONDS, PipelineState, StageLease, can_release, completed_state,
+    decide_claim, failed_state, find_resumable_stage, in_progress_state, is_shard_state, lease_expiry, new_lease_owner,
+    seconds_in_state
+)
+from pipeline_processing.summary_blocks import (
+    build_time_blocks, render_block_text, summary_segment_row, to_summary_segments
+)
+from pipeline_processing import block_segmentation
+from pipeline_processing.sharding import find_uncovered_lines, plan_shards
+from pipeline_processing.snapshots import (
+    decode_snapshot, encode_snapshot, parse_snapshot_pointer, snapshot_name, write_local_snapshot
+)
+from pipeline_processing.priority_lanes import (
+    DEFAULT_LANE, choose_lane, higher_lanes, lane_queue_name, normalize_lane, parse_lane_weights, yield_probability
+)
 
 
 app = func.FunctionApp()
@@ -29,7 +58,12 @@ def get_db_connection():
     ローカル：ClientSecretCredential（pyodbc）
     本番環境：Microsoft Entra ID（Managed Identity）を使用して Azure SQL Database に接続する。
     ODBC Driver 17 for SQL Server + Authentication=ActiveDirectoryMsi を使用。
+    DB_BACKEND=sqlite の場合はローカルの SQLite に接続する（pipeline_processing/db_backend.py）。
     """
+    if get_backend_name() == "sqlite":
+        logging.info("[DB接続] SQLite（DB_BACKEND=sqlite）")
+        return connect_sqlite()
+
     try:
         logging.info("[DB接続] 開始")
 
@@ -88,54 +122,107 @@ def get_db_connection():
         logging.exception("詳細:")
         raise
 
+# QueueServiceClient とキュー名ごとの QueueClient はプロセス内で使い回す（HTTP セッションを共有）
+_queue_service_client = None
+_queue_clients = {}
+_queue_clients_lock = threading.Lock()
+
 def get_queue_service_client():
     """
-    Azure Storage Queue Service Client を取得します。
+    Azure Storage Queue Service Client を取得します。（プロセス内で1つを共有）
     """
+    global _queue_service_client
     try:
-        connection_string = os.environ.get("AzureWebJobsStorage")
-        if not connection_string:
-            raise ValueError("AzureWebJobsStorage 環境変数が設定されていません")
-        
-        return QueueServiceClient.from_connection_string(connection_string)
+        with _queue_clients_lock:
+            if _queue_service_client is None:
+                connection_string = os.environ.get("AzureWebJobsStorage")
+                if not connection_string:
+                    raise ValueError("AzureWebJobsStorage 環境変数が設定されていません")
+
+                _queue_service_client = QueueServiceClient.from_connection_string(connection_string)
+            return _queue_service_client
     except Exception as e:
         logging.error(f"[Queue Service] 接続エラー: {e}")
         raise
 
-def send_queue_message(queue_name: str, payload: dict):
+def get_queue_client(queue_name: str):
+    """
+    キュー名ごとにキャッシュした QueueClient を取得します。
+
+    QueueServiceClient から生成したクライアントはトランスポート（HTTP セッション）を共有するため、
+    呼び出しごとの接続確立が不要になります。
+    """
+    with _queue_clients_lock:
+        queue_client = _queue_clients.get(queue_name)
+    if queue_client is not None:
+        return queue_client
+
+    # get_queue_service_client も同じロックを使うため、ロックの外で取得してから再確認する
+    service_client = get_queue_service_client()
+    with _queue_clients_lock:
+        queue_client = _queue_clients.get(queue_name)
+        if queue_client is None:
+            queue_client = service_client.get_queue_client(queue_name)
+            _queue_clients[queue_name] = queue_client
+    return queue_client
+
+def encode_queue_message(payload: dict) -> str:
+    """
+    キューメッセージを JSON → Base64 に変換します。
+
+    ステージ計測用に投入時刻（enqueued_at）を付与します。レーン譲りによる再投入では元の投入時刻を維持します。
+    """
+    payload = {**payload}
+    payload.setdefault("enqueued_at", utc_now().isoformat() + "Z")
+    json_message = json.dumps(payload)
+    return base64.b64encode(json_message.encode("utf-8")).decode("utf-8")
+
+def send_queue_message(queue_name: str, payload: dict, visibility_timeout: int = None):
     """
     指定されたキューにメッセージを送信します。
+
+    visibility_timeout を指定するとその秒数が経過するまでメッセージは取り出されません。
     """
     try:
-        import base64
-        from azure.storage.queue import QueueClient
-        
-        # 接続文字列を取得
-        conn_str = os.environ.get("AzureWebJobsStorage")
-        if not conn_str:
-            raise ValueError("AzureWebJobsStorage 環境変数が設定されていません")
-        
-        # キュークライアントを作成
-        queue_client = QueueClient.from_connection_string(conn_str, queue_name)
-        
-        # デバッグ用ログ：送信前のメッセージ情報
-        logging.info(f"📤 キュー送信準備: queue_name='{queue_name}', payload_type={type(payload)}, payload={payload}")
-        
-        # メッセージをJSON文字列に変換し、明示的にBase64エンコード
-        json_message = json.dumps(payload)
-        base64_encoded = base64.b64encode(json_message.encode("utf-8")).decode("utf-8")
-        
-        # デバッグ用ログ：変換後の情報
-        logging.info(f"📤 メッセージ変換: json_message='{json_message}', base64_length={len(base64_encoded)}")
-        
-        # メッセージを送信
-        queue_client.send_message(base64_encoded)
-        
-        logging.info(f"✅ キュー '{queue_name}' に送信成功: {json_message}")
+        get_queue_client(queue_name).send_message(encode_queue_message(payload), visibility_timeout=visibility_timeout)
+        logging.info(f"✅ キュー '{queue_name}' に送信成功: {payload}")
     except Exception as e:
         logging.exception(f"[ERROR] キュー '{queue_name}' へのメッセージ送信に失敗しました")
         raise
 
+def send_queue_messages(queue_name: str, payloads: list, max_concurrency: int = None) -> dict:
+    """
+    指定されたキューに複数のメッセージを並列送信します。（Storage Queue には一括送信 API がないため）
+
+    Args:
+        max_concurrency: 同時送信数。未指定の場合は環境変数 QUEUE_SEND_CONCURRENCY（既定 8）
+
+    Returns:
+        dict: {"sent": 成功件数, "failed": [{"index": payloads 内の位置, "error": エラー内容}, ...]}
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.environ.get("QUEUE_SEND_CONCURRENCY", "8"))
+    queue_client = get_queue_client(queue_name)
+
+    def send(payload: dict):
+        queue_client.send_message(encode_queue_message(payload))
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(payloads) or 1))) as executor:
+        futures = {executor.submit(send, payload): index for index, payload in enumerate(payloads)}
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                failed.append({"index": futures[future], "error": str(error)})
+
+    failed.sort(key=lambda item: item["index"])
+    result = {"sent": len(payloads) - len(failed), "failed": failed}
+    if failed:
+        logging.error(f"❌ キュー '{queue_name}' への一括送信で {len(failed)}/{len(payloads)} 件失敗: {failed[:5]}")
+    else:
+        logging.info(f"✅ キュー '{queue_name}' に {len(payloads)} 件送信成功")
+    return result
+
 def get_naturalness_score(text: str) -> float:
     """
     OpenAI APIを使用して日本語文の自然さを評価し、0.0〜1.0のスコアを返します。
@@ -155,7 +242,7 @@ def get_naturalness_score(text: str) -> float:
     
     try:
         # OpenAI client を初期化
-        client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        client = create_openai_client()
         
         response = client.chat.completions.create(
             model=os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo"),
@@ -197,6 +284,105 @@ def log_trigger_error(event_type: str, table_name: str, record_id: int, addition
     except Exception as log_error:
         logging.error(f"🚨 TriggerLog への挿入に失敗: {log_error}")
 
+def load_offset_remap(blob_service_client, container_name: str, wav_blob_name: str):
+    """
+    変換時に無音を圧縮した WAV の offset 対応表（rec.wav に対する rec.offsets.json）を読み込む
+
+    対応表がない（圧縮していない）、または読み込めない場合は None（offset はそのまま使う）。
+    """
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=offset_remap_name(wav_blob_name))
+    try:
+        return parse_offset_remap(blob_client.download_blob().readall())
+    except ResourceNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"⚠️ offset 対応表の読み込みに失敗（offset は圧縮後の WAV の位置のまま）: {e}")
+        return None
+
+def load_chunk_manifest(blob_service_client, container_name: str, wav_blob_name: str):
+    """
+    変換時に長時間録音を分割した場合のチャンク一覧（rec.wav に対する rec.chunks.json）を読み込む
+
+    マニフェストがない（分割していない）、または読み込めない場合は None（WAV 全体を1つのジョブで文字起こしする）。
+    """
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=chunk_manifest_name(wav_blob_name))
+    try:
+        chunks = parse_chunk_manifest(blob_client.download_blob().readall())
+    except ResourceNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"⚠️ チャンクマニフェストの読み込みに失敗（WAV 全体を文字起こしします）: {e}")
+        return None
+    return chunks or None
+
+def generate_read_sas_url(account_name: str, account_key: str, container_name: str, blob_name: str) -> str:
+    """読み取り専用（1時間）の SAS 付き URL"""
+    sas_token = generate_blob_sas(
+        account_name=account_name,
+        container_name=container_name,
+        blob_name=blob_name,
+        account_key=account_key,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.now(timezone.utc) + timedelta(hours=1)
+    )
+    return f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_name}?{sas_token}"
+
+def insert_transcription_jobs(cursor, meeting_id: int, chunks, job_ids):
+    """チャンクごとのジョブ ID を TranscriptionJobs に保存する（コミットは呼び出し側）"""
+    for chunk, current_job_id in zip(chunks, job_ids):
+        cursor.execute("""
+            INSERT INTO dbo.TranscriptionJobs (meeting_id, chunk_index, job_id, chunk_container, chunk_blob, start_seconds)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (meeting_id, chunk.index, current_job_id, chunk.container, chunk.blob, chunk.start_seconds))
+
+def create_transcription_job(region: str, headers: dict, content_url: str, display_name: str, callback_url: str):
+    """Speech-to-Text のバッチ文字起こしジョブを作成し、ジョブ ID を返す"""
+    payload = {
+        "contentUrls": [content_url],
+        "locale": "ja-JP",
+        "displayName": display_name,
+        "properties": {
+            "diarizationEnabled": True,
+            "wordLevelTimestampsEnabled": True,
+            "punctuationMode": "DictatedAndAutomatic",
+            "profanityFilterMode": "Masked",
+            "callbackUrl": callback_url
+        }
+    }
+    endpoint = f"https://{region}.api.cognitive.microsoft.com/speechtotext/v3.0/transcriptions"
+    response = requests.post(endpoint, headers=headers, json=payload)
+    response.raise_for_status()
+    job_url = response.json().get("self")
+    return job_url.split("/")[-1] if job_url else None
+
+def fetch_transcription_result(transcription_url: str, headers: dict):
+    """完了したジョブの文字起こし結果（contenturl_0.json）。結果ファイルがない場合は None"""
+    files_resp = requests.get(f"{transcription_url}/files", headers=headers)
+    files_resp.raise_for_status()
+    transcription_files = [
+        f for f in files_resp.json()["values"]
+        if f.get("kind") == "Transcription" and f.get("name", "").startswith("contenturl_0")
+    ]
+    if not transcription_files:
+        return None
+    result_resp = requests.get(transcription_files[0]["links"]["contentUrl"], headers=headers)
+    return result_resp.json()
+
+def parse_recognized_phrases(result_json: dict) -> list:
+    """文字起こし結果の recognizedPhrases を Phrase のリストにする（offset を解析できない場合は None）"""
+    phrases = []
+    for phrase in result_json["recognizedPhrases"]:
+        try:
+            offset_seconds = isodate.parse_duration(phrase.get("offset", "PT0S")).total_seconds()
+        except Exception:
+            offset_seconds = None
+        try:
+            duration_seconds = isodate.parse_duration(phrase.get("duration", "PT0S")).total_seconds()
+        except Exception:
+            duration_seconds = 0.0
+        phrases.append(Phrase(phrase.get("speaker", "Unknown"), phrase["nBest"][0]["display"], offset_seconds, duration_seconds))
+    return phrases
+
 @app.function_name(name="TriggerTranscriptionJob")
 @app.event_grid_trigger(arg_name="event")
 def trigger_transcription_job(event: func.EventGridEvent):
@@ -226,6 +412,11 @@ def trigger_transcription_job(event: func.EventGridEvent):
             logging.warning(f"❌ 非WAVファイルが検知されました: {blob_name} → スキップします")
             return
 
+        # 長時間録音を分割したチャンクは、元の WAV の処理でまとめて文字起こしする
+        if re.fullmatch(r"chunk-\d+\.wav", blob_name):
+            logging.info(f"⏭ 分割チャンク {blob_name} → スキップします")
+            return
+
         # ファイル名から meeting_id, user_id を抽出
         match = re.match(r"meeting_(\d+)_user_(\d+)_.*", blob_name)
         if not match:
@@ -290,38 +481,41 @@ def trigger_transcription_job(event: func.EventGridEvent):
             rate = wf.getframerate()
             duration_seconds = int(frames / float(rate))
 
+        # 変換時に無音を圧縮した場合、offset と duration_seconds は元の音声（再生用）の位置・長さにする
+        offset_remap = load_offset_remap(blob_service_client, container_name, blob_name)
+        if offset_remap is not None:
+            logging.info(f"✂️ 無音圧縮済み: {offset_remap.original_duration} 秒 → {offset_remap.trimmed_duration} 秒")
+            duration_seconds = int(offset_remap.original_duration)
+
         logging.info(f"📏 file_size={file_size} bytes, duration_seconds={duration_seconds} sec")
 
+        # 変換時に長時間録音を分割した場合は、チャンクごとにジョブを作成して並列に文字起こしする
+        chunks = load_chunk_manifest(blob_service_client, container_name, blob_name)
+        if chunks:
+            logging.info(f"🧩 チャンク分割済み: {len(chunks)} 件")
+            content_urls = [
+                generate_read_sas_url(account_name, account_key, chunk.container, chunk.blob) for chunk in chunks
+            ]
+        else:
+            content_urls = [sas_url]
+
         # Speech-to-Text transcription job
         speech_key = os.environ["SPEECH_KEY"]
         region = os.environ["SPEECH_REGION"]
         callback_url = os.environ["TRANSCRIPTION_CALLBACK_URL"]
 
-        payload = {
-            "contentUrls": [sas_url],
-            "locale": "ja-JP",
-            "displayName": f"transcription-{meeting_id}-{user_id}",
-            "properties": {
-                "diarizationEnabled": True,
-                "wordLevelTimestampsEnabled": True,
-                "punctuationMode": "DictatedAndAutomatic",
-                "profanityFilterMode": "Masked",
-                "callbackUrl": callback_url
-            }
-        }
-
         headers = {
             "Ocp-Apim-Subscription-Key": speech_key,
             "Content-Type": "application/json"
         }
 
-        endpoint = f"https://{region}.api.cognitive.microsoft.com/speechtotext/v3.0/transcriptions"
-        response = requests.post(endpoint, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        job_url = result.get("self")
-        job_id = job_url.split("/")[-1] if job_url else None
-        logging.info(f"🆔 Transcription Job ID: {job_id}")
+        job_ids = []
+        for index, content_url in enumerate(content_urls):
+            display_name = f"transcription-{meeting_id}-{user_id}" + (f"-{index}" if chunks else "")
+            job_ids.append(create_transcription_job(region, headers, content_url, display_name, callback_url))
+        # file_path には先頭のジョブ ID を保存する（チャンク分割時の全ジョブは TranscriptionJobs に保存する）
+        job_id = job_ids[0]
+        logging.info(f"🆔 Transcription Job ID: {', '.join(str(current_job_id) for current_job_id in job_ids)}")
 
         # Meetings テーブルに挿入
         insert_query = """
@@ -349,34 +543,45 @@ def trigger_transcription_job(event: func.EventGridEvent):
             meeting_datetime,
             datetime.now(timezone.utc)
         ))
+        if chunks:
+            insert_transcription_jobs(cursor, meeting_id, chunks, job_ids)
         conn.commit()
         logging.info("✅ Meetings テーブルにレコード挿入完了")
         
         # Speech-to-Text ジョブの完了をポーリングして文字起こし結果を取得
-        logging.info(f"🔄 文字起こしジョブの完了を待機中: job_id={job_id}")
+        logging.info(f"🔄 文字起こしジョブの完了を待機中: jobs={len(job_ids)}")
         
         max_retries = 20
         sleep_seconds = 15
-        transcription_url = f"https://{region}.api.cognitive.microsoft.com/speechtotext/v3.0/transcriptions/{job_id}"
+        transcription_urls = {
+            current_job_id: f"https://{region}.api.cognitive.microsoft.com/speechtotext/v3.0/transcriptions/{current_job_id}"
+            for current_job_id in job_ids
+        }
+        pending_job_ids = list(job_ids)
         
         for i in range(max_retries):
-            status_resp = requests.get(transcription_url, headers=headers)
-            status_resp.raise_for_status()
-            job_status = status_resp.json().get("status")
-            
-            logging.info(f"[Polling] job_status={job_status}, retry={i}")
+            for current_job_id in list(pending_job_ids):
+                status_resp = requests.get(transcription_urls[current_job_id], headers=headers)
+                status_resp.raise_for_status()
+                job_status = status_resp.json().get("status")
+                
+                logging.info(f"[Polling] job_id={current_job_id}, job_status={job_status}, retry={i}")
+                
+                if job_status == "Succeeded":
+                    pending_job_ids.remove(current_job_id)
+                elif job_status in ["Failed", "Canceled"]:
+                    cursor.execute("""
+                        UPDATE dbo.Meetings
+                        SET status = 'failed', updated_datetime = GETDATE(),
+                            end_datetime = GETDATE(), error_message = ?
+                        WHERE meeting_id = ? AND user_id = ?
+                    """, (f"Speech job {job_status}", meeting_id, user_id))
+                    conn.commit()
+                    return func.HttpResponse(f"Transcription failed: {job_status}", status_code=500)
             
-            if job_status == "Succeeded":
+            if not pending_job_ids:
+                job_status = "Succeeded"
                 break
-            elif job_status in ["Failed", "Canceled"]:
-                cursor.execute("""
-                    UPDATE dbo.Meetings
-                    SET status = 'failed', updated_datetime = GETDATE(),
-                        end_datetime = GETDATE(), error_message = ?
-                    WHERE meeting_id = ? AND user_id = ?
-                """, (f"Speech job {job_status}", meeting_id, user_id))
-                conn.commit()
-                return func.HttpResponse(f"Transcription failed: {job_status}", status_code=500)
             
             import time
             time.sleep(sleep_seconds)
@@ -393,42 +598,37 @@ def trigger_transcription_job(event: func.EventGridEvent):
         
         # Pollingが成功終了したか確認
         if job_status == "Succeeded":
-            # transcriptionファイル取得
-            files_url = f"{transcription_url}/files"
-            files_resp = requests.get(files_url, headers=headers)
-            files_resp.raise_for_status()
-            files_data = files_resp.json()
-
-            transcription_files = [
-                f for f in files_data["values"]
-                if f.get("kind") == "Transcription" and f.get("name", "").startswith("contenturl_0")
-            ]
-            if not transcription_files:
-                cursor.execute("""
-                    UPDATE dbo.Meetings
-                    SET status = 'noresult', updated_datetime = GETDATE(), end_datetime = GETDATE(), error_message = ?
-                    WHERE meeting_id = ? AND user_id = ?
-                """, ("No transcription file (contenturl_0.json) found", meeting_id, user_id))
-                conn.commit()
-                return func.HttpResponse("No transcription result", status_code=500)
-
-            results_url = transcription_files[0]["links"]["contentUrl"]
-            result_resp = requests.get(results_url, headers=headers)
-            result_json = result_resp.json()
+            # transcriptionファイル取得（チャンクごと）
+            chunk_phrases = []
+            for current_job_id in job_ids:
+                result_json = fetch_transcription_result(transcription_urls[current_job_id], headers)
+                if result_json is None:
+                    cursor.execute("""
+                        UPDATE dbo.Meetings
+                        SET status = 'noresult', updated_datetime = GETDATE(), end_datetime = GETDATE(), error_message = ?
+                        WHERE meeting_id = ? AND user_id = ?
+                    """, ("No transcription file (contenturl_0.json) found", meeting_id, user_id))
+                    conn.commit()
+                    return func.HttpResponse("No transcription result", status_code=500)
+                chunk_phrases.append(parse_recognized_phrases(result_json))
+
+            # チャンク分割時は offset をチャンクの開始位置だけずらし、話者番号をそろえて1つにまとめる
+            phrases = stitch_phrases(chunks, chunk_phrases) if chunks else chunk_phrases[0]
 
             transcript = []
-            for phrase in result_json["recognizedPhrases"]:
-                speaker = phrase.get("speaker", "Unknown")
-                text = phrase["nBest"][0]["display"]
-                offset = phrase.get("offset", "PT0S")
-                try:
-                    offset_seconds = round(isodate.parse_duration(offset).total_seconds(), 1)
-                except:
-                    offset_seconds = 0.0
-                transcript.append(f"(Speaker{speaker})[{text}]({offset_seconds})")
+            for phrase in phrases:
+                offset_seconds = 0.0
+                if phrase.offset_seconds is not None:
+                    offset_seconds = phrase.offset_seconds
+                    if offset_remap is not None:
+                        offset_seconds = to_original_offset(offset_remap, offset_seconds)
+                    offset_seconds = round(offset_seconds, 1)
+                transcript.append(f"(Speaker{phrase.speaker})[{phrase.text}]({offset_seconds})")
             transcript_text = " ".join(transcript)
 
-            # DBへ保存
+            # DBへ保存（状態管理が有効な場合は transcribed への遷移も記録する）
+            if pipeline_state_enabled():
+                set_pipeline_state(conn, meeting_id, "transcribed", note="transcription")
             cursor.execute("""
                 UPDATE dbo.Meetings
                 SET transcript_text = ?, status = 'transcribed',
@@ -439,10 +639,11 @@ def trigger_transcription_job(event: func.EventGridEvent):
 
             logging.info(f"✅ 文字起こし結果を保存完了: meeting_id={meeting_id}, フレーズ数={len(transcript)}")
             
-            # queue-preprocessing へメッセージ送信
+            # queue-preprocessing（会議のレーンに対応するキュー）へメッセージ送信
             try:
-                message = {"meeting_id": meeting_id, "user_id": user_id}
-                send_queue_message("queue-preprocessing", message)
+                lane = resolve_meeting_lane(cursor, meeting_id)
+                message = {"meeting_id": meeting_id, "user_id": user_id, "priority": lane}
+                send_queue_message(lane_queue_name("queue-preprocessing", lane), message)
                 logging.info(f"✅ queue-preprocessing へメッセージ送信完了: meeting_id={meeting_id}, user_id={user_id}")
             except Exception as queue_error:
                 logging.error(f"❌ queue-preprocessing へのメッセージ送信失敗: {queue_error}")
@@ -1116,571 +1317,859 @@ def trigger_transcription_job(event: func.EventGridEvent):
 # 🔄 Queue Trigger ベースの新しい処理関数群
 # ============================================================================
 
-@app.function_name(name="QueuePreprocessingFunc")
-@app.queue_trigger(arg_name="message", queue_name="queue-preprocessing", connection="AzureWebJobsStorage")
-def queue_preprocessing_func(message: func.QueueMessage):
+# ステージ出力スナップショット保存用の BlobContainerClient（プロセス内で共有）
+_snapshot_container_client = None
+
+def get_snapshot_container_client():
+    """スナップショット保存先コンテナー（STAGE_SNAPSHOT_CONTAINER、既定 pipeline-snapshots）のクライアントを取得する"""
+    global _snapshot_container_client
+    if _snapshot_container_client is None:
+        connection_string = os.environ.get("AzureWebJobsStorage")
+        if not connection_string:
+            raise ValueError("AzureWebJobsStorage 環境変数が設定されていません")
+        container_name = os.environ.get("STAGE_SNAPSHOT_CONTAINER", "pipeline-snapshots")
+        _snapshot_container_client = BlobServiceClient.from_connection_string(connection_string).get_container_client(container_name)
+    return _snapshot_container_client
+
+def save_stage_snapshot(meeting_id: int, stage: str, rows: list) -> str:
     """
-    ステップ1-3: セグメント化、フィラースコア、補完候補を TranscriptProcessingSegments に保存
+    ステージ出力を圧縮スナップショットとして保存し、次ステージへ渡すポインタを返す（クレームチェック）
+
+    DB への書き込みはこれまでどおり行うため、スナップショットは読み込みの省略にのみ使う。
+    保存に失敗した場合は None を返し、次ステージは DB から読み込む。
+
+    環境変数:
+        STAGE_SNAPSHOT_MODE: "blob"（Blob Storage）/ "local"（STAGE_SNAPSHOT_DIR、同一ホスト実行時のみ）/ 未設定は無効
     """
+    mode = os.environ.get("STAGE_SNAPSHOT_MODE", "").lower()
+    if mode not in ("blob", "local") or rows is None:
+        return None
+
+    try:
+        data = encode_snapshot(meeting_id, stage, rows)
+        name = snapshot_name(meeting_id, stage)
+        if mode == "local":
+            directory = os.environ.get("STAGE_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "pipeline-snapshots")
+            pointer = write_local_snapshot(directory, name, data)
+        else:
+            container_client = get_snapshot_container_client()
+            container_client.upload_blob(name, data, overwrite=True)
+            pointer = f"blob://{container_client.container_name}/{name}"
+        logging.info(f"📦 スナップショット保存: {pointer} ({len(rows)} 行, {len(data)} bytes)")
+        return pointer
+    except Exception as e:
+        logging.warning(f"⚠️ スナップショット保存に失敗（次ステージは DB から読み込みます）: {e}")
+        return None
+
+def load_stage_snapshot(pointer: str, meeting_id: int, stage: str):
+    """
+    save_stage_snapshot のポインタからステージ出力を読み込む
+
+    ポインタがない、または読み込みに失敗した場合は None を返す（呼び出し元は DB から読み込む）。
+    """
+    parsed = parse_snapshot_pointer(pointer)
+    if parsed is None:
+        return None
+
+    scheme, location = parsed
+    try:
+        if scheme == "file":
+            with open(location, "rb") as f:
+                data = f.read()
+        else:
+            container_name, blob_name = location.split("/", 1)
+            container_client = get_snapshot_container_client()
+            if container_name != container_client.container_name:
+                raise ValueError(f"保存先コンテナーが一致しません: {container_name}")
+            data = container_client.download_blob(blob_name).readall()
+        rows = decode_snapshot(data, meeting_id, stage)
+        logging.info(f"📦 スナップショット読み込み: {pointer} ({len(rows)} 行)")
+        return rows
+    except Exception as e:
+        logging.warning(f"⚠️ スナップショット読み込みに失敗（DB から読み込みます）: {e}")
+        return None
+
+def priority_lanes_enabled() -> bool:
+    """PRIORITY_LANES_ENABLED が "true" の場合のみ会議をレーンに振り分ける（既定は無効）"""
+    return os.environ.get("PRIORITY_LANES_ENABLED", "false").lower() == "true"
+
+def resolve_meeting_lane(cursor, meeting_id: int, explicit: str = None) -> str:
+    """
+    会議の処理レーン（high / normal / bulk）を決定する
+
+    環境変数:
+        PRIORITY_HIGH_MAX_DURATION_SECONDS: この秒数以下の会議は high（既定 900、0 で判定しない）
+        PRIORITY_BULK_MIN_DURATION_SECONDS: この秒数以上の会議は bulk（既定 5400、0 で判定しない）
+        PRIORITY_HIGH_FOR_MANAGERS: "true" でマネージャー（Users.is_manager）の会議を high にする
+    """
+    if normalize_lane(explicit):
+        return normalize_lane(explicit)
+    if not priority_lanes_enabled():
+        return DEFAULT_LANE
+
+    cursor.execute("""
+        SELECT m.duration_seconds, u.is_manager
+        FROM dbo.Meetings m
+        LEFT JOIN dbo.Users u ON u.user_id = m.user_id
+        WHERE m.meeting_id = ?
+    """, (meeting_id,))
+    row = cursor.fetchone()
+    duration_seconds, is_manager = (row[0], row[1]) if row else (0, False)
+
+    return choose_lane(
+        duration_seconds,
+        is_manager=bool(is_manager),
+        high_max_duration=int(os.environ.get("PRIORITY_HIGH_MAX_DURATION_SECONDS", "900")),
+        bulk_min_duration=int(os.environ.get("PRIORITY_BULK_MIN_DURATION_SECONDS", "5400")),
+        high_for_managers=os.environ.get("PRIORITY_HIGH_FOR_MANAGERS", "false").lower() == "true"
+    )
+
+def get_queue_depth(queue_name: str) -> int:
+    """キューのおおよそのメッセージ数を取得する（取得失敗時は 0）"""
+    try:
+        return get_queue_client(queue_name).get_queue_properties().approximate_message_count or 0
+    except Exception as e:
+        logging.warning(f"⚠️ キュー長の取得に失敗 ({queue_name}): {e}")
+        return 0
+
+def yield_to_higher_lanes(stage_queue: str, lane: str, message_data: dict) -> bool:
+    """
+    上位レーンに滞留がある場合、重みに応じた確率でこのメッセージを後回しにする
+
+    後回しにしたメッセージは同じレーンのキューに可視化遅延付きで再投入し、True を返す。
+
+    環境変数:
+        PRIORITY_LANE_WEIGHTS: high,normal,bulk の重み（既定 "6,3,1"）
+        PRIORITY_YIELD_DELAY_SECONDS: 再投入時の可視化遅延（既定 30 秒）
+        PRIORITY_MAX_YIELDS: 1メッセージが後回しになる上限回数（既定 5、飢餓防止）
+    """
+    if not higher_lanes(lane):
+        return False
+
+    yield_count = int(message_data.get("yield_count", 0))
+    if yield_count >= int(os.environ.get("PRIORITY_MAX_YIELDS", "5")):
+        return False
+
+    weights = parse_lane_weights(os.environ.get("PRIORITY_LANE_WEIGHTS"))
+    depths = {h: get_queue_depth(lane_queue_name(stage_queue, h)) for h in higher_lanes(lane)}
+    if random.random() >= yield_probability(lane, depths, weights):
+        return False
+
+    delay = int(os.environ.get("PRIORITY_YIELD_DELAY_SECONDS", "30"))
+    send_queue_message(
+        lane_queue_name(stage_queue, lane),
+        {**message_data, "yield_count": yield_count + 1},
+        visibility_timeout=delay
+    )
+    logging.info(f"↪️ 上位レーンに滞留があるため後回し (lane={lane}, depths={depths}, yield_count={yield_count + 1})")
+    return True
+
+def handle_stage_failure(meeting_id, failed_status: str, table_name: str, function_name: str, error: Exception,
+                         lease: StageLease = None, expected_states: tuple = None):
+    """
+    ステージ処理失敗時の共通処理（TriggerLog 記録 + Meetings.status を failed に更新）
+
+    PIPELINE_STATE_ENABLED=true の場合は、claim したワーカー（lease）または expected_states の状態からのみ failed に遷移する。
+    claim 前の失敗（他のワーカーが処理中の可能性がある）では状態を変更しない。
+    """
+    log_trigger_error(
+        event_type="error",
+        table_name=table_name,
+        record_id=meeting_id if meeting_id else -1,
+        additional_info=f"[{function_name}] {str(error)}"
+    )
+
+    # エラー時はステータスを failed に更新（キュー再配信時は *_in_progress に戻り、チェックポイントから再開する）
     try:
-        logging.info("=== QueuePreprocessingFunc 開始 ===")
-        
-        # メッセージから meeting_id を取得
-        message_data = json.loads(message.get_body().decode('utf-8'))
-        meeting_id = message_data.get("meeting_id")
-        
-        if not meeting_id:
-            raise ValueError("メッセージに meeting_id が含まれていません")
-        
-        logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
-        
-        # ステータスを preprocessing_in_progress に更新
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'preprocessing_in_progress', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        # transcript_text を取得
-        cursor.execute("""
-            SELECT transcript_text FROM dbo.Meetings WHERE meeting_id = ?
-        """, (meeting_id,))
-        row = cursor.fetchone()
-        
-        if not row or not row[0]:
-            logging.warning(f"⚠️ transcript_text が存在しません (meeting_id={meeting_id})")
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'preprocessing_completed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
+        if lease is not None and lease.owner is not None:
+            fail_pipeline_stage(conn, lease, error)
             return
-        
-        transcript_text = row[0]
-        
-        # ステップ1: セグメント化処理
-        segments = step1_process_transcript(transcript_text)
-        
-        if not segments:
-            logging.warning(f"⚠️ ステップ1の出力が空です (meeting_id={meeting_id})")
+        if pipeline_state_enabled() and not expected_states:
+            logging.info(f"ℹ️ claim 前の失敗のため状態は変更しません (meeting_id={meeting_id})")
+            return
+        set_pipeline_state(conn, meeting_id, failed_status, expected_states, note=str(error)[:1000])
+        conn.commit()
+    except Exception as update_error:
+        logging.error(f"❌ ステータス更新失敗: {update_error}")
+
+def pipeline_state_enabled() -> bool:
+    """
+    PipelineStates による状態遷移の管理（claim・リース・遷移履歴）が有効か
+
+    環境変数:
+        PIPELINE_STATE_ENABLED: "true" で有効化（既定は無効。PipelineStates / PipelineStateTransitions の作成後に有効にする）
+        PIPELINE_LEASE_SECONDS: claim したステージのリース期間（既定 1800 秒。関数のタイムアウトより長くする）
+    """
+    return os.environ.get("PIPELINE_STATE_ENABLED", "false").lower() == "true"
+
+def get_pipeline_lease_seconds() -> int:
+    return max(60, int(os.environ.get("PIPELINE_LEASE_SECONDS", str(DEFAULT_LEASE_SECONDS))))
+
+def insert_state_transition(cursor, meeting_id: int, from_state, to_state: str, transitioned_at,
+                            lease_owner=None, from_state_seconds=None, note=None):
+    cursor.execute("""
+        INSERT INTO dbo.PipelineStateTransitions (
+            meeting_id, from_state, to_state, lease_owner, transitioned_datetime,
+            from_state_seconds, note, inserted_datetime
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, GETDATE())
+    """, (meeting_id, from_state, to_state, lease_owner, transitioned_at, from_state_seconds, note))
+
+def load_pipeline_state(cursor, meeting_id: int, now) -> PipelineState:
+    """
+    PipelineStates の行を取得する（未登録の場合は Meetings.status を初期状態として登録する）
+    """
+    query = """
+        SELECT meeting_id, state, version, lease_owner, lease_expires_datetime, state_entered_datetime
+        FROM dbo.PipelineStates
+        WHERE meeting_id = ?
+    """
+    cursor.execute(query, (meeting_id,))
+    row = cursor.fetchone()
+    if row:
+        return PipelineState(*row)
+
+    cursor.execute("""
+        INSERT INTO dbo.PipelineStates (meeting_id, state, version, state_entered_datetime, updated_datetime)
+        SELECT m.meeting_id, m.status, 0, ?, GETDATE()
+        FROM dbo.Meetings m
+        WHERE m.meeting_id = ?
+          AND NOT EXISTS (SELECT 1 FROM dbo.PipelineStates WITH (UPDLOCK, HOLDLOCK) WHERE meeting_id = ?)
+    """, (now, meeting_id, meeting_id))
+    seeded = cursor.rowcount == 1
+
+    cursor.execute(query, (meeting_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise ValueError(f"会議が存在しません (meeting_id={meeting_id})")
+    current = PipelineState(*row)
+    if seeded:
+        insert_state_transition(cursor, meeting_id, None, current.state, now, note="initial")
+    return current
+
+def write_pipeline_state(cursor, current: PipelineState, to_state: str, now,
+                         lease_owner: str = None, lease_expires=None, note: str = None) -> bool:
+    """
+    version が読み込み時と同じ場合のみ状態を更新する（compare-and-set）
+
+    更新できた場合は遷移履歴を記録し、Meetings.status にも同じ値を反映する（コミットは呼び出し側）。
+    ステージの状態（Meetings.status）はこの関数と set_pipeline_state のみが更新する。
+    """
+    cursor.execute("""
+        UPDATE dbo.PipelineStates
+        SET state = ?, version = version + 1, lease_owner = ?, lease_expires_datetime = ?,
+            state_entered_datetime = ?, updated_datetime = GETDATE()
+        WHERE meeting_id = ? AND version = ?
+    """, (to_state, lease_owner, lease_expires, now, current.meeting_id, current.version))
+    if cursor.rowcount != 1:
+        return False
+
+    insert_state_transition(cursor, current.meeting_id, current.state, to_state, now,
+                            lease_owner, seconds_in_state(current, now), note)
+    cursor.execute("""
+        UPDATE dbo.Meetings
+        SET status = ?, updated_datetime = GETDATE()
+        WHERE meeting_id = ?
+    """, (to_state, current.meeting_id))
+    return True
+
+def set_pipeline_state(conn, meeting_id: int, to_state: str, expected_states: tuple = None, note: str = None) -> bool:
+    """
+    リースを持たない状態遷移（シャードの分割・統合、再処理時のリセットなど）。コミットは呼び出し側
+
+    expected_states を指定した場合は、現在の状態がそのいずれかの場合のみ更新する。
+    状態管理が無効の場合は従来どおり Meetings.status のみを更新する。
+
+    Returns:
+        bool: 更新した場合は True
+    """
+    cursor = conn.cursor()
+    if not pipeline_state_enabled():
+        if expected_states:
+            cursor.execute(f"""
+                UPDATE dbo.Meetings
+                SET status = ?, updated_datetime = GETDATE()
+                WHERE meeting_id = ? AND status IN ({', '.join('?' for _ in expected_states)})
+            """, (to_state, meeting_id, *expected_states))
+        else:
             cursor.execute("""
                 UPDATE dbo.Meetings
-                SET status = 'preprocessing_completed', updated_datetime = GETDATE()
+                SET status = ?, updated_datetime = GETDATE()
                 WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-            return
-        
-        # 話者ごとの重複排除リストを作る
-        unique_speakers = list(set(seg["speaker"] for seg in segments))
-        
-        # meeting_id から user_id を取得
-        cursor.execute("SELECT user_id FROM dbo.BasicInfo WHERE meeting_id = ?", (meeting_id,))
+            """, (to_state, meeting_id))
+        return cursor.rowcount == 1
+
+    now = utc_now()
+    current = load_pipeline_state(cursor, meeting_id, now)
+    if expected_states and current.state not in expected_states:
+        return False
+    return write_pipeline_state(cursor, current, to_state, now, note=note)
+
+def get_pipeline_state_name(conn, meeting_id: int) -> str:
+    """現在の状態（状態管理が無効の場合は Meetings.status）"""
+    cursor = conn.cursor()
+    if pipeline_state_enabled():
+        state = load_pipeline_state(cursor, meeting_id, utc_now()).state
+    else:
+        cursor.execute("SELECT status FROM dbo.Meetings WHERE meeting_id = ?", (meeting_id,))
         row = cursor.fetchone()
-        user_id = row[0] if row else None
-        
-        # Speakers テーブルに話者を登録
-        for speaker_name in unique_speakers:
-            cursor.execute("""
-                SELECT 1 FROM dbo.Speakers
-                WHERE meeting_id = ? AND speaker_name = ? AND deleted_datetime IS NULL
-            """, (meeting_id, speaker_name))
-            exists = cursor.fetchone()
-            if not exists:
-                cursor.execute("""
-                    INSERT INTO dbo.Speakers (
-                        speaker_name, speaker_role, user_id, meeting_id,
-                        inserted_datetime, updated_datetime
-                    )
-                    VALUES (?, NULL, ?, ?, GETDATE(), GETDATE())
-                """, (speaker_name, user_id, meeting_id))
-                logging.info(f"👤 新しい話者をSpeakersテーブルに登録: {speaker_name}")
-        
-        # TranscriptProcessingSegments に挿入
-        for line_no, seg in enumerate(segments, start=1):
-            speaker = seg["speaker"]
-            text = seg["text"]
-            offset = seg["offset"]
-            is_filler = 1 if len(text.strip("（）")) < 10 else 0
-            
+        state = row[0] if row else None
+    conn.commit()
+    return state
+
+def claim_pipeline_stage(conn, meeting_id: int, stage: str):
+    """
+    ステージの処理を開始してよいか判定し、開始する場合はリース付きで {stage}_in_progress に遷移する
+
+    前ステージの完了状態・{stage}_failed・リース切れの {stage}_in_progress からのみ claim できる。
+    重複配信などで claim できない場合は None を返す（呼び出し側は何もせず終了する）。
+
+    Returns:
+        StageLease | None: 状態管理が無効の場合は owner=None の StageLease（常に開始する）
+    """
+    if not pipeline_state_enabled():
+        set_pipeline_state(conn, meeting_id, in_progress_state(stage))
+        conn.commit()
+        return StageLease(meeting_id, stage, None, None)
+
+    cursor = conn.cursor()
+    now = utc_now()
+    current = load_pipeline_state(cursor, meeting_id, now)
+    reason = decide_claim(stage, current, now)
+    if reason not in CLAIMABLE_REASONS:
+        conn.commit()
+        logging.info(f"⏭️ {stage} を開始しません (meeting_id={meeting_id}, state={current.state}, reason={reason})")
+        return None
+    if reason == "lease_expired":
+        logging.warning(f"⚠️ リース切れの {stage} を引き継ぎます (meeting_id={meeting_id}, owner={current.lease_owner})")
+
+    owner = new_lease_owner()
+    expires = lease_expiry(now, get_pipeline_lease_seconds())
+    claimed = write_pipeline_state(cursor, current, in_progress_state(stage), now, owner, expires, note=reason)
+    conn.commit()
+    if not claimed:
+        logging.info(f"⏭️ 他のワーカーが先に {stage} を開始しました (meeting_id={meeting_id})")
+        return None
+    return StageLease(meeting_id, stage, owner, expires)
+
+def release_pipeline_stage(conn, lease: StageLease, to_state: str, note: str = None) -> bool:
+    """
+    claim したワーカーとして状態を更新し、リースを解放する
+
+    状態管理が無効の場合（owner=None）は {stage}_in_progress（失敗時は {stage}_completed も）からのみ
+    Meetings.status を更新する。シャードに分割済みの状態は上書きしない。
+    """
+    if lease.owner is None:
+        expected_states = (in_progress_state(lease.stage),)
+        if to_state == failed_state(lease.stage):
+            expected_states += (completed_state(lease.stage),)
+        released = set_pipeline_state(conn, lease.meeting_id, to_state, expected_states, note=note)
+        conn.commit()
+        return released
+
+    cursor = conn.cursor()
+    now = utc_now()
+    current = load_pipeline_state(cursor, lease.meeting_id, now)
+    released, reason = can_release(current, lease)
+    if released:
+        released = write_pipeline_state(cursor, current, to_state, now, lease.owner, note=note)
+        reason = reason or "他のワーカーが同時に状態を更新しました"
+    conn.commit()
+
+    if not released:
+        if is_shard_state(lease.stage, current.state):
+            # シャードに分割した場合は dispatch_stage_shards が状態を更新済み
+            logging.info(f"ℹ️ {lease.stage} はシャード実行に移行済みです (meeting_id={lease.meeting_id})")
+        else:
+            logging.warning(f"⚠️ {to_state} に遷移できません (meeting_id={lease.meeting_id}): {reason}")
+    return released
+
+def complete_pipeline_stage(conn, lease: StageLease) -> bool:
+    """
+    claim したステージを完了状態に遷移する
+
+    Returns:
+        bool: False の場合はリースを失っている（他のワーカーが引き継いだ）ため、次のキューに投入しない
+    """
+    return release_pipeline_stage(conn, lease, completed_state(lease.stage))
+
+def fail_pipeline_stage(conn, lease: StageLease, error: Exception) -> bool:
+    """claim したステージを失敗状態に遷移する（完了後・次ステージの claim 前の失敗も含む）"""
+    return release_pipeline_stage(conn, lease, failed_state(lease.stage), note=str(error)[:1000])
+
+def get_checkpoint_batch_size() -> int:
+    """
+    チェックポイント（途中経過のコミット）の間隔を取得する
+
+    LLM 呼び出しを伴う処理はこの件数ごとにコミットし、リトライ時は完了済みの行をスキップする。
+    """
+    return max(1, int(os.environ.get("CHECKPOINT_BATCH_SIZE", "10")))
+
+def commit_checkpoint(conn, processed_count: int, batch_size: int):
+    """processed_count が batch_size の倍数に達したら途中経過をコミットする"""
+    if processed_count and processed_count % batch_size == 0:
+        conn.commit()
+        logging.info(f"💾 チェックポイント保存: {processed_count} 件処理済み")
+
+def save_stage_metrics(metrics: StageMetrics, conn=None):
+    """
+    ステージ計測値を PipelineStageMetrics に記録する（記録失敗で本処理は止めない）
+
+    環境変数:
+        STAGE_METRICS_ENABLED: "false" で記録しない（既定は有効）
+    """
+    if os.environ.get("STAGE_METRICS_ENABLED", "true").lower() != "true":
+        return
+
+    try:
+        target = unwrap_connection(conn) if conn is not None else get_db_connection()
+        if metrics.status == "failed":
+            # 失敗したステージの未コミット分を破棄してから記録する
+            target.rollback()
+        cursor = target.cursor()
+        cursor.execute("""
+            INSERT INTO dbo.PipelineStageMetrics (
+                meeting_id, stage, lane, status, via_fast_path, dequeue_count,
+                enqueued_datetime, dequeued_datetime, started_datetime, ended_datetime,
+                item_count, db_round_trips, llm_calls, error_message, inserted_datetime
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """, metrics.as_row())
+        target.commit()
+    except Exception as e:
+        logging.warning(f"⚠️ ステージ計測値の記録に失敗 (meeting_id={metrics.meeting_id}, stage={metrics.stage}): {e}")
+
+@contextmanager
+def track_stage(meeting_id: int, stage: str, message: func.QueueMessage = None, message_data: dict = None,
+                received_at=None, via_fast_path: bool = False, lane: str = DEFAULT_LANE):
+    """
+    ステージ1回分の待ち時間・処理時間・DB往復回数・LLM呼び出し回数を計測して記録する
+
+    使用例:
+        with track_stage(meeting_id, "merging", message, message_data, received_at) as metrics:
+            conn = metrics.wrap_connection(get_db_connection())
+            result = run_merging_stage(conn, meeting_id)
+            metrics.item_count = len(result or [])
+    """
+    metrics = StageMetrics(meeting_id, stage, via_fast_path=via_fast_path, lane=lane)
+    if message is not None:
+        metrics.bind_message(
+            message_data or {},
+            insertion_time=getattr(message, "insertion_time", None),
+            dequeue_count=getattr(message, "dequeue_count", None),
+            received_at=received_at
+        )
+
+    llm_counter_token = set_llm_call_counter(metrics.llm_counter)
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.finish("failed", e)
+        save_stage_metrics(metrics, metrics.connection)
+        raise
+    finally:
+        set_llm_call_counter(None, llm_counter_token)
+
+    metrics.finish("completed")
+    save_stage_metrics(metrics, metrics.connection)
+
+def load_transcript_processing_records(cursor, meeting_id: int, start_line: int = None, end_line: int = None) -> list:
+    """
+    保存済みの TranscriptProcessingSegments を run_preprocessing_stage と同じ形式で読み込む
+
+    start_line / end_line を指定した場合はその範囲（両端を含む）のみ読み込む。
+    """
+    cursor.execute("""
+        SELECT line_no, speaker, transcript_text_segment, offset_seconds, is_filler,
+               front_score, after_score, merged_text_with_prev, merged_text_with_next, delete_candidate_word
+        FROM dbo.TranscriptProcessingSegments
+        WHERE meeting_id = ? AND line_no BETWEEN ? AND ?
+        ORDER BY line_no
+    """, (meeting_id, start_line if start_line is not None else 0,
+          end_line if end_line is not None else 2147483647))
+    columns = [
+        "line_no", "speaker", "transcript_text_segment", "offset_seconds", "is_filler",
+        "front_score", "after_score", "merged_text_with_prev", "merged_text_with_next", "delete_candidate_word"
+    ]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def insert_transcript_processing_records(conn, meeting_id: int, transcript_text: str):
+    """
+    ステップ1: セグメント化して Speakers / TranscriptProcessingSegments に登録する
+
+    登録後にコミットし、以降のリトライではこの結果を再利用する。
+
+    Returns:
+        list[dict] | None: 登録したセグメント（line_no 順）。セグメントが抽出できない場合は None
+    """
+    cursor = conn.cursor()
+
+    # ステップ1: セグメント化処理
+    segments = step1_process_transcript(transcript_text)
+
+    if not segments:
+        logging.warning(f"⚠️ ステップ1の出力が空です (meeting_id={meeting_id})")
+        conn.commit()
+        return None
+
+    # 話者ごとの重複排除リストを作る
+    unique_speakers = list(set(seg["speaker"] for seg in segments))
+
+    # meeting_id から user_id を取得
+    cursor.execute("SELECT user_id FROM dbo.BasicInfo WHERE meeting_id = ?", (meeting_id,))
+    row = cursor.fetchone()
+    user_id = row[0] if row else None
+
+    # Speakers テーブルに話者を登録
+    for speaker_name in unique_speakers:
+        cursor.execute("""
+            SELECT 1 FROM dbo.Speakers
+            WHERE meeting_id = ? AND speaker_name = ? AND deleted_datetime IS NULL
+        """, (meeting_id, speaker_name))
+        exists = cursor.fetchone()
+        if not exists:
             cursor.execute("""
-                INSERT INTO dbo.TranscriptProcessingSegments (
-                    meeting_id, line_no, speaker, transcript_text_segment,
-                    offset_seconds, is_filler,
-                    front_score, after_score,
+                INSERT INTO dbo.Speakers (
+                    speaker_name, speaker_role, user_id, meeting_id,
                     inserted_datetime, updated_datetime
                 )
-                VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, GETDATE(), GETDATE())
-            """, (
-                meeting_id, line_no, speaker, text,
-                offset, is_filler
-            ))
-            
-            logging.info(f"[DB] Inserted TranscriptProcessingSegment: meeting_id={meeting_id}, line_no={line_no}, speaker={speaker}")
-        
-        # ステップ2: フィラースコアリング
+                VALUES (?, NULL, ?, ?, GETDATE(), GETDATE())
+            """, (speaker_name, user_id, meeting_id))
+            logging.info(f"👤 新しい話者をSpeakersテーブルに登録: {speaker_name}")
+
+    # TranscriptProcessingSegments に挿入（後続ステップ用にメモリ上にも保持）
+    records = []
+    for line_no, seg in enumerate(segments, start=1):
+        speaker = seg["speaker"]
+        text = seg["text"]
+        offset = seg["offset"]
+        is_filler = 1 if len(text.strip("（）")) < 10 else 0
+
         cursor.execute("""
-            SELECT line_no, transcript_text_segment
-            FROM dbo.TranscriptProcessingSegments
-            WHERE meeting_id = ? AND is_filler = 1
-            ORDER BY line_no
-        """, (meeting_id,))
-        filler_segments = cursor.fetchall()
-        
-        for (line_no, text) in filler_segments:
-            logging.info(f"[FILLER] Processing line {line_no}, text: '{text}'")
-            
-            # 前後のセグメントを取得
-            cursor.execute("""
-                SELECT transcript_text_segment FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no - 1))
-            prev_row = cursor.fetchone()
-            prev_text = prev_row[0] if prev_row else ""
+            INSERT INTO dbo.TranscriptProcessingSegments (
+                meeting_id, line_no, speaker, transcript_text_segment,
+                offset_seconds, is_filler,
+                front_score, after_score,
+                inserted_datetime, updated_datetime
+            )
+            VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, GETDATE(), GETDATE())
+        """, (
+            meeting_id, line_no, speaker, text,
+            offset, is_filler
+        ))
 
-            cursor.execute("""
-                SELECT transcript_text_segment FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no + 1))
-            next_row = cursor.fetchone()
-            next_text = next_row[0] if next_row else ""
-
-            front_text = prev_text.strip("。")
-            back_text = next_text.strip("。")
-            bracket_text = text.strip("（）")
-
-            # フィラー判定補助カラムの構築
-            merged_text_with_prev = ""
-            merged_text_with_next = ""
-
-            # merged_text_with_prev: 前のセグメントの最後の文 + 現在の文
-            if prev_text and prev_text.strip():
-                prev_sentences = [s.strip() for s in prev_text.strip().split("。") if s.strip()]
-                if prev_sentences:
-                    prev_last_sentence = prev_sentences[-1]
-                    merged_text_with_prev = prev_last_sentence + bracket_text
-                else:
-                    logging.warning(f"[FILLER] No valid sentences found in prev_text")
+        records.append({
+            "line_no": line_no,
+            "speaker": speaker,
+            "transcript_text_segment": text,
+            "offset_seconds": offset,
+            "is_filler": is_filler,
+            "front_score": None,
+            "after_score": None,
+            "merged_text_with_prev": None,
+            "merged_text_with_next": None,
+            "delete_candidate_word": None
+        })
+
+        logging.info(f"[DB] Inserted TranscriptProcessingSegment: meeting_id={meeting_id}, line_no={line_no}, speaker={speaker}")
+
+    # セグメント登録をチェックポイントとしてコミット
+    conn.commit()
+    return records
+
+def score_filler_records(conn, meeting_id: int, records: list, records_by_line: dict,
+                         start_line: int = None, end_line: int = None, sentence_index: DeletionIndex = None):
+    """
+    ステップ2: フィラー行の前後結合文を作成し、自然さスコアを保存する（スコア済みの行はスキップ）
+
+    Args:
+        records: TranscriptProcessingSegments 行（dict）。更新内容は各 dict にも反映する
+        records_by_line: line_no → record。前後の行の参照に使用する
+        start_line, end_line: 指定した場合はこの範囲のフィラー行のみ処理する（シャード実行用）
+        sentence_index: 前後の行の文分割の索引（ステップ3と共有する場合に指定）
+    """
+    cursor = conn.cursor()
+    if sentence_index is None:
+        sentence_index = DeletionIndex(records_by_line.values())
+    filler_records = [
+        record for record in records
+        if record["is_filler"]
+        and (start_line is None or record["line_no"] >= start_line)
+        and (end_line is None or record["line_no"] <= end_line)
+    ]
+    batch_size = get_checkpoint_batch_size()
+
+    scored_count = 0
+    for record in filler_records:
+        line_no = record["line_no"]
+        text = record["transcript_text_segment"]
+        if record["front_score"] is not None and record["after_score"] is not None:
+            logging.info(f"[FILLER] Skip line {line_no} (scored in previous attempt)")
+            continue
+        logging.info(f"[FILLER] Processing line {line_no}, text: '{text}'")
+
+        # 前後のセグメントを取得
+        prev_record = records_by_line.get(line_no - 1)
+        prev_text = prev_record["transcript_text_segment"] if prev_record else ""
+
+        next_record = records_by_line.get(line_no + 1)
+        next_text = next_record["transcript_text_segment"] if next_record else ""
+
+        front_text = prev_text.strip("。")
+        back_text = next_text.strip("。")
+        bracket_text = text.strip("（）")
+
+        # フィラー判定補助カラムの構築
+        merged_text_with_prev = ""
+        merged_text_with_next = ""
+
+        # merged_text_with_prev: 前のセグメントの最後の文 + 現在の文
+        if prev_text and prev_text.strip():
+            prev_sentences = sentence_index.sentences(line_no - 1)
+            if prev_sentences:
+                prev_last_sentence = prev_sentences[-1]
+                merged_text_with_prev = prev_last_sentence + bracket_text
             else:
-                logging.warning(f"[FILLER] Prev text is empty for line {line_no - 1}")
-
-            # merged_text_with_next: 現在の文（。を除く）+ 次のセグメントの最初の文
-            if next_text and next_text.strip():
-                next_sentences = [s.strip() for s in next_text.strip().split("。") if s.strip()]
-                if next_sentences:
-                    next_first_sentence = next_sentences[0]
-                    merged_text_with_next = bracket_text.strip("。") + next_first_sentence
-                else:
-                    logging.warning(f"[FILLER] No valid sentences found in next_text")
+                logging.warning(f"[FILLER] No valid sentences found in prev_text")
+        else:
+            logging.warning(f"[FILLER] Prev text is empty for line {line_no - 1}")
+
+        # merged_text_with_next: 現在の文（。を除く）+ 次のセグメントの最初の文
+        if next_text and next_text.strip():
+            next_sentences = sentence_index.sentences(line_no + 1)
+            if next_sentences:
+                next_first_sentence = next_sentences[0]
+                merged_text_with_next = bracket_text.strip("。") + next_first_sentence
             else:
-                logging.warning(f"[FILLER] Next text is empty for line {line_no + 1}")
+                logging.warning(f"[FILLER] No valid sentences found in next_text")
+        else:
+            logging.warning(f"[FILLER] Next text is empty for line {line_no + 1}")
 
-            # merged_text_with_prev/nextを使用してOpenAI APIで自然さスコア判定
-            front_score = 0.0
-            back_score = 0.0
-            
+        # merged_text_with_prev/nextを使用してOpenAI APIで自然さスコア判定
+        front_score = 0.0
+        back_score = 0.0
+
+        if merged_text_with_prev and merged_text_with_prev.strip():
+            try:
+                front_score = get_naturalness_score(merged_text_with_prev)
+            except Exception as e:
+                logging.warning(f"[FILLER] Front score calculation failed: {e}")
+                front_score = 0.5  # フォールバックスコア
+        else:
+            front_score = 0.5
+
+        if merged_text_with_next and merged_text_with_next.strip():
+            try:
+                back_score = get_naturalness_score(merged_text_with_next)
+            except Exception as e:
+                logging.warning(f"[FILLER] Back score calculation failed: {e}")
+                back_score = 0.5  # フォールバックスコア
+        else:
+            back_score = 0.5
+
+        # DB更新（補助カラムも含めて）
+        cursor.execute("""
+            UPDATE dbo.TranscriptProcessingSegments
+            SET front_score = ?, after_score = ?,
+                merged_text_with_prev = ?, merged_text_with_next = ?,
+                updated_datetime = GETDATE()
+            WHERE meeting_id = ? AND line_no = ?
+        """, (front_score, back_score, merged_text_with_prev, merged_text_with_next, meeting_id, line_no))
+
+        record.update({
+            "front_score": front_score,
+            "after_score": back_score,
+            "merged_text_with_prev": merged_text_with_prev,
+            "merged_text_with_next": merged_text_with_next
+        })
+
+        logging.info(f"[FILLER] Updated line {line_no} with scores: front={front_score}, back={back_score}")
+
+        scored_count += 1
+        commit_checkpoint(conn, scored_count, batch_size)
+
+def insert_revision_candidates(cursor, meeting_id: int, records: list, records_by_line: dict,
+                               sentence_index: DeletionIndex = None):
+    """
+    ステップ3: フィラー行のスコアから補完に使われた文を特定し、delete_candidate_word を保存する
+    """
+    if sentence_index is None:
+        sentence_index = DeletionIndex(records_by_line.values())
+    filler_records = [record for record in records if record["is_filler"]]
+
+    for record in filler_records:
+        line_no = record["line_no"]
+        front_score = record["front_score"]
+        after_score = record["after_score"]
+        logging.info(f"[REVISION] Processing line {line_no}, front_score={front_score}, after_score={after_score}")
+
+        merged_text_with_prev = record["merged_text_with_prev"] or ""
+        merged_text_with_next = record["merged_text_with_next"] or ""
+
+        delete_candidate = None
+
+        # 前後のセグメント（delete_candidate_word生成用）
+        prev_record = records_by_line.get(line_no - 1)
+        prev_text = prev_record["transcript_text_segment"] if prev_record else ""
+
+        next_record = records_by_line.get(line_no + 1)
+        next_text = next_record["transcript_text_segment"] if next_record else ""
+
+        # 前後の文から構成元を抽出
+        prev_last_sentence = ""
+        next_first_sentence = ""
+
+        if prev_text and prev_text.strip():
+            prev_sentences = sentence_index.sentences(line_no - 1)
+            if prev_sentences:
+                prev_last_sentence = prev_sentences[-1]
+
+        if next_text and next_text.strip():
+            next_sentences = sentence_index.sentences(line_no + 1)
+            if next_sentences:
+                next_first_sentence = next_sentences[0]
+
+        # スコアに基づいて補完に使われた文を特定し、その構成元をdelete_candidate_wordに格納
+        if front_score > after_score:
+            # front_scoreが高い（より自然）→ merged_text_with_prevが採用された
             if merged_text_with_prev and merged_text_with_prev.strip():
-                try:
-                    front_score = get_naturalness_score(merged_text_with_prev)
-                except Exception as e:
-                    logging.warning(f"[FILLER] Front score calculation failed: {e}")
-                    front_score = 0.5  # フォールバックスコア
+                delete_candidate = prev_last_sentence.rstrip("。") + "。"  # 前の文の最後の文を削除候補とする（語尾に「。」を付与）
+                logging.info(f"[REVISION] Using merged_text_with_prev (front_score={front_score} > after_score={after_score}), delete_candidate: '{delete_candidate}'")
             else:
-                front_score = 0.5
-
+                logging.warning(f"[REVISION] merged_text_with_prev is empty")
+        else:
+            # after_scoreが高い（より自然）→ merged_text_with_nextが採用された
             if merged_text_with_next and merged_text_with_next.strip():
-                try:
-                    back_score = get_naturalness_score(merged_text_with_next)
-                except Exception as e:
-                    logging.warning(f"[FILLER] Back score calculation failed: {e}")
-                    back_score = 0.5  # フォールバックスコア
+                delete_candidate = next_first_sentence.rstrip("。") + "。"  # 次の文の最初の文を削除候補とする（語尾に「。」を付与）
+                logging.info(f"[REVISION] Using merged_text_with_next (front_score={front_score} <= after_score={after_score}), delete_candidate: '{delete_candidate}'")
             else:
-                back_score = 0.5
+                logging.warning(f"[REVISION] merged_text_with_next is empty")
 
-            # DB更新（補助カラムも含めて）
-            cursor.execute("""
-                UPDATE dbo.TranscriptProcessingSegments
-                SET front_score = ?, after_score = ?, 
-                    merged_text_with_prev = ?, merged_text_with_next = ?,
-                    updated_datetime = GETDATE()
-                WHERE meeting_id = ? AND line_no = ?
-            """, (front_score, back_score, merged_text_with_prev, merged_text_with_next, meeting_id, line_no))
-
-            logging.info(f"[FILLER] Updated line {line_no} with scores: front={front_score}, back={back_score}")
-        
-        # ステップ3: 補完候補挿入
+        # filler 行に delete_candidate_word のみを更新（revised_text_segment は使用しない）
         cursor.execute("""
-            SELECT line_no, transcript_text_segment, front_score, after_score
-            FROM dbo.TranscriptProcessingSegments
-            WHERE meeting_id = ? AND is_filler = 1
-            ORDER BY line_no
-        """, (meeting_id,))
-        filler_segments = cursor.fetchall()
-        
-        for line_no, text, front_score, after_score in filler_segments:
-            logging.info(f"[REVISION] Processing line {line_no}, front_score={front_score}, after_score={after_score}")
-            
-            # merged_text_with_prev/nextを取得
-            cursor.execute("""
-                SELECT merged_text_with_prev, merged_text_with_next FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no))
-            row = cursor.fetchone()
-            merged_text_with_prev = row[0] if row and row[0] else ""
-            merged_text_with_next = row[1] if row and row[1] else ""
-            
-            delete_candidate = None
-            
-            # 前後のセグメントを再取得（delete_candidate_word生成用）
-            cursor.execute("""
-                SELECT transcript_text_segment FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no - 1))
-            prev_row = cursor.fetchone()
-            prev_text = prev_row[0] if prev_row else ""
+            UPDATE dbo.TranscriptProcessingSegments
+            SET delete_candidate_word = ?, updated_datetime = GETDATE()
+            WHERE meeting_id = ? AND line_no = ?
+        """, (delete_candidate, meeting_id, line_no))
+        record["delete_candidate_word"] = delete_candidate
 
-            cursor.execute("""
-                SELECT transcript_text_segment FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no + 1))
-            next_row = cursor.fetchone()
-            next_text = next_row[0] if next_row else ""
-            
-            # 前後の文から構成元を抽出
-            prev_last_sentence = ""
-            next_first_sentence = ""
-            
-            if prev_text and prev_text.strip():
-                prev_sentences = [s.strip() for s in prev_text.strip().split("。") if s.strip()]
-                if prev_sentences:
-                    prev_last_sentence = prev_sentences[-1]
-            
-            if next_text and next_text.strip():
-                next_sentences = [s.strip() for s in next_text.strip().split("。") if s.strip()]
-                if next_sentences:
-                    next_first_sentence = next_sentences[0]
-            
-            # スコアに基づいて補完に使われた文を特定し、その構成元をdelete_candidate_wordに格納
-            if front_score > after_score:
-                # front_scoreが高い（より自然）→ merged_text_with_prevが採用された
-                if merged_text_with_prev and merged_text_with_prev.strip():
-                    delete_candidate = prev_last_sentence.rstrip("。") + "。"  # 前の文の最後の文を削除候補とする（語尾に「。」を付与）
-                    logging.info(f"[REVISION] Using merged_text_with_prev (front_score={front_score} > after_score={after_score}), delete_candidate: '{delete_candidate}'")
-                else:
-                    logging.warning(f"[REVISION] merged_text_with_prev is empty")
-            else:
-                # after_scoreが高い（より自然）→ merged_text_with_nextが採用された
-                if merged_text_with_next and merged_text_with_next.strip():
-                    delete_candidate = next_first_sentence.rstrip("。") + "。"  # 次の文の最初の文を削除候補とする（語尾に「。」を付与）
-                    logging.info(f"[REVISION] Using merged_text_with_next (front_score={front_score} <= after_score={after_score}), delete_candidate: '{delete_candidate}'")
-                else:
-                    logging.warning(f"[REVISION] merged_text_with_next is empty")
-            
-            # filler 行に delete_candidate_word のみを更新（revised_text_segment は使用しない）
-            cursor.execute("""
-                UPDATE dbo.TranscriptProcessingSegments
-                SET delete_candidate_word = ?, updated_datetime = GETDATE()
-                WHERE meeting_id = ? AND line_no = ?
-            """, (delete_candidate, meeting_id, line_no))
-        
-        # ステータス更新
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'preprocessing_completed', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
+def run_preprocessing_stage(conn, meeting_id: int, lane: str = DEFAULT_LANE, allow_sharding: bool = False):
+    """
+    ステップ1-3: セグメント化、フィラースコア、補完候補を TranscriptProcessingSegments に保存
+
+    Args:
+        lane: 後続キューのレーン（シャード実行時に引き継ぐ）
+        allow_sharding: True の場合、長い会議はシャードに分割してキュー経由で並列実行する
+
+    Returns:
+        list[dict] | None: 保存した TranscriptProcessingSegments 行（line_no 順）。
+            後続ステージ不要、またはシャードに分割した場合は None
+    """
+    cursor = conn.cursor()
+
+    # transcript_text を取得
+    cursor.execute("""
+        SELECT transcript_text FROM dbo.Meetings WHERE meeting_id = ?
+    """, (meeting_id,))
+    row = cursor.fetchone()
+
+    if not row or not row[0]:
+        logging.warning(f"⚠️ transcript_text が存在しません (meeting_id={meeting_id})")
         conn.commit()
-        logging.info(f"✅ Preprocessing完了 → status=preprocessing_completed (meeting_id={meeting_id})")
-        
-        # 次のキューにメッセージ送信
-        send_queue_message("queue-merging", {"meeting_id": meeting_id})
-        
-    except Exception as e:
-        logging.exception(f"❌ QueuePreprocessingFunc エラー (meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}): {e}")
-        log_trigger_error(
-            event_type="error",
-            table_name="TranscriptProcessingSegments",
-            record_id=meeting_id if 'meeting_id' in locals() else -1,
-            additional_info=f"[queue_preprocessing_func] {str(e)}"
-        )
-        
-        # エラー時はステータスを failed に更新
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'preprocessing_failed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-        except Exception as update_error:
-            logging.error(f"❌ ステータス更新失敗: {update_error}")
+        return None
+
+    transcript_text = row[0]
+
+    # 前回の試行でセグメント登録済みであれば再利用する（重複 INSERT 防止）
+    records = load_transcript_processing_records(cursor, meeting_id)
+    if records:
+        logging.info(f"🔁 TranscriptProcessingSegments 登録済みのため途中から再開 (meeting_id={meeting_id}, segments={len(records)})")
+    else:
+        records = insert_transcript_processing_records(conn, meeting_id, transcript_text)
+        if records is None:
+            return None
+
+    # 長い会議はステップ2をシャードに分割して並列実行し、ステップ3は全シャード完了後にまとめて行う
+    if allow_sharding and dispatch_stage_shards(
+        conn, meeting_id, "preprocessing", [(r["line_no"], r["speaker"]) for r in records], lane
+    ):
+        return None
+
+    # 文の分割はステップ2・3で共有する（各行1回のみ）
+    records_by_line = {record["line_no"]: record for record in records}
+    sentence_index = DeletionIndex(records)
+    score_filler_records(conn, meeting_id, records, records_by_line, sentence_index=sentence_index)
+    insert_revision_candidates(cursor, meeting_id, records, records_by_line, sentence_index)
+
+    conn.commit()
+    logging.info(f"✅ Preprocessing完了 → status=preprocessing_completed (meeting_id={meeting_id})")
+    return records
+
+def load_processed_transcript_rows(cursor, meeting_id: int, start_line: int = None, end_line: int = None) -> list:
+    """
+    保存済みの ProcessedTranscriptSegments を (id, merged_text, cleaned_text, speaker, offset_seconds) で読み込む
 
-@app.function_name(name="QueueMergingAndCleanupFunc")
-@app.queue_trigger(arg_name="message", queue_name="queue-merging", connection="AzureWebJobsStorage")
-def queue_merging_and_cleanup_func(message: func.QueueMessage):
+    start_line / end_line を指定した場合はその範囲（両端を含む）のみ読み込む。
     """
-    ステップ4-6: セグメント統合、話者ごと整形、OpenAIフィラー除去 → ProcessedTranscriptSegments に保存
+    cursor.execute("""
+        SELECT id, merged_text, cleaned_text, speaker, offset_seconds
+        FROM dbo.ProcessedTranscriptSegments
+        WHERE meeting_id = ? AND line_no BETWEEN ? AND ?
+        ORDER BY line_no
+    """, (meeting_id, start_line if start_line is not None else 0,
+          end_line if end_line is not None else 2147483647))
+    return cursor.fetchall()
+
+def insert_processed_transcript_segments(conn, meeting_id: int, segment_records=None) -> bool:
     """
-    try:
-        logging.info("=== QueueMergingAndCleanupFunc 開始 ===")
-        
-        # メッセージから meeting_id を取得
-        message_data = json.loads(message.get_body().decode('utf-8'))
-        meeting_id = message_data.get("meeting_id")
-        
-        if not meeting_id:
-            raise ValueError("メッセージに meeting_id が含まれていません")
-        
-        logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
-        
-        # ステータスを merging_in_progress に更新
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'merging_in_progress', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        # TranscriptProcessingSegments からデータ取得（バッチ処理で最適化）
-        cursor.execute("""
-            SELECT line_no, speaker, transcript_text_segment, merged_text_with_prev, merged_text_with_next, 
-                   offset_seconds, delete_candidate_word, front_score, after_score
-            FROM dbo.TranscriptProcessingSegments
-            WHERE meeting_id = ?
-            ORDER BY line_no
-        """, (meeting_id,))
-        segments = cursor.fetchall()
-        
-        if not segments:
-            logging.warning(f"⚠️ TranscriptProcessingSegments にデータがありません (meeting_id={meeting_id})")
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'merging_completed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-            return
-        
-        # ステップ4: 話者連続ブロック構造でのフィラー除去・文脈補完付きセグメント整形
-        
-        # ステップ①：発話ブロックの構築（is_filler=Falseの行のみ対象）
-        speaker_blocks = []
-        current_block = None
-        
-        for idx, (line_no, speaker, transcript_text, merged_text_with_prev, merged_text_with_next, 
-                  offset_seconds, delete_candidate_word, front_score, after_score) in enumerate(segments):
-            
-            # is_filler判定
-            cursor.execute("""
-                SELECT is_filler FROM dbo.TranscriptProcessingSegments 
-                WHERE meeting_id = ? AND line_no = ?
-            """, (meeting_id, line_no))
-            is_filler_row = cursor.fetchone()
-            is_filler = is_filler_row[0] if is_filler_row else 0
-            
-            # is_filler=Falseの行のみをブロック対象とする
-            if not is_filler:
-                if current_block is None:
-                    # 新しいブロック開始
-                    current_block = {
-                        "speaker": speaker,
-                        "start_line_no": line_no,
-                        "end_line_no": line_no,
-                        "start_offset": offset_seconds
-                    }
-                elif current_block["speaker"] == speaker:
-                    # 同一話者のブロック継続
-                    current_block["end_line_no"] = line_no
-                else:
-                    # 話者が変わった場合、前のブロックを保存して新しいブロック開始
-                    speaker_blocks.append(current_block)
-                    current_block = {
-                        "speaker": speaker,
-                        "start_line_no": line_no,
-                        "end_line_no": line_no,
-                        "start_offset": offset_seconds
-                    }
-        
-        # 最後のブロックも忘れずに保存
-        if current_block is not None:
-            speaker_blocks.append(current_block)
-        
-        logging.info(f"[STEP4] Created {len(speaker_blocks)} speaker blocks: {speaker_blocks}")
-        
-        # ステップ②：各ブロック内のマージ済み発話を構築
-        processed_blocks = []
-        
-        for block in speaker_blocks:
-            speaker = block["speaker"]
-            start_line_no = block["start_line_no"]
-            end_line_no = block["end_line_no"]
-            start_offset = block["start_offset"]
-            
-            logging.info(f"[STEP4] Processing block: speaker={speaker}, lines={start_line_no}-{end_line_no}")
-            
-            # ブロック内の全セグメントを取得（is_filler=Trueも含む）
-            cursor.execute("""
-                SELECT line_no, transcript_text_segment, merged_text_with_prev, merged_text_with_next,
-                       delete_candidate_word, front_score, after_score, is_filler
-                FROM dbo.TranscriptProcessingSegments
-                WHERE meeting_id = ? AND line_no BETWEEN ? AND ?
-                ORDER BY line_no
-            """, (meeting_id, start_line_no, end_line_no))
-            block_segments = cursor.fetchall()
-            
-            logging.info(f"[STEP4] Found {len(block_segments)} segments in block {start_line_no}-{end_line_no}")
-            
-            merged_text_parts = []
-            
-            for seg_idx, (line_no, transcript_text, merged_text_with_prev, merged_text_with_next,
-                         delete_candidate_word, front_score, after_score, is_filler) in enumerate(block_segments):
-                
-                logging.info(f"[STEP4] Processing segment {line_no}, is_filler={is_filler}, "
-                           f"front_score={front_score}, after_score={after_score}")
-                
-                if not is_filler:
-                    # 非フィラー行：そのまま追加
-                    merged_text_parts.append(transcript_text)
-                    logging.info(f"[STEP4] Added non-filler text: '{transcript_text[:50]}...'")
-                    
-                    # 前のフィラー行からの補完テキストがある場合は追加
-                    if seg_idx > 0:
-                        prev_seg = block_segments[seg_idx - 1]
-                        prev_line_no, prev_transcript_text, prev_merged_text_with_prev, prev_merged_text_with_next, \
-                        prev_delete_candidate_word, prev_front_score, prev_after_score, prev_is_filler = prev_seg
-                        
-                        if prev_is_filler and prev_after_score >= prev_front_score:
-                            # 前のフィラー行がafter_score >= front_scoreの場合、補完テキストを追加
-                            if prev_merged_text_with_next and prev_merged_text_with_next.strip():
-                                complement_text = f"({prev_merged_text_with_next})"
-                            else:
-                                complement_text = f"({prev_transcript_text})"
-                            
-                            merged_text_parts[-1] = f"{merged_text_parts[-1]}{complement_text}"
-                            logging.info(f"[STEP4] Added complement from previous filler: '{complement_text[:100]}...'")
-                
-                else:
-                    # フィラー行：補完処理
-                    if delete_candidate_word and delete_candidate_word.strip():
-                        logging.info(f"[STEP4] Processing filler with delete_candidate_word: '{delete_candidate_word}'")
-                        
-                        if front_score > after_score:
-                            # front_score > after_score: 前の文からdelete_candidate_wordを削除し、merged_text_with_prevを挿入
-                            if seg_idx > 0 and merged_text_parts:
-                                # 前の文からdelete_candidate_wordを削除
-                                delete_pattern = re.escape(delete_candidate_word.strip())
-                                prev_text = merged_text_parts[-1]
-                                cleaned_prev_text = re.sub(f"{delete_pattern}[。]?\\s*", "", prev_text)
-                                
-                                logging.info(f"[STEP4] Removed '{delete_candidate_word}' from prev_text: '{prev_text}' -> '{cleaned_prev_text}'")
-                                
-                                # 補完テキストを結合（前の文に追加）
-                                if merged_text_with_prev and merged_text_with_prev.strip():
-                                    complement_text = f"({merged_text_with_prev})"
-                                else:
-                                    complement_text = f"({transcript_text})"
-                                
-                                merged_text_parts[-1] = f"{cleaned_prev_text}{complement_text}"
-                                logging.info(f"[STEP4] Applied front_score > after_score merge: '{merged_text_parts[-1][:100]}...'")
-                            
-                        elif after_score >= front_score:
-                            # after_score >= front_score: 次の文にmerged_text_with_nextを付加し、次のセグメントのdelete_candidate_wordを削除
-                            
-                            # 次のセグメントが存在し、非フィラーの場合
-                            if seg_idx + 1 < len(block_segments):
-                                next_seg = block_segments[seg_idx + 1]
-                                next_line_no, next_transcript_text, next_merged_text_with_prev, next_merged_text_with_next, \
-                                next_delete_candidate_word, next_front_score, next_after_score, next_is_filler = next_seg
-                                
-                                if not next_is_filler:
-                                    # 次の文からdelete_candidate_wordを削除
-                                    if next_delete_candidate_word and next_delete_candidate_word.strip():
-                                        delete_pattern = re.escape(next_delete_candidate_word.strip())
-                                        cleaned_next_text = re.sub(f"{delete_pattern}[。]?\\s*", "", next_transcript_text)
-                                        
-                                        logging.info(f"[STEP4] Removed '{next_delete_candidate_word}' from next_text: '{next_transcript_text}' -> '{cleaned_next_text}'")
-                                        
-                                        # 次のセグメントを更新（後で処理される）
-                                        block_segments[seg_idx + 1] = (next_line_no, cleaned_next_text, next_merged_text_with_prev, 
-                                                                       next_merged_text_with_next, next_delete_candidate_word, 
-                                                                       next_front_score, next_after_score, next_is_filler)
-                                    
-                                    # 次の文に補完テキストを追加
-                                    if merged_text_with_next and merged_text_with_next.strip():
-                                        complement_text = f"({merged_text_with_next})"
-                                    else:
-                                        complement_text = f"({transcript_text})"
-                                    
-                                    # 次のセグメントの処理時に反映されるよう、一時的に保存
-                                    # 実際の処理は次のセグメントのループで行われる
-                                    logging.info(f"[STEP4] Will add complement to next segment: '{complement_text[:100]}...'")
-                                    
-                                    # 次のセグメントの処理時に補完テキストを追加するよう、フラグを設定
-                                    # この処理は次のセグメントのループで行われる
-                                
-                            else:
-                                # 次のセグメントが存在しない場合
-                                logging.info(f"[STEP4] No next segment available for after_score >= front_score merge")
-                        
-                        else:
-                            # スコアが同じ場合やdelete_candidate_wordがNoneの場合
-                            logging.info(f"[STEP4] Skipping filler line {line_no} (no clear score difference or no delete_candidate_word)")
-                    else:
-                        # delete_candidate_wordがNoneの場合
-                        logging.info(f"[STEP4] Skipping filler line {line_no} (no delete_candidate_word)")
-            
-            # ブロック内のテキストを結合
-            final_merged_text = " ".join(merged_text_parts).strip()
-            
-            processed_blocks.append({
-                "meeting_id": meeting_id,
-                "line_no": start_line_no,  # ブロック内の最初の行を代表として使用
-                "speaker": speaker,
-                "merged_text": final_merged_text,
-                "offset_seconds": start_offset  # ブロック内の最初の行のoffsetを使用
-            })
-            
-            logging.info(f"[STEP4] Final block text: speaker={speaker}, text='{final_merged_text[:100]}...'")
-        
-        # ステップ③：マージ済みテキストの登録
-        for block in processed_blocks:
-            cursor.execute("""
-                INSERT INTO dbo.ProcessedTranscriptSegments (
-                    meeting_id, line_no, speaker, merged_text, offset_seconds,
-                    inserted_datetime, updated_datetime
-                ) VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
-            """, (block["meeting_id"], block["line_no"], block["speaker"], 
-                  block["merged_text"], block["offset_seconds"]))
-            
-            logging.info(f"[DB] Inserted ProcessedTranscriptSegment: meeting_id={block['meeting_id']}, "
-                        f"line_no={block['line_no']}, speaker={block['speaker']}, "
-                        f"merged_text='{block['merged_text'][:100]}...'")
-        
-        # ステップ6: OpenAIフィラー除去
-        cursor.execute("""
-            SELECT id, merged_text
-            FROM dbo.ProcessedTranscriptSegments
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        segments = cursor.fetchall()
-        
-        # OpenAIクライアントの初期化
-        client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        
-        def improve_text_with_openai(text: str) -> str:
-            """
-            OpenAI APIを使用して話し言葉を自然で読みやすい文章に整形する
-            """
-            user_message = f"""以下の文字起こし結果を、できるだけ元の口調や文体（常体・丁寧語）を維持しながら、読みやすく自然な文章に整えてください。
+    ステップ4-5: 話者ブロック単位で統合した発話を ProcessedTranscriptSegments に登録する
+
+    統合処理は pipeline_processing.merge_engine で DB アクセスなしに行い、結果をまとめて登録する。
+    登録後にコミットし、以降のリトライではこの結果を再利用する。
+
+    Returns:
+        bool: 登録した場合 True。統合対象のセグメントがない場合は False
+    """
+    cursor = conn.cursor()
+
+    if segment_records is None:
+        # TranscriptProcessingSegments からデータ取得（is_filler を含む全列を1回で取得）
+        segments = load_transcript_processing_records(cursor, meeting_id)
+    else:
+        # 前ステージのメモリ上の結果をそのまま使用（再読込なし）
+        segments = segment_records
+
+    if not segments:
+        logging.warning(f"⚠️ TranscriptProcessingSegments にデータがありません (meeting_id={meeting_id})")
+        conn.commit()
+        return False
+
+    # ステップ4: 話者連続ブロック構造でのフィラー除去・文脈補完付きセグメント整形
+    processed_blocks = merge_speaker_blocks(segments)
+    logging.info(f"[STEP4] Created {len(processed_blocks)} speaker blocks from {len(segments)} segments (meeting_id={meeting_id})")
+
+    # ステップ③：マージ済みテキストの登録
+    if processed_blocks:
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO dbo.ProcessedTranscriptSegments (
+                meeting_id, line_no, speaker, merged_text, offset_seconds,
+                inserted_datetime, updated_datetime
+            ) VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
+        """, [
+            (meeting_id, block["line_no"], block["speaker"], block["merged_text"], block["offset_seconds"])
+            for block in processed_blocks
+        ])
+        logging.info(f"[DB] Inserted {len(processed_blocks)} ProcessedTranscriptSegments (meeting_id={meeting_id})")
+
+    # 統合結果をチェックポイントとしてコミット
+    conn.commit()
+    return True
+
+def improve_text_with_openai(client, text: str) -> str:
+    """
+    OpenAI APIを使用して話し言葉を自然で読みやすい文章に整形する
+    """
+    user_message = f"""以下の文字起こし結果を、できるだけ元の口調や文体（常体・丁寧語）を維持しながら、読みやすく自然な文章に整えてください。
 
 - 「あ、」「うん。」など、一文字＋読点・句点のフィラーは削除してください  
 - 話し言葉の崩れ（接続詞の繰り返しや、文の論理のズレなど）は必要最小限の範囲で整えてください  
@@ -1698,404 +2187,976 @@ def queue_merging_and_cleanup_func(message: func.QueueMessage):
 
 修正後："""
 
-            try:
-                response = client.chat.completions.create(
-                    model=os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo"),
-                    messages=[
-                        {"role": "user", "content": user_message}
-                    ],
-                    temperature=0.6,  # 話者の口調を保持するため適度な温度に設定
-                    max_tokens=300    # 適度な長さの応答に制限
-                )
+    try:
+        response = client.chat.completions.create(
+            model=os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo"),
+            messages=[
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.6,  # 話者の口調を保持するため適度な温度に設定
+            max_tokens=300    # 適度な長さの応答に制限
+        )
 
-                # トークン使用量を取得（エラーハンドリング付き）
-                try:
-                    tokens_used = response.usage.total_tokens
-                    logging.info(f"🔢 トークン使用量: {tokens_used} (文章整形)")
-                except (AttributeError, KeyError):
-                    tokens_used = 0
+        # トークン使用量を取得（エラーハンドリング付き）
+        try:
+            tokens_used = response.usage.total_tokens
+            logging.info(f"🔢 トークン使用量: {tokens_used} (文章整形)")
+        except (AttributeError, KeyError):
+            tokens_used = 0
+
+        result = response.choices[0].message.content.strip()
+
+        # 「」を削除する処理
+        result = result.strip('「」')
+
+        # 結果が空でない場合は返す
+        if result:
+            return result
+        else:
+            return text
+
+    except Exception as e:
+        logging.warning(f"文章整形失敗: {e}")
+        return text  # フォールバック
+
+def clean_processed_rows(conn, processed_rows: list, client=None) -> list:
+    """
+    ステップ6: ProcessedTranscriptSegments の merged_text を整形して cleaned_text に保存する（整形済みの行はスキップ）
+
+    Returns:
+        list[tuple]: (id, speaker, cleaned_text, offset_seconds) のリスト（processed_rows の順）
+    """
+    cursor = conn.cursor()
+    if client is None:
+        client = create_openai_client()
+
+    batch_size = get_checkpoint_batch_size()
+    cleaned_count = 0
+    processed_segments = []
+    for segment_id, merged_text, cleaned_text, speaker, offset_seconds in processed_rows:
+        if cleaned_text is not None:
+            logging.info(f"[CLEANUP] Skip segment_id={segment_id} (cleaned in previous attempt)")
+            processed_segments.append((segment_id, speaker, cleaned_text, offset_seconds))
+            continue
+
+        logging.info(f"[CLEANUP] Processing segment_id={segment_id}, merged_text='{merged_text[:100]}...'")
+        try:
+            cleaned = improve_text_with_openai(client, merged_text)
+            logging.info(f"[CLEANUP] Improved text: '{cleaned[:100]}...'")
+        except Exception as e:
+            logging.warning(f"❌ 文章整形失敗 id={segment_id} error={e}")
+            cleaned = merged_text  # フォールバック
 
-                result = response.choices[0].message.content.strip()
-                
-                # 「」を削除する処理
-                result = result.strip('「」')
-                
-                # 結果が空でない場合は返す
-                if result:
-                    return result
-                else:
-                    return text
-                    
-            except Exception as e:
-                logging.warning(f"文章整形失敗: {e}")
-                return text  # フォールバック
-        
-        for segment_id, merged_text in segments:
-            logging.info(f"[CLEANUP] Processing segment_id={segment_id}, merged_text='{merged_text[:100]}...'")
-            try:
-                cleaned = improve_text_with_openai(merged_text)
-                logging.info(f"[CLEANUP] Improved text: '{cleaned[:100]}...'")
-            except Exception as e:
-                logging.warning(f"❌ 文章整形失敗 id={segment_id} error={e}")
-                cleaned = merged_text  # フォールバック
-            
-            cursor.execute("""
-                UPDATE dbo.ProcessedTranscriptSegments
-                SET cleaned_text = ?, updated_datetime = GETDATE()
-                WHERE id = ?
-            """, (cleaned, segment_id))
-            logging.info(f"[DB] Updated ProcessedTranscriptSegment: id={segment_id}, cleaned_text='{cleaned[:100]}...'")
-        
-        # ステータス更新
         cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'merging_completed', updated_datetime = GETDATE()
+            UPDATE dbo.ProcessedTranscriptSegments
+            SET cleaned_text = ?, updated_datetime = GETDATE()
+            WHERE id = ?
+        """, (cleaned, segment_id))
+        processed_segments.append((segment_id, speaker, cleaned, offset_seconds))
+        logging.info(f"[DB] Updated ProcessedTranscriptSegment: id={segment_id}, cleaned_text='{cleaned[:100]}...'")
+
+        cleaned_count += 1
+        commit_checkpoint(conn, cleaned_count, batch_size)
+
+    return processed_segments
+
+def run_merging_stage(conn, meeting_id: int, segment_records=None, lane: str = DEFAULT_LANE,
+                      allow_sharding: bool = False):
+    """
+    ステップ4-6: セグメント統合、話者ごと整形、OpenAIフィラー除去 → ProcessedTranscriptSegments に保存
+
+    Args:
+        segment_records: run_preprocessing_stage の戻り値。None の場合は TranscriptProcessingSegments から読み込む
+        lane: 後続キューのレーン（シャード実行時に引き継ぐ）
+        allow_sharding: True の場合、長い会議はステップ6をシャードに分割してキュー経由で並列実行する
+
+    Returns:
+        list[tuple] | None: (id, speaker, cleaned_text, offset_seconds) の offset 順リスト。
+            後続ステージ不要、またはシャードに分割した場合は None
+    """
+    cursor = conn.cursor()
+
+    # 前回の試行で統合済みであれば再利用する（重複 INSERT 防止）
+    processed_rows = load_processed_transcript_rows(cursor, meeting_id)
+    if processed_rows:
+        logging.info(f"🔁 ProcessedTranscriptSegments 登録済みのため途中から再開 (meeting_id={meeting_id}, blocks={len(processed_rows)})")
+    else:
+        if not insert_processed_transcript_segments(conn, meeting_id, segment_records):
+            return None
+        processed_rows = load_processed_transcript_rows(cursor, meeting_id)
+
+    # 長い会議はステップ6をシャードに分割して並列実行する（無効の場合は行の読み込みも行わない）
+    if allow_sharding and get_shard_settings() is not None:
+        cursor.execute("""
+            SELECT line_no, speaker FROM dbo.ProcessedTranscriptSegments
             WHERE meeting_id = ?
+            ORDER BY line_no
         """, (meeting_id,))
-        
+        if dispatch_stage_shards(conn, meeting_id, "merging", cursor.fetchall(), lane):
+            return None
+
+    # ステップ6: OpenAIフィラー除去（整形済みの行はスキップ）
+    processed_segments = clean_processed_rows(conn, processed_rows)
+
+    conn.commit()
+    logging.info(f"✅ MergingAndCleanup完了 → status=merging_completed (meeting_id={meeting_id})")
+
+    # 要約ステージは offset_seconds 順に読み込むため同じ順序に揃える
+    processed_segments.sort(key=lambda row: row[3] if row[3] is not None else -1.0)
+    return processed_segments
+
+def get_summary_segmentation_settings():
+    """
+    ステップ7のブロック分割の設定を取得する
+
+    環境変数:
+        SUMMARY_SEGMENTATION: "adaptive" で話者交代・間・話題転換による分割（既定 "fixed" = 300秒単位）
+        SUMMARY_BLOCK_MIN_TOKENS / SUMMARY_BLOCK_MAX_TOKENS: 1ブロックの推定トークン数の下限・上限（既定 300 / 2500）
+        SUMMARY_BLOCK_MIN_SECONDS / SUMMARY_BLOCK_MAX_SECONDS: 1ブロックの長さの下限・上限（既定 120 / 900 秒）
+        SUMMARY_PAUSE_SECONDS: 区切り候補とする発話間の間（既定 20 秒）
+        SUMMARY_TOPIC_SHIFT_THRESHOLD: 前後の文字 bigram 類似度がこの値未満なら話題転換とみなす（既定 0.15）
+
+    Returns:
+        build_adaptive_blocks のキーワード引数。fixed の場合は None
+    """
+    if os.environ.get("SUMMARY_SEGMENTATION", "fixed").lower() != "adaptive":
+        return None
+    return {
+        "min_tokens": int(os.environ.get("SUMMARY_BLOCK_MIN_TOKENS", block_segmentation.DEFAULT_MIN_TOKENS)),
+        "max_tokens": int(os.environ.get("SUMMARY_BLOCK_MAX_TOKENS", block_segmentation.DEFAULT_MAX_TOKENS)),
+        "min_seconds": float(os.environ.get("SUMMARY_BLOCK_MIN_SECONDS", block_segmentation.DEFAULT_MIN_SECONDS)),
+        "max_seconds": float(os.environ.get("SUMMARY_BLOCK_MAX_SECONDS", block_segmentation.DEFAULT_MAX_SECONDS)),
+        "pause_seconds": float(os.environ.get("SUMMARY_PAUSE_SECONDS", block_segmentation.DEFAULT_PAUSE_SECONDS)),
+        "topic_shift_threshold": float(
+            os.environ.get("SUMMARY_TOPIC_SHIFT_THRESHOLD", block_segmentation.DEFAULT_TOPIC_SHIFT_THRESHOLD)
+        ),
+    }
+
+def run_summary_stage(conn, meeting_id: int, processed_segments=None):
+    """
+    ステップ7: ブロック要約タイトル生成 → ConversationSummaries に保存
+
+    Args:
+        processed_segments: run_merging_stage の戻り値。None の場合は ProcessedTranscriptSegments から読み込む
+
+    Returns:
+        list[tuple] | None: (speaker, content, offset_seconds, is_summary) のエクスポート順リスト。後続ステージ不要の場合は None
+    """
+    cursor = conn.cursor()
+
+    if processed_segments is None:
+        # ProcessedTranscriptSegments からデータ取得
+        cursor.execute("""
+            SELECT id, speaker, cleaned_text, offset_seconds
+            FROM dbo.ProcessedTranscriptSegments
+            WHERE meeting_id = ?
+            ORDER BY offset_seconds
+        """, (meeting_id,))
+        rows = cursor.fetchall()
+    else:
+        rows = processed_segments
+
+    # 1. rows = cursor.fetchall() 直後のログ追加
+    logging.info(f"[DEBUG] ProcessedTranscriptSegments 抽出行数: {len(rows)}")
+
+    if not rows:
+        logging.warning(f"⚠️ ProcessedTranscriptSegments にデータがありません (meeting_id={meeting_id})")
         conn.commit()
-        logging.info(f"✅ MergingAndCleanup完了 → status=merging_completed (meeting_id={meeting_id})")
-        
+        return None
+
+    # openai_completion_step7 から処理関数をインポート
+    from openai_processing.openai_completion_step7 import generate_summary_title
+
+    # 取得済みの行から話者・本文・offset を持つレコードを作り、ブロック化（既定は300秒単位）
+    segments, skipped_count = to_summary_segments(rows)
+    if skipped_count:
+        logging.warning(f"[WARN] offset を取得できないセグメントを除外しました: {skipped_count} 件")
+    segmentation_settings = get_summary_segmentation_settings()
+    if segmentation_settings is None:
+        blocks = build_time_blocks(segments)
+    else:
+        blocks = block_segmentation.build_adaptive_blocks(segments, **segmentation_settings)
+    logging.info(f"[SUMMARY] ブロック数: {len(blocks)} (segmentation={'adaptive' if segmentation_settings else 'fixed'})")
+
+    # 前回の試行で登録済みのブロック（サマリ行＋セグメント行はブロック単位でコミット済み）
+    cursor.execute("""
+        SELECT speaker, content, offset_seconds, is_summary
+        FROM dbo.ConversationSummaries
+        WHERE meeting_id = ?
+    """, (meeting_id,))
+    summaries = [tuple(row) for row in cursor.fetchall()]
+    completed_offsets = {row[2] for row in summaries if row[3]}
+    if completed_offsets:
+        logging.info(f"🔁 ConversationSummaries 登録済みのブロックをスキップ (meeting_id={meeting_id}, blocks={len(completed_offsets)})")
+
+    batch_size = get_checkpoint_batch_size()
+    titled_count = 0
+    pending_rows = []
+
+    def flush_pending_rows():
+        # チェックポイントごとにまとめて登録する（ブロックのサマリ行とセグメント行は同じコミットに入る）
+        if not pending_rows:
+            return
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO dbo.ConversationSummaries (
+                meeting_id, speaker, content, offset_seconds, is_summary,
+                inserted_datetime, updated_datetime
+            ) VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
+        """, [(meeting_id, *row) for row in pending_rows])
+        logging.info(f"[DB] ConversationSummaries 一括挿入: {len(pending_rows)} 行")
+        summaries.extend(pending_rows)
+        pending_rows.clear()
+
+    # 各ブロックに対してタイトルを生成し、ConversationSummaries に挿入
+    for i, block in enumerate(blocks):
+        if block["start_offset"] in completed_offsets:
+            continue
+
+        conversation_text = render_block_text(block["segments"])
+        logging.info(f"[DEBUG] block_index={i}, block_lines={len(block['segments'])}")
+        logging.info(f"[DEBUG] conversation_text[:200]: {conversation_text[:200]}")
+
+        title = generate_summary_title(conversation_text, i, len(blocks))
+
+        # title が None または空の場合のチェック
+        if not title or not title.strip():
+            logging.warning(f"[WARN] generate_summary_title が空のタイトルを返しました: block_index={i}")
+            title = f"ブロック{i+1}の要約"  # フォールバックタイトル
+
+        pending_rows.append((0, title, block["start_offset"], 1))
+        pending_rows.extend(summary_segment_row(segment) for segment in block["segments"])
+
+        # ブロック単位でチェックポイントをコミット（途中のブロックだけが残らないように）
+        titled_count += 1
+        if titled_count % batch_size == 0:
+            flush_pending_rows()
+        commit_checkpoint(conn, titled_count, batch_size)
+
+    flush_pending_rows()
+
+    conn.commit()
+    logging.info(f"✅ Summarization完了 → status=summary_completed (meeting_id={meeting_id})")
+
+    # エクスポートステージの ORDER BY offset_seconds, is_summary DESC と同じ順序に揃える
+    summaries.sort(key=lambda row: (row[2] if row[2] is not None else -1.0, -row[3]))
+    return summaries
+
+def run_export_stage(conn, meeting_id: int):
+    """
+    ステップ8: ConversationSummaries から ConversationSegments にコピー
+
+    Speakers の参照と登録は INSERT ... SELECT 1文で行い、会議の件数に関係なく DB 往復は一定回数。
+
+    Returns:
+        出力した ConversationSegments の件数（ミーティング情報が取得できない場合は None）
+    """
+    cursor = conn.cursor()
+
+    # Meetingsテーブルからユーザー・音声情報を取得（全行に同じ値を設定する）
+    cursor.execute("""
+        SELECT user_id, file_name, file_path, file_size, duration_seconds
+        FROM dbo.Meetings
+        WHERE meeting_id = ?
+    """, (meeting_id,))
+    meeting_row = cursor.fetchone()
+    if not meeting_row:
+        logging.warning(f"⚠️ ミーティング情報取得失敗 meeting_id={meeting_id}")
+        return
+
+    meeting_user_id, file_name, file_path, file_size, duration_seconds = meeting_row
+
+    # ConversationSegments に一括挿入（offset_seconds, is_summary DESC の順に segment_id を採番）
+    # エクスポートは1トランザクションで行うため、既存行があれば出力済みとしてスキップ（再配信時の重複防止）
+    cursor.execute("""
+        INSERT INTO dbo.ConversationSegments (
+            user_id, speaker_id, meeting_id, content, file_name, file_path, file_size,
+            duration_seconds, status, inserted_datetime, updated_datetime,
+            start_time, end_time
+        )
+        SELECT
+            CASE WHEN cs.is_summary = 1 THEN 0 ELSE ? END,
+            CASE WHEN cs.is_summary = 1 THEN 0 ELSE ISNULL((
+                SELECT MIN(s.speaker_id)
+                FROM dbo.Speakers s
+                WHERE s.meeting_id = cs.meeting_id
+                  AND s.speaker_name = CAST(cs.speaker AS NVARCHAR(50))
+            ), 0) END,
+            cs.meeting_id, cs.content, ?, ?, ?, ?, 'completed', GETDATE(), GETDATE(),
+            cs.offset_seconds, NULL
+        FROM dbo.ConversationSummaries cs
+        WHERE cs.meeting_id = ?
+          AND NOT EXISTS (
+              SELECT 1 FROM dbo.ConversationSegments WITH (UPDLOCK, HOLDLOCK)
+              WHERE meeting_id = ?
+          )
+        ORDER BY cs.offset_seconds, cs.is_summary DESC
+    """, (meeting_user_id, file_name, file_path, file_size, duration_seconds, meeting_id, meeting_id))
+    exported_count = max(cursor.rowcount, 0)
+
+    if exported_count == 0:
+        cursor.execute("SELECT COUNT(*) FROM dbo.ConversationSegments WHERE meeting_id = ?", (meeting_id,))
+        if cursor.fetchone()[0] > 0:
+            logging.info(f"🔁 ConversationSegments 出力済みのためスキップ (meeting_id={meeting_id})")
+        else:
+            logging.warning(f"⚠️ ConversationSummaries にデータがありません (meeting_id={meeting_id})")
+
+    conn.commit()
+    logging.info(f"✅ Export完了 → status=AllStepCompleted (meeting_id={meeting_id}, segments={exported_count})")
+    return exported_count
+
+def should_use_fast_path(conn, meeting_id: int, segment_count: int) -> bool:
+    """
+    短い会議かどうかを判定し、キューを経由せず後続ステージを同一呼び出し内で実行するか決める
+
+    環境変数:
+        FAST_PATH_ENABLED: "true" で有効化（既定は無効）
+        FAST_PATH_MAX_DURATION_SECONDS: 音声時間の上限（既定 600 秒、0 で判定しない）
+        FAST_PATH_MAX_SEGMENTS: セグメント数の上限（既定 200、0 で判定しない）
+    """
+    if os.environ.get("FAST_PATH_ENABLED", "false").lower() != "true":
+        return False
+
+    max_duration = int(os.environ.get("FAST_PATH_MAX_DURATION_SECONDS", "600"))
+    max_segments = int(os.environ.get("FAST_PATH_MAX_SEGMENTS", "200"))
+
+    if max_segments and segment_count > max_segments:
+        return False
+
+    if max_duration:
+        cursor = conn.cursor()
+        cursor.execute("SELECT duration_seconds FROM dbo.Meetings WHERE meeting_id = ?", (meeting_id,))
+        row = cursor.fetchone()
+        duration_seconds = row[0] if row and row[0] is not None else 0
+        if duration_seconds > max_duration:
+            return False
+
+    return True
+
+# ステージごとのキュー（優先度レーンのキュー名は lane_queue_name で求める）
+STAGE_QUEUES = {
+    "preprocessing": "queue-preprocessing",
+    "merging": "queue-merging",
+    "summary": "queue-summary",
+    "export": "queue-export",
+}
+
+def requeue_stage(meeting_id: int, stage: str, lane: str, visibility_timeout: int = None):
+    """ステージのメッセージを投入し直す（ファストパスの途中で失敗・中断した場合）"""
+    send_queue_message(lane_queue_name(STAGE_QUEUES[stage], lane), {"meeting_id": meeting_id, "priority": lane},
+                       visibility_timeout=visibility_timeout)
+
+def resume_stranded_stage(conn, meeting_id: int, lane: str):
+    """
+    preprocessing を claim できなかった再配信で、ファストパスの途中で止まった後続ステージを再開する
+
+    失敗・未着手のステージはすぐに、処理中（リースあり）のステージはリース切れ後に取り出されるように
+    メッセージを投入する。実行中のワーカーが完了していれば、届いたメッセージは claim できずに何もしない。
+    """
+    if not pipeline_state_enabled():
+        return
+    cursor = conn.cursor()
+    now = utc_now()
+    current = load_pipeline_state(cursor, meeting_id, now)
+    conn.commit()
+    stage, reason = find_resumable_stage(current, now)
+    if stage is None:
+        return
+
+    visibility_timeout = None
+    if reason == "leased":
+        visibility_timeout = max(1, int((current.lease_expires - now).total_seconds()) + 1)
+    logging.warning(f"⚠️ 後続ステージのメッセージを投入し直します (meeting_id={meeting_id}, stage={stage}, "
+                    f"state={current.state}, reason={reason}, delay={visibility_timeout})")
+    requeue_stage(meeting_id, stage, lane, visibility_timeout)
+
+def run_fast_path(conn, meeting_id: int, segment_records, lane: str = DEFAULT_LANE):
+    """
+    merging → summary → export を同一呼び出し内で連続実行する（短い会議向け）
+
+    各ステージは通常のキュー経由と同じロジック・ステータス遷移で実行し、
+    前ステージの結果はメモリ上でそのまま受け渡す。
+    ステージが失敗した場合は failed にしたうえで、そのステージのキューにメッセージを投入して通常の経路で再実行する
+    （preprocessing のメッセージを再配信しても、preprocessing は完了済みのため後続ステージは再実行されない）。
+    """
+    logging.info(f"⚡ ファストパスで後続ステージを実行 (meeting_id={meeting_id}, segments={len(segment_records)})")
+
+    lease = claim_pipeline_stage(conn, meeting_id, "merging")
+    if lease is None:
+        return
+    try:
+        with track_stage(meeting_id, "merging", via_fast_path=True) as metrics:
+            stage_conn = metrics.wrap_connection(conn)
+            processed_segments = run_merging_stage(stage_conn, meeting_id, segment_records)
+            metrics.item_count = len(processed_segments or [])
+    except Exception as e:
+        logging.exception(f"❌ ファストパス merging エラー (meeting_id={meeting_id}): {e}")
+        handle_stage_failure(meeting_id, "merging_failed", "ProcessedTranscriptSegments", "run_fast_path:merging", e,
+                             lease=lease)
+        requeue_stage(meeting_id, "merging", lane)
+        return
+    if not complete_pipeline_stage(conn, lease) or processed_segments is None:
+        return
+
+    lease = claim_pipeline_stage(conn, meeting_id, "summary")
+    if lease is None:
+        return
+    try:
+        with track_stage(meeting_id, "summary", via_fast_path=True) as metrics:
+            stage_conn = metrics.wrap_connection(conn)
+            summaries = run_summary_stage(stage_conn, meeting_id, processed_segments)
+            metrics.item_count = len(summaries or [])
+    except Exception as e:
+        logging.exception(f"❌ ファストパス summary エラー (meeting_id={meeting_id}): {e}")
+        handle_stage_failure(meeting_id, "summary_failed", "ConversationSummaries", "run_fast_path:summary", e,
+                             lease=lease)
+        requeue_stage(meeting_id, "summary", lane)
+        return
+    if not complete_pipeline_stage(conn, lease) or summaries is None:
+        return
+
+    lease = claim_pipeline_stage(conn, meeting_id, "export")
+    if lease is None:
+        return
+    try:
+        with track_stage(meeting_id, "export", via_fast_path=True) as metrics:
+            stage_conn = metrics.wrap_connection(conn)
+            metrics.item_count = run_export_stage(stage_conn, meeting_id)
+    except Exception as e:
+        logging.exception(f"❌ ファストパス export エラー (meeting_id={meeting_id}): {e}")
+        handle_stage_failure(meeting_id, "export_failed", "ConversationSegments", "run_fast_path:export", e,
+                             lease=lease)
+        requeue_stage(meeting_id, "export", lane)
+        return
+    complete_pipeline_stage(conn, lease)
+
+# シャード実行に対応するステージ：(完了後に投入する次のキュー, 出力テーブル)
+SHARD_STAGES = {
+    "preprocessing": ("queue-merging", "TranscriptProcessingSegments"),
+    "merging": ("queue-summary", "ProcessedTranscriptSegments"),
+}
+
+# host.json の maxDequeueCount と合わせる（最終リトライで失敗した場合のみ会議を failed にする）
+SHARD_MAX_DEQUEUE_COUNT = 3
+
+def get_shard_settings():
+    """
+    シャード実行の設定を取得する
+
+    環境変数:
+        SHARDING_ENABLED: "true" で有効化（既定は無効）
+        SHARD_MIN_SEGMENTS: シャードに分割する最小行数（既定 400）
+        SHARD_SIZE: 1シャードの目安行数（既定 100、話者ブロック境界に合わせて前後する）
+        SHARD_OVERLAP_LINES: 前後の文脈として参照する行数（既定 1、ステップ2が前後の行を参照するため最小 1）
+
+    Returns:
+        (min_segments, shard_size, overlap)。無効な場合は None
+    """
+    if os.environ.get("SHARDING_ENABLED", "false").lower() != "true":
+        return None
+    return (
+        int(os.environ.get("SHARD_MIN_SEGMENTS", "400")),
+        max(1, int(os.environ.get("SHARD_SIZE", "100"))),
+        max(1, int(os.environ.get("SHARD_OVERLAP_LINES", "1")))
+    )
+
+def dispatch_stage_shards(conn, meeting_id: int, stage: str, lines: list, lane: str) -> bool:
+    """
+    ステージの処理対象行をシャードに分割して PipelineShards に登録し、queue-shards へ投入する
+
+    前回の試行で登録済みのシャードがあれば再利用し、未完了のシャードのみ再投入する。
+
+    Args:
+        lines: (line_no, speaker) の line_no 順リスト
+
+    Returns:
+        bool: シャードに分割した場合は True（呼び出し元は以降の処理を行わない）
+    """
+    settings = get_shard_settings()
+    if settings is None:
+        return False
+    min_segments, shard_size, overlap = settings
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT shard_no, start_line, end_line, status
+        FROM dbo.PipelineShards
+        WHERE meeting_id = ? AND stage = ?
+        ORDER BY shard_no
+    """, (meeting_id, stage))
+    existing = cursor.fetchall()
+
+    if existing:
+        pending = [row[0] for row in existing if row[3] != "completed"]
+        logging.info(f"🔁 登録済みのシャードを再利用 (meeting_id={meeting_id}, stage={stage}, pending={len(pending)}/{len(existing)})")
+    else:
+        if len(lines) < min_segments:
+            return False
+        shards = plan_shards(lines, shard_size, overlap)
+        if len(shards) < 2:
+            return False
+
+        uncovered = find_uncovered_lines(shards, [line_no for line_no, _ in lines])
+        if uncovered:
+            raise ValueError(f"シャード分割に不整合があります (line_no={uncovered[:10]})")
+
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO dbo.PipelineShards (
+                meeting_id, stage, shard_no, start_line, end_line,
+                context_start_line, context_end_line, status, inserted_datetime, updated_datetime
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', GETDATE(), GETDATE())
+        """, [
+            (meeting_id, stage, shard["shard_no"], shard["start_line"], shard["end_line"],
+             shard["context_start_line"], shard["context_end_line"])
+            for shard in shards
+        ])
+        pending = [shard["shard_no"] for shard in shards]
+        logging.info(f"🧩 シャードに分割 (meeting_id={meeting_id}, stage={stage}, lines={len(lines)}, shards={len(shards)})")
+
+    sharded = set_pipeline_state(conn, meeting_id, f"{stage}_sharded", (in_progress_state(stage),))
+    conn.commit()
+    if not sharded:
+        # リースを失った（他のワーカーが引き継いだ）場合はシャードを投入しない
+        logging.warning(f"⚠️ {stage}_sharded に遷移できないためシャードを投入しません (meeting_id={meeting_id})")
+        return True
+
+    result = send_queue_messages("queue-shards", [
+        {"meeting_id": meeting_id, "stage": stage, "shard_no": shard_no, "priority": lane}
+        for shard_no in pending
+    ])
+    if result["failed"]:
+        # 未投入のシャードは pending のまま残るため、例外で再配信させて再投入する
+        raise RuntimeError(f"シャードメッセージの投入に失敗しました ({len(result['failed'])}/{len(pending)} 件)")
+
+    if not pending:
+        # すべて完了済み（統合前に失敗した場合の再試行）
+        finalize_sharded_stage(conn, meeting_id, stage, lane)
+    return True
+
+def run_stage_shard(conn, meeting_id: int, stage: str, shard_no: int) -> int:
+    """
+    1シャード分の処理を実行し、PipelineShards を completed に更新する
+
+    preprocessing はステップ2（フィラースコアリング）、merging はステップ6（文章整形）を担当範囲の行に対して行う。
+    担当範囲外の参照範囲（context_*_line）は前後の文脈としてのみ使用する。
+
+    Returns:
+        int: 担当範囲の行数
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT start_line, end_line, context_start_line, context_end_line, status
+        FROM dbo.PipelineShards
+        WHERE meeting_id = ? AND stage = ? AND shard_no = ?
+    """, (meeting_id, stage, shard_no))
+    row = cursor.fetchone()
+    if not row:
+        raise ValueError(f"シャードが登録されていません (meeting_id={meeting_id}, stage={stage}, shard_no={shard_no})")
+
+    start_line, end_line, context_start_line, context_end_line, shard_status = row
+    if shard_status == "completed":
+        logging.info(f"🔁 シャード処理済みのためスキップ (meeting_id={meeting_id}, stage={stage}, shard_no={shard_no})")
+        return 0
+
+    if stage == "preprocessing":
+        records = load_transcript_processing_records(cursor, meeting_id, context_start_line, context_end_line)
+        records_by_line = {record["line_no"]: record for record in records}
+        score_filler_records(conn, meeting_id, records, records_by_line, start_line, end_line)
+        item_count = sum(1 for record in records if start_line <= record["line_no"] <= end_line)
+    else:
+        processed_rows = load_processed_transcript_rows(cursor, meeting_id, start_line, end_line)
+        clean_processed_rows(conn, processed_rows)
+        item_count = len(processed_rows)
+
+    cursor.execute("""
+        UPDATE dbo.PipelineShards
+        SET status = 'completed', updated_datetime = GETDATE()
+        WHERE meeting_id = ? AND stage = ? AND shard_no = ?
+    """, (meeting_id, stage, shard_no))
+    conn.commit()
+    logging.info(f"✅ シャード完了 (meeting_id={meeting_id}, stage={stage}, shard_no={shard_no}, lines={start_line}-{end_line})")
+    return item_count
+
+def finalize_sharded_stage(conn, meeting_id: int, stage: str, lane: str) -> bool:
+    """
+    全シャードが完了していれば結果を統合してステージを完了させ、次のキューへ投入する
+
+    同時に完了した複数のシャードのうち、状態を {stage}_sharded → {stage}_stitching に
+    更新できた1件のみが統合を行う（set_pipeline_state の compare-and-set）。
+    完了の後に次のキューへの投入だけが失敗した場合は、シャードメッセージの再配信で
+    （状態が {stage}_completed のままであれば）投入をやり直す。重複したメッセージは次ステージの claim で除かれる。
+
+    Returns:
+        bool: この呼び出しで統合を行った場合は True
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM dbo.PipelineShards
+        WHERE meeting_id = ? AND stage = ? AND status <> 'completed'
+    """, (meeting_id, stage))
+    if cursor.fetchone()[0] > 0:
+        return False
+
+    next_queue, _ = SHARD_STAGES[stage]
+    claimed = set_pipeline_state(conn, meeting_id, f"{stage}_stitching", (f"{stage}_sharded",))
+    conn.commit()
+    if not claimed:
+        if get_pipeline_state_name(conn, meeting_id) == f"{stage}_completed":
+            logging.warning(f"⚠️ 統合済みのため次のキューへの投入のみやり直します (meeting_id={meeting_id}, stage={stage})")
+            send_queue_message(lane_queue_name(next_queue, lane), {"meeting_id": meeting_id, "priority": lane})
+        return False
+
+    try:
+        if stage == "preprocessing":
+            # 全行を line_no 順に読み直し、スコア漏れがないことを確認してからステップ3をまとめて行う
+            records = load_transcript_processing_records(cursor, meeting_id)
+            missing = [r["line_no"] for r in records if r["is_filler"] and (r["front_score"] is None or r["after_score"] is None)]
+            if missing:
+                raise ValueError(f"スコア未設定のフィラー行があります (line_no={missing[:10]})")
+            insert_revision_candidates(cursor, meeting_id, records, {r["line_no"]: r for r in records})
+        else:
+            processed_rows = load_processed_transcript_rows(cursor, meeting_id)
+            missing = [row[0] for row in processed_rows if row[2] is None]
+            if missing:
+                raise ValueError(f"整形未完了のセグメントがあります (id={missing[:10]})")
+
+        set_pipeline_state(conn, meeting_id, f"{stage}_completed", (f"{stage}_stitching",))
+        conn.commit()
+    except Exception:
+        # 再配信時に統合をやり直せるよう sharded に戻す
+        conn.rollback()
+        set_pipeline_state(conn, meeting_id, f"{stage}_sharded", (f"{stage}_stitching",))
+        conn.commit()
+        raise
+
+    logging.info(f"✅ シャード統合完了 → status={stage}_completed (meeting_id={meeting_id})")
+    send_queue_message(lane_queue_name(next_queue, lane), {"meeting_id": meeting_id, "priority": lane})
+    return True
+
+def handle_preprocessing_message(message: func.QueueMessage, lane: str):
+    """
+    ステップ1-3: セグメント化、フィラースコア、補完候補を TranscriptProcessingSegments に保存
+    """
+    try:
+        received_at = utc_now()
+        logging.info("=== QueuePreprocessingFunc 開始 ===")
+
+        # メッセージから meeting_id を取得
+        message_data = json.loads(message.get_body().decode('utf-8'))
+        meeting_id = message_data.get("meeting_id")
+
+        if not meeting_id:
+            raise ValueError("メッセージに meeting_id が含まれていません")
+
+        logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
+
+        # 上位レーンに滞留がある場合は後回し
+        if yield_to_higher_lanes("queue-preprocessing", lane, message_data):
+            return
+
+        # 重複配信・他のワーカーが処理中の場合は何もしない
+        conn = get_db_connection()
+        lease = claim_pipeline_stage(conn, meeting_id, "preprocessing")
+        if lease is None:
+            resume_stranded_stage(conn, meeting_id, lane)
+            return
+
+        with track_stage(meeting_id, "preprocessing", message, message_data, received_at, lane=lane) as metrics:
+            conn = metrics.wrap_connection(conn)
+            segment_records = run_preprocessing_stage(conn, meeting_id, lane=lane, allow_sharding=True)
+            metrics.item_count = len(segment_records or [])
+        if not complete_pipeline_stage(conn, lease) or segment_records is None:
+            return
+
+    except Exception as e:
+        logging.exception(f"❌ QueuePreprocessingFunc エラー (meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}): {e}")
+        handle_stage_failure(
+            meeting_id if 'meeting_id' in locals() else None,
+            "preprocessing_failed", "TranscriptProcessingSegments", "queue_preprocessing_func", e,
+            lease=lease if 'lease' in locals() else None
+        )
+        raise
+
+    # 短い会議はキューを経由せず後続ステージを連続実行
+    if should_use_fast_path(conn, meeting_id, len(segment_records)):
+        run_fast_path(conn, meeting_id, segment_records, lane)
+        return
+
+    try:
         # 次のキューにメッセージ送信
-        send_queue_message("queue-summary", {"meeting_id": meeting_id})
-        
+        next_message = {"meeting_id": meeting_id, "priority": lane}
+        snapshot = save_stage_snapshot(meeting_id, "preprocessing", segment_records)
+        if snapshot:
+            next_message["snapshot"] = snapshot
+        send_queue_message(lane_queue_name("queue-merging", lane), next_message)
+    except Exception as e:
+        logging.exception(f"❌ QueuePreprocessingFunc エラー (meeting_id={meeting_id}): {e}")
+        # 完了済みでも次のキューに投入できなかった場合は failed に戻し、再配信で再実行させる
+        handle_stage_failure(meeting_id, "preprocessing_failed", "TranscriptProcessingSegments", "queue_preprocessing_func", e,
+                             lease=lease)
+        raise
+
+def handle_merging_message(message: func.QueueMessage, lane: str):
+    """
+    ステップ4-6: セグメント統合、話者ごと整形、OpenAIフィラー除去 → ProcessedTranscriptSegments に保存
+    """
+    try:
+        received_at = utc_now()
+        logging.info("=== QueueMergingAndCleanupFunc 開始 ===")
+
+        # メッセージから meeting_id を取得
+        message_data = json.loads(message.get_body().decode('utf-8'))
+        meeting_id = message_data.get("meeting_id")
+
+        if not meeting_id:
+            raise ValueError("メッセージに meeting_id が含まれていません")
+
+        logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
+
+        # 上位レーンに滞留がある場合は後回し
+        if yield_to_higher_lanes("queue-merging", lane, message_data):
+            return
+
+        # 重複配信・他のワーカーが処理中の場合は何もしない
+        conn = get_db_connection()
+        lease = claim_pipeline_stage(conn, meeting_id, "merging")
+        if lease is None:
+            return
+
+        with track_stage(meeting_id, "merging", message, message_data, received_at, lane=lane) as metrics:
+            conn = metrics.wrap_connection(conn)
+            segment_records = load_stage_snapshot(message_data.get("snapshot"), meeting_id, "preprocessing")
+            processed_segments = run_merging_stage(conn, meeting_id, segment_records, lane=lane, allow_sharding=True)
+            metrics.item_count = len(processed_segments or [])
+        if not complete_pipeline_stage(conn, lease) or processed_segments is None:
+            return
+
+        # 次のキューにメッセージ送信
+        next_message = {"meeting_id": meeting_id, "priority": lane}
+        snapshot = save_stage_snapshot(meeting_id, "merging", processed_segments)
+        if snapshot:
+            next_message["snapshot"] = snapshot
+        send_queue_message(lane_queue_name("queue-summary", lane), next_message)
+
     except Exception as e:
         logging.exception(f"❌ QueueMergingAndCleanupFunc エラー (meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}): {e}")
-        log_trigger_error(
-            event_type="error",
-            table_name="ProcessedTranscriptSegments",
-            record_id=meeting_id if 'meeting_id' in locals() else -1,
-            additional_info=f"[queue_merging_and_cleanup_func] {str(e)}"
+        handle_stage_failure(
+            meeting_id if 'meeting_id' in locals() else None,
+            "merging_failed", "ProcessedTranscriptSegments", "queue_merging_and_cleanup_func", e,
+            lease=lease if 'lease' in locals() else None
         )
-        
-        # エラー時はステータスを failed に更新
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'merging_failed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-        except Exception as update_error:
-            logging.error(f"❌ ステータス更新失敗: {update_error}")
+        # 例外を再送出してキューの再配信に任せる（完了済みの行はチェックポイントによりスキップされる）
+        raise
 
-@app.function_name(name="QueueSummarizationFunc")
-@app.queue_trigger(arg_name="message", queue_name="queue-summary", connection="AzureWebJobsStorage")
-def queue_summarization_func(message: func.QueueMessage):
+def handle_summarization_message(message: func.QueueMessage, lane: str):
     """
     ステップ7: ブロック要約タイトル生成 → ConversationSummaries に保存
     """
     try:
+        received_at = utc_now()
         logging.info("=== QueueSummarizationFunc 開始 ===")
-        
+
         # メッセージから meeting_id を取得
         message_data = json.loads(message.get_body().decode('utf-8'))
         meeting_id = message_data.get("meeting_id")
-        
+
         if not meeting_id:
             raise ValueError("メッセージに meeting_id が含まれていません")
-        
+
         logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
-        
-        # ステータスを summary_in_progress に更新
+
+        # 上位レーンに滞留がある場合は後回し
+        if yield_to_higher_lanes("queue-summary", lane, message_data):
+            return
+
+        # 重複配信・他のワーカーが処理中の場合は何もしない
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'summary_in_progress', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        # ProcessedTranscriptSegments からデータ取得
-        cursor.execute("""
-            SELECT id, speaker, cleaned_text, offset_seconds
-            FROM dbo.ProcessedTranscriptSegments
-            WHERE meeting_id = ?
-            ORDER BY offset_seconds
-        """, (meeting_id,))
-        rows = cursor.fetchall()
-        
-        # 1. rows = cursor.fetchall() 直後のログ追加
-        logging.info(f"[DEBUG] ProcessedTranscriptSegments 抽出行数: {len(rows)}")
-        
-        if not rows:
-            logging.warning(f"⚠️ ProcessedTranscriptSegments にデータがありません (meeting_id={meeting_id})")
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'summary_completed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
+        lease = claim_pipeline_stage(conn, meeting_id, "summary")
+        if lease is None:
             return
-        
-        # openai_completion_step7 から処理関数をインポート
-        from openai_processing.openai_completion_step7 import generate_summary_title, extract_offset_from_line
-        
-        # テキスト形式に変換してブロック化処理用に準備
-        lines = []
-        for row in rows:
-            segment_id, speaker, text, offset = row
-            if text:
-                lines.append((segment_id, f"Speaker{speaker}: {text}({offset})"))
-        
-        # ブロック化（300秒単位）
-        blocks = []
-        current_block = {
-            "lines": [],
-            "block_index": 0,
-            "start_offset": 0.0
-        }
-        for seg_id, line in lines:
-            body, offset = extract_offset_from_line(line)
-            # 3. extract_offset_from_line() 呼び出し結果が None の場合のログ追加
-            if offset is None:
-                logging.warning(f"[WARN] extract_offset_from_line が offset=None を返した line: {line}")
-                continue
-            block_index = int(offset // 300)
-            if block_index != current_block["block_index"]:
-                if current_block["lines"]:
-                    blocks.append(current_block.copy())
-                current_block = {
-                    "lines": [],
-                    "block_index": block_index,
-                    "start_offset": offset
-                }
-            current_block["lines"].append((seg_id, line))
-        if current_block["lines"]:
-            blocks.append(current_block)
-        
-        # 各ブロックに対してタイトルを生成し、ConversationSummaries に挿入
-        for i, block in enumerate(blocks):
-            lines_only = [line for _, line in block["lines"]]
-            conversation_text = "\n".join(lines_only)
-            
-            # 2. generate_summary_title() 呼び出し直前のログ追加
-            logging.info(f"[DEBUG] block_index={i}, block_lines={len(lines_only)}")
-            logging.info(f"[DEBUG] conversation_text[:200]: {conversation_text[:200]}")
-            
-            title = generate_summary_title(conversation_text, i, len(blocks))
-            
-            # title が None または空の場合のチェック
-            if not title or not title.strip():
-                logging.warning(f"[WARN] generate_summary_title が空のタイトルを返しました: block_index={i}")
-                title = f"ブロック{i+1}の要約"  # フォールバックタイトル
-            
-            # サマリ行を挿入
-            cursor.execute("""
-                INSERT INTO dbo.ConversationSummaries (
-                    meeting_id, speaker, content, offset_seconds, is_summary,
-                    inserted_datetime, updated_datetime
-                ) VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
-            """, (meeting_id, 0, title, block["start_offset"], 1))
-            
-            # 4. INSERT INTO dbo.ConversationSummaries 成功のログ追加
-            logging.info(f"[DB] サマリ挿入完了: title='{title[:100]}...' offset={block['start_offset']}")
-            
-            # 各セグメントも挿入
-            for seg_id, line in block["lines"]:
-                body, offset = extract_offset_from_line(line)
-                
-                # segment_id から元の cleaned_text を再取得
-                cursor.execute("""
-                    SELECT speaker, cleaned_text, offset_seconds 
-                    FROM dbo.ProcessedTranscriptSegments 
-                    WHERE id = ?
-                """, (seg_id,))
-                seg_row = cursor.fetchone()
-                
-                if not seg_row:
-                    logging.warning(f"[WARN] ProcessedTranscriptSegments にid={seg_id}が見つかりません")
-                    continue
-                
-                speaker, cleaned_text, offset = seg_row
-                content = cleaned_text
-                
-                # speaker と content の妥当性チェック
-                if speaker is None or not isinstance(speaker, int):
-                    logging.warning(f"[WARN] 不正なspeaker値: {speaker}, seg_id: {seg_id}")
-                    speaker = 0  # フォールバック
-                
-                if not content or not content.strip():
-                    logging.warning(f"[WARN] 空のcontent: seg_id={seg_id}")
-                    content = "（内容なし）"  # フォールバック
-                
-                cursor.execute("""
-                    INSERT INTO dbo.ConversationSummaries (
-                        meeting_id, speaker, content, offset_seconds, is_summary,
-                        inserted_datetime, updated_datetime
-                    ) VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
-                """, (meeting_id, speaker, content, offset, 0))
-                
-                # 4. INSERT INTO dbo.ConversationSummaries 成功のログ追加
-                logging.info(f"[INSERT] ConversationSummaries: speaker={speaker}, content='{content[:80]}...' offset={offset}")
-        
-        # ステータス更新
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'summary_completed', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        conn.commit()
-        logging.info(f"✅ Summarization完了 → status=summary_completed (meeting_id={meeting_id})")
-        
+
+        with track_stage(meeting_id, "summary", message, message_data, received_at, lane=lane) as metrics:
+            conn = metrics.wrap_connection(conn)
+            processed_segments = load_stage_snapshot(message_data.get("snapshot"), meeting_id, "merging")
+            summaries = run_summary_stage(conn, meeting_id, processed_segments)
+            metrics.item_count = len(summaries or [])
+        if not complete_pipeline_stage(conn, lease) or summaries is None:
+            return
+
         # 次のキューにメッセージ送信
-        export_message = {"meeting_id": meeting_id}
+        # エクスポートは ConversationSummaries から INSERT ... SELECT で行うため、スナップショットは渡さない
+        export_message = {"meeting_id": meeting_id, "priority": lane}
         logging.info(f"[DEBUG] queue-export送信メッセージ: {export_message}")
-        send_queue_message("queue-export", export_message)
-        
+        send_queue_message(lane_queue_name("queue-export", lane), export_message)
+
     except Exception as e:
         # 5. except 節内の例外ログ拡充
-        logging.error(f"[EXCEPTION] queue_summarization_func failed for meeting_id={meeting_id}")
+        logging.error(f"[EXCEPTION] queue_summarization_func failed for meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}")
         logging.exception(f"❌ QueueSummarizationFunc エラー (meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}): {e}")
-        log_trigger_error(
-            event_type="error",
-            table_name="ConversationSummaries",
-            record_id=meeting_id if 'meeting_id' in locals() else -1,
-            additional_info=f"[queue_summarization_func] {str(e)}"
+        handle_stage_failure(
+            meeting_id if 'meeting_id' in locals() else None,
+            "summary_failed", "ConversationSummaries", "queue_summarization_func", e,
+            lease=lease if 'lease' in locals() else None
         )
-        
-        # エラー時はステータスを failed に更新
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'summary_failed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-        except Exception as update_error:
-            logging.error(f"❌ ステータス更新失敗: {update_error}")
+        # 例外を再送出してキューの再配信に任せる（完了済みの行はチェックポイントによりスキップされる）
+        raise
 
-@app.function_name(name="QueueExportFunc")
-@app.queue_trigger(arg_name="message", queue_name="queue-export", connection="AzureWebJobsStorage")
-def queue_export_func(message: func.QueueMessage):
+def handle_export_message(message: func.QueueMessage, lane: str):
     """
     ステップ8: ConversationSummaries から ConversationSegments にコピー
     """
     try:
+        received_at = utc_now()
         logging.info("=== QueueExportFunc 開始 ===")
-        
+
         # 受信メッセージのログ追加
         raw_message = message.get_body().decode('utf-8')
         logging.info(f"[DEBUG] Raw message: {raw_message}")
-        
+
         # メッセージから meeting_id を取得
         message_data = json.loads(raw_message)
         meeting_id = message_data.get("meeting_id")
-        
+
         if not meeting_id:
             raise ValueError("メッセージに meeting_id が含まれていません")
-        
+
         logging.info(f"🎯 処理対象: meeting_id={meeting_id}")
-        
-        # ステータスを export_in_progress に更新
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'export_in_progress', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        # ConversationSummaries からデータ取得
-        cursor.execute("""
-            SELECT speaker, content, offset_seconds, is_summary
-            FROM dbo.ConversationSummaries
-            WHERE meeting_id = ?
-            ORDER BY offset_seconds, is_summary DESC
-        """, (meeting_id,))
-        summaries = cursor.fetchall()
-        
-        if not summaries:
-            logging.warning(f"⚠️ ConversationSummaries にデータがありません (meeting_id={meeting_id})")
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'AllStepCompleted', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
+
+        # 上位レーンに滞留がある場合は後回し
+        if yield_to_higher_lanes("queue-export", lane, message_data):
             return
-        
-        # Meetingsテーブルからユーザー・音声情報を取得
-        cursor.execute("""
-            SELECT user_id, file_name, file_path, file_size, duration_seconds
-            FROM dbo.Meetings
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        meeting_row = cursor.fetchone()
-        if not meeting_row:
-            logging.warning(f"⚠️ ミーティング情報取得失敗 meeting_id={meeting_id}")
+
+        # 重複配信・他のワーカーが処理中の場合は何もしない
+        conn = get_db_connection()
+        lease = claim_pipeline_stage(conn, meeting_id, "export")
+        if lease is None:
             return
-        
-        meeting_user_id, file_name, file_path, file_size, duration_seconds = meeting_row
-        
-        # ConversationSegments にデータを挿入
-        for speaker_raw, content, offset, is_summary in summaries:
-            speaker_name = str(speaker_raw)
-            
-            # speaker_id を取得
-            speaker_id = 0
-            if not is_summary:
-                cursor.execute("""
-                    SELECT speaker_id FROM dbo.Speakers
-                    WHERE meeting_id = ? AND speaker_name = ?
-                """, (meeting_id, speaker_name))
-                speaker_row = cursor.fetchone()
-                speaker_id = speaker_row[0] if speaker_row else 0
-            
-            # ConversationSegments に挿入
-            cursor.execute("""
-                INSERT INTO dbo.ConversationSegments (
-                    user_id, speaker_id, meeting_id, content, file_name, file_path, file_size,
-                    duration_seconds, status, inserted_datetime, updated_datetime,
-                    start_time, end_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'completed', GETDATE(), GETDATE(), ?, NULL)
-            """, (
-                meeting_user_id if not is_summary else 0,
-                speaker_id,
-                meeting_id,
-                content,
-                file_name,
-                file_path,
-                file_size,
-                duration_seconds,
-                offset
-            ))
-        
-        # ステータス更新
-        cursor.execute("""
-            UPDATE dbo.Meetings
-            SET status = 'AllStepCompleted', updated_datetime = GETDATE()
-            WHERE meeting_id = ?
-        """, (meeting_id,))
-        
-        conn.commit()
-        logging.info(f"✅ Export完了 → status=AllStepCompleted (meeting_id={meeting_id})")
-        
+
+        with track_stage(meeting_id, "export", message, message_data, received_at, lane=lane) as metrics:
+            conn = metrics.wrap_connection(conn)
+            metrics.item_count = run_export_stage(conn, meeting_id)
+        complete_pipeline_stage(conn, lease)
+
     except Exception as e:
         logging.exception(f"❌ QueueExportFunc エラー (meeting_id={meeting_id if 'meeting_id' in locals() else 'unknown'}): {e}")
-        log_trigger_error(
-            event_type="error",
-            table_name="ConversationSegments",
-            record_id=meeting_id if 'meeting_id' in locals() else -1,
-            additional_info=f"[queue_export_func] {str(e)}"
+        handle_stage_failure(
+            meeting_id if 'meeting_id' in locals() else None,
+            "export_failed", "ConversationSegments", "queue_export_func", e,
+            lease=lease if 'lease' in locals() else None
         )
-        
-        # エラー時はステータスを failed に更新
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE dbo.Meetings
-                SET status = 'export_failed', updated_datetime = GETDATE()
-                WHERE meeting_id = ?
-            """, (meeting_id,))
-            conn.commit()
-        except Exception as update_error:
-            logging.error(f"❌ ステータス更新失敗: {update_error}")
\ No newline at end of file
+        # 例外を再送出してキューの再配信に任せる（完了済みの行はチェックポイントによりスキップされる）
+        raise
+
+def handle_shard_message(message: func.QueueMessage):
+    """
+    シャード1件分の処理（preprocessing: ステップ2 / merging: ステップ6）を実行し、最後のシャードであれば統合する
+    """
+    meeting_id = None
+    stage = None
+    try:
+        received_at = utc_now()
+        logging.info("=== QueueShardFunc 開始 ===")
+
+        message_data = json.loads(message.get_body().decode('utf-8'))
+        meeting_id = message_data.get("meeting_id")
+        stage = message_data.get("stage")
+        shard_no = message_data.get("shard_no")
+        lane = normalize_lane(message_data.get("priority")) or DEFAULT_LANE
+
+        if not meeting_id or stage not in SHARD_STAGES or shard_no is None:
+            raise ValueError(f"シャードメッセージの形式が不正です: {message_data}")
+
+        logging.info(f"🎯 処理対象: meeting_id={meeting_id}, stage={stage}, shard_no={shard_no}")
+
+        with track_stage(meeting_id, f"{stage}_shard", message, message_data, received_at, lane=lane) as metrics:
+            conn = metrics.wrap_connection(get_db_connection())
+            metrics.item_count = run_stage_shard(conn, meeting_id, stage, int(shard_no))
+            finalize_sharded_stage(conn, meeting_id, stage, lane)
+
+    except Exception as e:
+        logging.exception(f"❌ QueueShardFunc エラー (meeting_id={meeting_id}, stage={stage}): {e}")
+        if stage in SHARD_STAGES and (message.dequeue_count or 0) >= SHARD_MAX_DEQUEUE_COUNT:
+            # 最終リトライでも失敗した場合のみ会議を failed にする
+            # 統合後に次のキューへ投入できなかった場合（{stage}_completed）も failed にして取り残さない
+            handle_stage_failure(meeting_id, f"{stage}_failed", SHARD_STAGES[stage][1], "queue_shard_func", e,
+                                 expected_states=(f"{stage}_sharded", f"{stage}_stitching", f"{stage}_completed"))
+        else:
+            log_trigger_error(
+                event_type="error",
+                table_name="PipelineShards",
+                record_id=meeting_id if meeting_id else -1,
+                additional_info=f"[queue_shard_func] {str(e)}"
+            )
+        # 例外を再送出してキューの再配信に任せる（処理済みの行はチェックポイントによりスキップされる）
+        raise
+
+# ----------------------------------------------------------------------------
+# Queue Trigger（レーンごと）
+# 各ステージは normal（既存キュー名）/ high / bulk の3キューを持ち、処理内容は共通
+# ----------------------------------------------------------------------------
+
+@app.function_name(name="QueuePreprocessingFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-preprocessing", connection="AzureWebJobsStorage")
+def queue_preprocessing_func(message: func.QueueMessage):
+    handle_preprocessing_message(message, "normal")
+
+@app.function_name(name="QueuePreprocessingHighFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-preprocessing-high", connection="AzureWebJobsStorage")
+def queue_preprocessing_high_func(message: func.QueueMessage):
+    handle_preprocessing_message(message, "high")
+
+@app.function_name(name="QueuePreprocessingBulkFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-preprocessing-bulk", connection="AzureWebJobsStorage")
+def queue_preprocessing_bulk_func(message: func.QueueMessage):
+    handle_preprocessing_message(message, "bulk")
+
+@app.function_name(name="QueueMergingAndCleanupFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-merging", connection="AzureWebJobsStorage")
+def queue_merging_and_cleanup_func(message: func.QueueMessage):
+    handle_merging_message(message, "normal")
+
+@app.function_name(name="QueueMergingAndCleanupHighFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-merging-high", connection="AzureWebJobsStorage")
+def queue_merging_and_cleanup_high_func(message: func.QueueMessage):
+    handle_merging_message(message, "high")
+
+@app.function_name(name="QueueMergingAndCleanupBulkFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-merging-bulk", connection="AzureWebJobsStorage")
+def queue_merging_and_cleanup_bulk_func(message: func.QueueMessage):
+    handle_merging_message(message, "bulk")
+
+@app.function_name(name="QueueSummarizationFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-summary", connection="AzureWebJobsStorage")
+def queue_summarization_func(message: func.QueueMessage):
+    handle_summarization_message(message, "normal")
+
+@app.function_name(name="QueueSummarizationHighFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-summary-high", connection="AzureWebJobsStorage")
+def queue_summarization_high_func(message: func.QueueMessage):
+    handle_summarization_message(message, "high")
+
+@app.function_name(name="QueueSummarizationBulkFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-summary-bulk", connection="AzureWebJobsStorage")
+def queue_summarization_bulk_func(message: func.QueueMessage):
+    handle_summarization_message(message, "bulk")
+
+@app.function_name(name="QueueExportFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-export", connection="AzureWebJobsStorage")
+def queue_export_func(message: func.QueueMessage):
+    handle_export_message(message, "normal")
+
+@app.function_name(name="QueueExportHighFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-export-high", connection="AzureWebJobsStorage")
+def queue_export_high_func(message: func.QueueMessage):
+    handle_export_message(message, "high")
+
+@app.function_name(name="QueueExportBulkFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-export-bulk", connection="AzureWebJobsStorage")
+def queue_export_bulk_func(message: func.QueueMessage):
+    handle_export_message(message, "bulk")
+
+@app.function_name(name="QueueShardFunc")
+@app.queue_trigger(arg_name="message", queue_name="queue-shards", connection="AzureWebJobsStorage")
+def queue_shard_func(message: func.QueueMessage):
+    handle_shard_message(message)
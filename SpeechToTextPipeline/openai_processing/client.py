@@ -0,0 +1,40 @@
+import contextvars
+import os
+import openai
+
+# ステージ計測用の LLM 呼び出しカウンタ（None の場合は計測しない）
+_llm_call_counter: contextvars.ContextVar = contextvars.ContextVar("llm_call_counter", default=None)
+
+
+def set_llm_call_counter(counter, token=None):
+    """
+    現在のコンテキストに LLM 呼び出しカウンタ（{"llm_calls": int}）を設定する
+
+    token を指定した場合は設定前の状態に戻す。戻り値は復元用の token。
+    """
+    if token is not None:
+        _llm_call_counter.reset(token)
+        return None
+    return _llm_call_counter.set(counter)
+
+
+def _count_llm_request(request):
+    """HTTP リクエスト送信ごとに呼ばれるフック（リトライも1回として数える）"""
+    counter = _llm_call_counter.get()
+    if counter is not None:
+        counter["llm_calls"] += 1
+
+
+def create_openai_client() -> openai.OpenAI:
+    """
+    OpenAI クライアントを生成する
+
+    OPENAI_BASE_URL が設定されている場合はそのエンドポイントへ接続する。
+    （例：ローカルのモックサーバー http://localhost:8089/v1）
+    """
+    base_url = os.environ.get("OPENAI_BASE_URL") or None
+    return openai.OpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        base_url=base_url,
+        http_client=openai.DefaultHttpxClient(event_hooks={"request": [_count_llm_request]})
+    )
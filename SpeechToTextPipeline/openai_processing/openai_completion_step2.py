@@ -2,12 +2,12 @@ import re
 import logging
 import json
 import os
-import openai
+from .client import create_openai_client
 
 logger = logging.getLogger(__name__)
 
 # OpenAIクライアントの初期化
-client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = create_openai_client()
 
 def log_token_usage(tokens: int, operation: str):
     """トークン使用量を記録する"""
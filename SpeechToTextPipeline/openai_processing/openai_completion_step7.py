@@ -4,12 +4,12 @@ import traceback
 from typing import List, Dict, Any, Tuple
 import os
 import logging
-import openai
+from .client import create_openai_client
 
 logger = logging.getLogger(__name__)
 
 # OpenAIクライアントの初期化
-client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = create_openai_client()
 
 def log_token_usage(tokens: int, operation: str):
     """トークン使用量を記録する"""
@@ -0,0 +1,15 @@
+"""
+Pipeline Processing Package
+
+This package contains DB/LLM-independent helpers shared by the queue stages in function_app.py.
+"""
+
+from .stage_metrics import StageMetrics, percentile, size_bucket, summarize_latencies, utc_now
+
+__all__ = [
+    'StageMetrics',
+    'percentile',
+    'size_bucket',
+    'summarize_latencies',
+    'utc_now'
+]
@@ -0,0 +1,116 @@
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from .summary_blocks import SummarySegment
+
+# 既定値（SUMMARY_BLOCK_* 環境変数で上書き）
+DEFAULT_MIN_TOKENS = 300
+DEFAULT_MAX_TOKENS = 2500
+DEFAULT_MIN_SECONDS = 120
+DEFAULT_MAX_SECONDS = 900
+DEFAULT_PAUSE_SECONDS = 20
+DEFAULT_TOPIC_SHIFT_THRESHOLD = 0.15
+DEFAULT_TOPIC_WINDOW = 4
+NGRAM_SIZE = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数の概算（tokenizer を使わない）
+
+    日本語は1文字ほぼ1トークン、ASCII は4文字で1トークンとして数える。
+    """
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_count) + math.ceil(ascii_count / 4)
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> Counter:
+    """空白を除いた文字 n-gram の出現数"""
+    compact = "".join(text.split())
+    return Counter(compact[i:i + n] for i in range(len(compact) - n + 1))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    """n-gram 出現数ベクトルのコサイン類似度（どちらかが空なら 1.0 = 話題転換なしとみなす）"""
+    if not a or not b:
+        return 1.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 1.0
+
+
+def topic_similarity(segments: Sequence[SummarySegment], boundary: int,
+                     window: int = DEFAULT_TOPIC_WINDOW, lower: int = 0) -> float:
+    """
+    segments[boundary] の直前 window 行（lower 以降）と直後 window 行の文字 n-gram 類似度
+
+    値が小さいほど境界の前後で話題が変わっている。
+    """
+    before = segments[max(lower, boundary - window):boundary]
+    after = segments[boundary:boundary + window]
+    return cosine_similarity(
+        char_ngrams("".join(segment.text for segment in before)),
+        char_ngrams("".join(segment.text for segment in after)),
+    )
+
+
+def build_adaptive_blocks(segments: Sequence[SummarySegment],
+                          min_tokens: int = DEFAULT_MIN_TOKENS,
+                          max_tokens: int = DEFAULT_MAX_TOKENS,
+                          min_seconds: float = DEFAULT_MIN_SECONDS,
+                          max_seconds: float = DEFAULT_MAX_SECONDS,
+                          pause_seconds: float = DEFAULT_PAUSE_SECONDS,
+                          topic_shift_threshold: float = DEFAULT_TOPIC_SHIFT_THRESHOLD,
+                          topic_window: int = DEFAULT_TOPIC_WINDOW) -> List[Dict[str, Any]]:
+    """
+    トークン数・時間の予算内で、話者交代・間・話題転換の位置でブロックを区切る
+
+    - 行を追加すると max_tokens を超える場合は、その行の前で必ず区切る
+    - max_seconds を超える場合も区切るが、min_tokens に満たない間は区切らない（発話の少ない区間で数行だけのブロックを作らない）
+    - min_tokens と min_seconds の両方を満たした後は、話者交代または pause_seconds 以上の間がある位置のうち、
+      前後 topic_window 行の文字 n-gram 類似度が topic_shift_threshold 未満の位置で区切る
+    - 1行で max_tokens を超える場合はその行だけのブロックにする
+
+    Returns:
+        build_time_blocks と同じ形式（segments, block_index, start_offset）。最初のブロックの start_offset は 0.0
+    """
+    blocks: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    current_tokens = 0
+    block_start = 0
+
+    for index, segment in enumerate(segments):
+        tokens = estimate_tokens(segment.text)
+
+        if current is not None:
+            previous = segments[index - 1]
+            duration = segment.offset - current["segments"][0].offset
+            cut = current_tokens + tokens > max_tokens or (duration > max_seconds and current_tokens >= min_tokens)
+            if not cut and current_tokens >= min_tokens and duration >= min_seconds:
+                is_turn = segment.speaker != previous.speaker
+                is_pause = segment.offset - previous.offset >= pause_seconds
+                if is_turn or is_pause:
+                    similarity = topic_similarity(segments, index, topic_window, lower=block_start)
+                    cut = similarity < topic_shift_threshold
+            if cut:
+                blocks.append(current)
+                current = None
+
+        if current is None:
+            current = {
+                "segments": [],
+                "block_index": len(blocks),
+                "start_offset": segment.offset if blocks else 0.0,
+            }
+            current_tokens = 0
+            block_start = index
+
+        current["segments"].append(segment)
+        current_tokens += tokens
+
+    if current is not None:
+        blocks.append(current)
+    return blocks
@@ -0,0 +1,71 @@
+from typing import Any, Dict, Iterable, List
+
+
+def split_sentences(text: str) -> List[str]:
+    """「。」で文に分割する（前後の空白を除き、空の文は含めない）"""
+    return [s.strip() for s in text.strip().split("。") if s.strip()]
+
+
+def remove_word(text: str, word: str) -> str:
+    """
+    text から word（直後の「。」1文字と空白を含む）を左から重ならないようにすべて削除する
+
+    re.sub(re.escape(word) + "[。]?\\s*", "", text) と同じ結果を、正規表現を生成せずに1回の走査で求める。
+    空白の判定は str.isspace（正規表現の \\s と同じ Unicode 空白）。
+    """
+    if not word:
+        return text
+
+    parts = []
+    position = 0
+    length = len(text)
+    word_length = len(word)
+
+    while True:
+        found = text.find(word, position)
+        if found < 0:
+            break
+        parts.append(text[position:found])
+        position = found + word_length
+        if position < length and text[position] == "。":
+            position += 1
+        while position < length and text[position].isspace():
+            position += 1
+
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+class DeletionIndex:
+    """
+    1会議分の文区切りと削除候補の索引
+
+    ステップ2・3で前後の行を参照するたびに行っていた「。」での分割を行ごとに1回だけ行い、
+    ステップ4の削除候補の除去は正規表現を使わず remove_word で行う。
+    """
+
+    def __init__(self, segments: Iterable[Dict[str, Any]] = ()):
+        self._texts: Dict[int, str] = {}
+        self._sentences: Dict[int, List[str]] = {}
+        self._words: Dict[str, str] = {}
+        for segment in segments:
+            self._texts[segment["line_no"]] = segment["transcript_text_segment"]
+
+    def sentences(self, line_no: int) -> List[str]:
+        """line_no の行の文一覧（行がない場合は空）"""
+        sentences = self._sentences.get(line_no)
+        if sentences is None:
+            text = self._texts.get(line_no)
+            sentences = split_sentences(text) if text else []
+            self._sentences[line_no] = sentences
+        return sentences
+
+    def remove(self, text: str, delete_candidate_word: str) -> str:
+        """merge_engine.remove_delete_candidate と同じ結果を返す削除関数"""
+        word = self._words.get(delete_candidate_word)
+        if word is None:
+            word = delete_candidate_word.strip()
+            self._words[delete_candidate_word] = word
+        return remove_word(text, word)
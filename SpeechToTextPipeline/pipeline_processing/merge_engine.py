@@ -0,0 +1,135 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .deletion_index import DeletionIndex
+
+# merge_speaker_blocks が参照する TranscriptProcessingSegments の列
+SEGMENT_KEYS = [
+    "line_no", "speaker", "transcript_text_segment", "offset_seconds", "is_filler",
+    "front_score", "after_score", "merged_text_with_prev", "merged_text_with_next", "delete_candidate_word"
+]
+
+
+def remove_delete_candidate(text: str, delete_candidate_word: str) -> str:
+    """
+    text から delete_candidate_word（直後の「。」と空白を含む）をすべて削除する
+
+    正規表現による基準実装。通常は DeletionIndex.remove（同じ結果）を使う
+    """
+    delete_pattern = re.escape(delete_candidate_word.strip())
+    return re.sub(f"{delete_pattern}[。]?\\s*", "", text)
+
+
+def build_speaker_blocks(segments: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    ステップ4①: 非フィラー行の話者の連続から発話ブロックを構築する
+
+    各ブロックは segments 内の位置 start_index〜end_index（両端を含む）を持つ。
+    範囲内のフィラー行は話者に関係なくそのブロックに含まれ、ブロック間のフィラー行はどのブロックにも含まれない。
+    """
+    blocks = []
+    current_block = None
+
+    for index, segment in enumerate(segments):
+        if segment["is_filler"]:
+            continue
+
+        if current_block is not None and current_block["speaker"] == segment["speaker"]:
+            current_block["end_index"] = index
+            continue
+
+        if current_block is not None:
+            blocks.append(current_block)
+        current_block = {
+            "speaker": segment["speaker"],
+            "start_index": index,
+            "end_index": index,
+            "start_line_no": segment["line_no"],
+            "start_offset": segment["offset_seconds"],
+        }
+
+    if current_block is not None:
+        blocks.append(current_block)
+    return blocks
+
+
+def merge_block_text(block_segments: Sequence[Dict[str, Any]],
+                     remove_candidate: Callable[[str, str], str] = remove_delete_candidate) -> str:
+    """
+    ステップ4②: 1ブロック分の行を結合し、フィラー行の補完・削除候補の除去を適用する
+
+    - フィラー行で front_score > after_score：直前の結合済みテキストから delete_candidate_word を削除し、
+      (merged_text_with_prev) を付加する
+    - フィラー行で after_score >= front_score：次の非フィラー行から、その行の delete_candidate_word を削除する
+    - 非フィラー行の直前がフィラー行で after_score >= front_score：(merged_text_with_next) を付加する
+    """
+    texts = [segment["transcript_text_segment"] for segment in block_segments]
+    merged_text_parts = []
+
+    for seg_idx, segment in enumerate(block_segments):
+        if not segment["is_filler"]:
+            merged_text_parts.append(texts[seg_idx])
+
+            # 前のフィラー行からの補完テキスト
+            if seg_idx > 0:
+                prev_seg = block_segments[seg_idx - 1]
+                if prev_seg["is_filler"] and prev_seg["after_score"] >= prev_seg["front_score"]:
+                    if prev_seg["merged_text_with_next"] and prev_seg["merged_text_with_next"].strip():
+                        complement_text = f"({prev_seg['merged_text_with_next']})"
+                    else:
+                        complement_text = f"({texts[seg_idx - 1]})"
+                    merged_text_parts[-1] = f"{merged_text_parts[-1]}{complement_text}"
+            continue
+
+        delete_candidate_word = segment["delete_candidate_word"]
+        if not (delete_candidate_word and delete_candidate_word.strip()):
+            continue
+
+        front_score = segment["front_score"]
+        after_score = segment["after_score"]
+
+        if front_score > after_score:
+            if seg_idx > 0 and merged_text_parts:
+                cleaned_prev_text = remove_candidate(merged_text_parts[-1], delete_candidate_word)
+                if segment["merged_text_with_prev"] and segment["merged_text_with_prev"].strip():
+                    complement_text = f"({segment['merged_text_with_prev']})"
+                else:
+                    complement_text = f"({texts[seg_idx]})"
+                merged_text_parts[-1] = f"{cleaned_prev_text}{complement_text}"
+
+        elif after_score >= front_score:
+            if seg_idx + 1 < len(block_segments):
+                next_seg = block_segments[seg_idx + 1]
+                if not next_seg["is_filler"]:
+                    next_delete_candidate_word = next_seg["delete_candidate_word"]
+                    if next_delete_candidate_word and next_delete_candidate_word.strip():
+                        texts[seg_idx + 1] = remove_candidate(texts[seg_idx + 1], next_delete_candidate_word)
+
+    return " ".join(merged_text_parts).strip()
+
+
+def merge_speaker_blocks(segments: Sequence[Dict[str, Any]],
+                         remove_candidate: Optional[Callable[[str, str], str]] = None) -> List[Dict[str, Any]]:
+    """
+    ステップ4: TranscriptProcessingSegments 行から ProcessedTranscriptSegments 行を構築する（DB アクセスなし）
+
+    Args:
+        segments: SEGMENT_KEYS を持つ dict のリスト（line_no 順でなければ並べ替える）
+        remove_candidate: 削除候補の除去関数（省略時は会議ごとの DeletionIndex.remove）
+
+    Returns:
+        list[dict]: line_no（ブロック先頭行）, speaker, merged_text, offset_seconds（ブロック先頭行）
+    """
+    ordered = sorted(segments, key=lambda segment: segment["line_no"])
+    if remove_candidate is None:
+        remove_candidate = DeletionIndex().remove
+    rows = []
+    for block in build_speaker_blocks(ordered):
+        block_segments = ordered[block["start_index"]:block["end_index"] + 1]
+        rows.append({
+            "line_no": block["start_line_no"],
+            "speaker": block["speaker"],
+            "merged_text": merge_block_text(block_segments, remove_candidate),
+            "offset_seconds": block["start_offset"],
+        })
+    return rows
@@ -0,0 +1,46 @@
+import bisect
+import json
+from typing import List, NamedTuple
+
+# audio-converter-app2（converters/vad.py）が WAV と同じコンテナに書き出す対応表の形式
+OFFSET_REMAP_VERSION = 1
+OFFSET_REMAP_SUFFIX = ".offsets.json"
+
+
+class OffsetRemap(NamedTuple):
+    """無音を圧縮した WAV の位置 → 元の音声の位置の対応表"""
+    trimmed_starts: List[float]
+    original_starts: List[float]
+    original_duration: float
+    trimmed_duration: float
+
+
+def offset_remap_name(wav_blob_name: str) -> str:
+    """rec.wav → rec.offsets.json"""
+    return wav_blob_name.rsplit(".", 1)[0] + OFFSET_REMAP_SUFFIX
+
+
+def parse_offset_remap(data: bytes) -> OffsetRemap:
+    """
+    対応表（JSON）を読み込む
+
+    バージョンが一致しない場合は ValueError
+    """
+    document = json.loads(data.decode("utf-8"))
+    if document.get("version") != OFFSET_REMAP_VERSION:
+        raise ValueError(f"未対応の offset 対応表です: version={document.get('version')}")
+    segments = sorted(document["segments"], key=lambda segment: segment["trimmed_start"])
+    return OffsetRemap(
+        trimmed_starts=[float(segment["trimmed_start"]) for segment in segments],
+        original_starts=[float(segment["original_start"]) for segment in segments],
+        original_duration=float(document["original_duration_seconds"]),
+        trimmed_duration=float(document["trimmed_duration_seconds"]),
+    )
+
+
+def to_original_offset(remap: OffsetRemap, trimmed_seconds: float) -> float:
+    """文字起こしの offset（圧縮後の WAV 上の秒数）を元の音声上の秒数に変換する"""
+    index = bisect.bisect_right(remap.trimmed_starts, trimmed_seconds) - 1
+    if index < 0:
+        return trimmed_seconds
+    return remap.original_starts[index] + (trimmed_seconds - remap.trimmed_starts[index])
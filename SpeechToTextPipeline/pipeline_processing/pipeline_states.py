@@ -0,0 +1,148 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+# ステージの順序と、各ステージが開始できる状態（前ステージの完了状態）
+PIPELINE_STAGES = ["preprocessing", "merging", "summary", "export"]
+STAGE_READY_STATES = {
+    "preprocessing": "transcribed",
+    "merging": "preprocessing_completed",
+    "summary": "merging_completed",
+    "export": "summary_completed",
+}
+ALL_COMPLETED_STATE = "AllStepCompleted"
+
+DEFAULT_LEASE_SECONDS = 1800
+
+# claim できる判定結果
+CLAIMABLE_REASONS = ("ready", "retry", "lease_expired")
+
+
+class PipelineState(NamedTuple):
+    """PipelineStates の1行"""
+    meeting_id: int
+    state: str
+    version: int
+    lease_owner: Optional[str]
+    lease_expires: Optional[datetime]
+    state_entered: Optional[datetime]
+
+
+class StageLease(NamedTuple):
+    """claim したステージ（owner が None の場合は状態管理が無効）"""
+    meeting_id: int
+    stage: str
+    owner: Optional[str]
+    expires: Optional[datetime]
+
+
+def in_progress_state(stage: str) -> str:
+    return f"{stage}_in_progress"
+
+
+def failed_state(stage: str) -> str:
+    return f"{stage}_failed"
+
+
+def completed_state(stage: str) -> str:
+    """export の完了は AllStepCompleted（従来の Meetings.status と同じ）"""
+    return ALL_COMPLETED_STATE if stage == "export" else f"{stage}_completed"
+
+
+def is_shard_state(stage: str, state: str) -> bool:
+    """シャード実行中・統合中の状態（dispatch_stage_shards / finalize_sharded_stage が管理する）"""
+    return state in (f"{stage}_sharded", f"{stage}_stitching")
+
+
+def state_progress(state: str) -> Optional[int]:
+    """
+    状態のパイプライン上の位置（transcribed=0、ステージ i の処理中・失敗・シャード実行中=2i+1、完了=2i+2）
+
+    パイプライン外の状態（processing / failed / timeout など）は None。
+    """
+    if state == STAGE_READY_STATES["preprocessing"]:
+        return 0
+    if state == ALL_COMPLETED_STATE:
+        return 2 * len(PIPELINE_STAGES)
+    for index, stage in enumerate(PIPELINE_STAGES):
+        if state == completed_state(stage):
+            return 2 * index + 2
+        if state.startswith(f"{stage}_"):
+            return 2 * index + 1
+    return None
+
+
+def decide_claim(stage: str, current: PipelineState, now: datetime) -> str:
+    """
+    現在の状態から stage を claim できるか判定する
+
+    Returns:
+        ready（前ステージ完了）/ retry（前回失敗）/ lease_expired（処理中だがリース切れ）は claim できる。
+        leased（他のワーカーが処理中）/ sharded（シャード実行・統合中）/ passed（完了済み）/
+        not_ready（前ステージ未完了）/ unknown（パイプライン外の状態）は claim しない。
+    """
+    if current.state == STAGE_READY_STATES[stage]:
+        return "ready"
+    if current.state == failed_state(stage):
+        return "retry"
+    if current.state == in_progress_state(stage):
+        if current.lease_expires is None or current.lease_expires <= now:
+            return "lease_expired"
+        return "leased"
+
+    progress = state_progress(current.state)
+    if progress is None:
+        return "unknown"
+    stage_progress = 2 * PIPELINE_STAGES.index(stage) + 1
+    if progress == stage_progress:
+        return "sharded" if is_shard_state(stage, current.state) else "unknown"
+    return "passed" if progress > stage_progress else "not_ready"
+
+
+def find_resumable_stage(current: PipelineState, now: datetime) -> Tuple[Optional[str], str]:
+    """
+    preprocessing より後のステージのうち、次に実行するステージと decide_claim の判定結果
+
+    ファストパス（preprocessing のメッセージ内で後続ステージを連続実行する）が途中で失敗・中断した場合は
+    後続ステージのメッセージが存在しないため、preprocessing の再配信時にこの結果からメッセージを投入し直す。
+    実行するステージがない場合（全ステージ完了・シャード実行中・preprocessing 未完了など）は (None, 判定結果)。
+    """
+    for stage in PIPELINE_STAGES[1:]:
+        reason = decide_claim(stage, current, now)
+        if reason == "passed":
+            continue
+        if reason in CLAIMABLE_REASONS or reason == "leased":
+            return stage, reason
+        return None, reason
+    return None, "passed"
+
+
+def new_lease_owner() -> str:
+    """リース所有者の識別子（ホスト名:PID:乱数）"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def lease_expiry(now: datetime, lease_seconds: int) -> datetime:
+    return now + timedelta(seconds=lease_seconds)
+
+
+def seconds_in_state(current: PipelineState, now: datetime) -> Optional[float]:
+    """現在の状態に入ってからの秒数（遷移履歴の from_state_seconds）"""
+    if current.state_entered is None:
+        return None
+    return round((now - current.state_entered).total_seconds(), 3)
+
+
+def can_release(current: PipelineState, lease: StageLease) -> Tuple[bool, str]:
+    """
+    claim した本人が状態を更新できるか判定する（完了・失敗の記録用）
+
+    処理中（in_progress）のほか、完了直後（次ステージが claim する前）も本人であれば失敗に戻せる。
+    """
+    if current.state not in (in_progress_state(lease.stage), completed_state(lease.stage)):
+        return False, f"状態が既に更新されています (state={current.state})"
+    if current.lease_owner != lease.owner:
+        return False, f"リース所有者が異なります (owner={current.lease_owner})"
+    return True, ""
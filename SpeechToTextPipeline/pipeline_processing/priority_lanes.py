@@ -0,0 +1,79 @@
+from typing import Dict, Optional
+
+# 優先度の高い順
+LANES = ["high", "normal", "bulk"]
+DEFAULT_LANE = "normal"
+DEFAULT_LANE_WEIGHTS = {"high": 6, "normal": 3, "bulk": 1}
+
+
+def lane_queue_name(stage_queue: str, lane: str) -> str:
+    """
+    ステージキュー名とレーンからキュー名を返す
+
+    normal レーンは既存のキュー名（例: queue-merging）をそのまま使い、
+    high / bulk は接尾辞を付ける（例: queue-merging-high）。
+    """
+    if lane == DEFAULT_LANE:
+        return stage_queue
+    return f"{stage_queue}-{lane}"
+
+
+def normalize_lane(value: Optional[str]) -> Optional[str]:
+    """メッセージやフラグで指定されたレーン名を検証する（不正値は None）"""
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    return value if value in LANES else None
+
+
+def choose_lane(duration_seconds: Optional[float], is_manager: bool = False, explicit: Optional[str] = None,
+                high_max_duration: int = 900, bulk_min_duration: int = 5400,
+                high_for_managers: bool = False) -> str:
+    """
+    会議のレーンを決定する
+
+    優先順位: 明示指定 > マネージャー（high_for_managers 有効時） > 音声時間
+    high_max_duration / bulk_min_duration が 0 の場合はその判定を行わない。
+    音声時間が不明（None または 0 以下）の場合は DEFAULT_LANE（未分類の処理を優先しない）。
+    """
+    lane = normalize_lane(explicit)
+    if lane:
+        return lane
+    if high_for_managers and is_manager:
+        return "high"
+
+    if duration_seconds is None or duration_seconds <= 0:
+        return DEFAULT_LANE
+    if high_max_duration and duration_seconds <= high_max_duration:
+        return "high"
+    if bulk_min_duration and duration_seconds >= bulk_min_duration:
+        return "bulk"
+    return DEFAULT_LANE
+
+
+def parse_lane_weights(value: Optional[str]) -> Dict[str, int]:
+    """"6,3,1" 形式（high,normal,bulk の順）の重み指定を解釈する"""
+    if not value:
+        return dict(DEFAULT_LANE_WEIGHTS)
+    parts = [p.strip() for p in value.split(",")]
+    if len(parts) != len(LANES):
+        raise ValueError(f"レーンの重みは {len(LANES)} 個指定してください: {value}")
+    return {lane: max(1, int(part)) for lane, part in zip(LANES, parts)}
+
+
+def higher_lanes(lane: str) -> list:
+    """lane より優先度の高いレーン"""
+    return LANES[:LANES.index(lane)]
+
+
+def yield_probability(lane: str, higher_depths: Dict[str, int], weights: Dict[str, int]) -> float:
+    """
+    上位レーンに滞留がある場合に、このレーンのメッセージを後回しにする確率
+
+    滞留している上位レーンの重みの合計を H、自レーンの重みを w とすると H / (H + w)。
+    例えば重み 6:3:1 で high に滞留があれば、bulk は 6/7 の確率で後回しになる。
+    """
+    pending_weight = sum(weights[h] for h, depth in higher_depths.items() if depth > 0)
+    if not pending_weight:
+        return 0.0
+    return pending_weight / (pending_weight + weights[lane])
@@ -0,0 +1,57 @@
+from typing import Dict, List, Sequence, Tuple
+
+
+def plan_shards(lines: Sequence[Tuple[int, int]], shard_size: int, overlap: int = 0) -> List[Dict[str, int]]:
+    """
+    line_no 順の (line_no, speaker) を話者ブロック境界で分割したシャード一覧を返す
+
+    各シャードは担当範囲（start_line〜end_line）と、前後 overlap 行を含む
+    参照範囲（context_start_line〜context_end_line）を持つ。担当範囲は重複しない。
+
+    境界は shard_size 行目から先（行番号の大きい方）へ最大 shard_size // 2 行まで話者の切り替わりを探し
+    （その範囲で最終行に達した場合は末尾まで含める）、見つからなければ手前（開始行の方）へ探す。
+    どちらにもない（1話者の発話が続く）場合は shard_size 行で区切る。
+    """
+    shard_size = max(1, shard_size)
+    count = len(lines)
+    shards = []
+    start = 0
+
+    while start < count:
+        end = min(start + shard_size, count)  # 担当範囲の終端（この位置は含まない）
+
+        if end < count and lines[end][1] == lines[end - 1][1]:
+            limit = min(count, end + shard_size // 2)
+            forward = end
+            while forward < limit and lines[forward][1] == lines[forward - 1][1]:
+                forward += 1
+
+            if forward < limit or forward == count:
+                end = forward
+            else:
+                backward = end - 1
+                while backward > start and lines[backward][1] == lines[backward - 1][1]:
+                    backward -= 1
+                if backward > start:
+                    end = backward
+
+        shards.append({
+            "shard_no": len(shards),
+            "start_line": lines[start][0],
+            "end_line": lines[end - 1][0],
+            "context_start_line": lines[max(0, start - overlap)][0],
+            "context_end_line": lines[min(count - 1, end - 1 + overlap)][0],
+        })
+        start = end
+
+    return shards
+
+
+def find_uncovered_lines(shards: Sequence[Dict[str, int]], line_nos: Sequence[int]) -> List[int]:
+    """どのシャードの担当範囲にも含まれない、または複数のシャードに含まれる line_no を返す"""
+    problems = []
+    for line_no in line_nos:
+        owners = sum(1 for shard in shards if shard["start_line"] <= line_no <= shard["end_line"])
+        if owners != 1:
+            problems.append(line_no)
+    return problems
@@ -0,0 +1,57 @@
+import gzip
+import json
+import os
+import uuid
+from typing import Optional, Tuple
+
+SNAPSHOT_VERSION = 1
+
+
+def encode_snapshot(meeting_id: int, stage: str, rows: list) -> bytes:
+    """ステージ出力を gzip 圧縮した JSON に変換する（タプルは配列になる）"""
+    document = {"version": SNAPSHOT_VERSION, "meeting_id": meeting_id, "stage": stage, "rows": rows}
+    return gzip.compress(json.dumps(document, ensure_ascii=False, default=str).encode("utf-8"), compresslevel=6)
+
+
+def decode_snapshot(data: bytes, meeting_id: int, stage: str) -> list:
+    """
+    encode_snapshot の出力を読み込む
+
+    会議・ステージ・バージョンが一致しない場合は ValueError
+    """
+    document = json.loads(gzip.decompress(data).decode("utf-8"))
+    if document.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"未対応のスナップショット形式です: version={document.get('version')}")
+    if document.get("meeting_id") != meeting_id or document.get("stage") != stage:
+        raise ValueError(
+            f"スナップショットの対象が一致しません: meeting_id={document.get('meeting_id')}, stage={document.get('stage')}"
+        )
+    return document["rows"]
+
+
+def snapshot_name(meeting_id: int, stage: str) -> str:
+    """スナップショットの保存名（再配信で上書きしないよう毎回一意にする）"""
+    return f"{meeting_id}/{stage}-{uuid.uuid4().hex}.json.gz"
+
+
+def write_local_snapshot(directory: str, name: str, data: bytes) -> str:
+    """ローカルディスクに保存し、ポインタ（file://...）を返す"""
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return f"file://{path}"
+
+
+def parse_snapshot_pointer(pointer: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    キューメッセージ内のポインタを (scheme, location) に分解する
+
+    file://<絶対パス> / blob://<コンテナー>/<ブロブ名> に対応。不正な値は None
+    """
+    if not pointer or "://" not in pointer:
+        return None
+    scheme, location = pointer.split("://", 1)
+    if scheme not in ("file", "blob") or not location:
+        return None
+    return scheme, location
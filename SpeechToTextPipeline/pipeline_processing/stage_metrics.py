@@ -0,0 +1,199 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+# レポートで使用する会議サイズ（音声時間）の区分：(ラベル, 上限秒)
+SIZE_BUCKETS = [
+    ("~10min", 600),
+    ("10-30min", 1800),
+    ("30-60min", 3600),
+    ("60-120min", 7200),
+    ("120min~", None),
+]
+
+
+def utc_now() -> datetime:
+    """DB 保存用の UTC 現在時刻（タイムゾーン情報なし）"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_utc(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 文字列を UTC（タイムゾーン情報なし）の datetime に変換する"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class CountingCursor:
+    """execute の呼び出し回数を StageMetrics に加算する cursor ラッパー"""
+
+    def __init__(self, cursor, metrics: "StageMetrics"):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, *args, **kwargs):
+        self._metrics.db_round_trips += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._metrics.db_round_trips += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # fast_executemany などの設定は元の cursor に反映する
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class CountingConnection:
+    """cursor() / commit() を計測対象にする connection ラッパー"""
+
+    def __init__(self, conn, metrics: "StageMetrics"):
+        self.raw = conn
+        self._metrics = metrics
+
+    def cursor(self):
+        return CountingCursor(self.raw.cursor(), self._metrics)
+
+    def commit(self):
+        self._metrics.db_round_trips += 1
+        return self.raw.commit()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __setattr__(self, name, value):
+        # autocommit などの設定は元の connection に反映する
+        if name == "raw" or name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.raw, name, value)
+
+
+def unwrap_connection(conn):
+    """CountingConnection であれば元の connection を返す"""
+    return conn.raw if isinstance(conn, CountingConnection) else conn
+
+
+class StageMetrics:
+    """
+    1ステージ実行分の計測値
+
+    enqueued_at: 前ステージがキューに投入した時刻
+    dequeued_at: Queue Trigger 関数が起動した時刻
+    started_at / ended_at: DB 接続取得後のステージ処理本体の開始・終了
+    """
+
+    def __init__(self, meeting_id: int, stage: str, via_fast_path: bool = False, lane: str = "normal"):
+        self.meeting_id = meeting_id
+        self.stage = stage
+        self.lane = lane
+        self.via_fast_path = via_fast_path
+        self.status = "running"
+        self.dequeue_count: Optional[int] = None
+        self.enqueued_at: Optional[datetime] = None
+        self.dequeued_at: Optional[datetime] = None
+        self.started_at: Optional[datetime] = None
+        self.ended_at: Optional[datetime] = None
+        self.item_count: Optional[int] = None
+        self.db_round_trips = 0
+        self.llm_calls = 0
+        self.error_message: Optional[str] = None
+        self.connection = None
+        # openai_processing.client.set_llm_call_counter に渡すカウンタ
+        self.llm_counter = {"llm_calls": 0}
+
+    def bind_message(self, message_data: Dict[str, Any], insertion_time=None, dequeue_count=None,
+                     received_at: Optional[datetime] = None):
+        """キューメッセージから投入時刻・受信時刻・再配信回数を取り込む"""
+        self.enqueued_at = parse_utc(message_data.get("enqueued_at"))
+        if self.enqueued_at is None and insertion_time is not None:
+            self.enqueued_at = parse_utc(insertion_time.isoformat())
+        self.dequeued_at = received_at or utc_now()
+        self.dequeue_count = dequeue_count
+
+    def wrap_connection(self, conn) -> CountingConnection:
+        """DB 接続を計測用にラップし、ステージ処理の開始時刻を記録する"""
+        self.started_at = utc_now()
+        self.connection = unwrap_connection(conn)
+        return CountingConnection(self.connection, self)
+
+    def finish(self, status: str, error: Optional[BaseException] = None):
+        self.ended_at = utc_now()
+        if self.started_at is None:
+            self.started_at = self.ended_at
+        self.status = status
+        self.llm_calls = self.llm_counter["llm_calls"]
+        if error is not None:
+            self.error_message = str(error)[:1000]
+
+    def as_row(self) -> tuple:
+        """PipelineStageMetrics への INSERT パラメータ"""
+        return (
+            self.meeting_id, self.stage, self.lane, self.status, 1 if self.via_fast_path else 0, self.dequeue_count,
+            self.enqueued_at, self.dequeued_at, self.started_at, self.ended_at,
+            self.item_count, self.db_round_trips, self.llm_calls, self.error_message
+        )
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """線形補間によるパーセンタイル（p は 0〜100）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * p / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def size_bucket(duration_seconds: Optional[float]) -> str:
+    """音声時間から会議サイズ区分のラベルを返す"""
+    seconds = duration_seconds or 0
+    for label, upper in SIZE_BUCKETS:
+        if upper is None or seconds < upper:
+            return label
+    return SIZE_BUCKETS[-1][0]
+
+
+def summarize_latencies(rows: Iterable[Dict[str, Any]], group_keys: List[str], metrics: List[str]) -> List[Dict[str, Any]]:
+    """
+    行を group_keys でグループ化し、各 metric の件数と p50/p95/p99 を算出する
+
+    Args:
+        rows: 1行 = 1ステージ実行（metric 列は秒数、None は集計対象外）
+    """
+    groups: Dict[tuple, Dict[str, List[float]]] = {}
+    for row in rows:
+        key = tuple(row[k] for k in group_keys)
+        bucket = groups.setdefault(key, {m: [] for m in metrics})
+        for m in metrics:
+            if row.get(m) is not None:
+                bucket[m].append(float(row[m]))
+
+    results = []
+    for key in sorted(groups, key=lambda k: tuple(str(v) for v in k)):
+        result = dict(zip(group_keys, key))
+        for m in metrics:
+            values = groups[key][m]
+            result[f"{m}_count"] = len(values)
+            for p in (50, 95, 99):
+                result[f"{m}_p{p}"] = percentile(values, p)
+        results.append(result)
+    return results
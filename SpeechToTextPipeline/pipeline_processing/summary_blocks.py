@@ -0,0 +1,80 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+# 旧実装の int(offset // 300) と同じ固定幅ブロック
+DEFAULT_BLOCK_SECONDS = 300
+
+
+class SummarySegment(NamedTuple):
+    """ステップ7の入力となる ProcessedTranscriptSegments 1行"""
+    segment_id: Any
+    speaker: Any
+    text: str
+    offset_seconds: Any
+
+    @property
+    def offset(self) -> float:
+        return float(self.offset_seconds)
+
+    def render_line(self) -> str:
+        """タイトル生成プロンプト用の1行（例：'Speaker1: こんにちは。(12.5)'）"""
+        return f"Speaker{self.speaker}: {self.text}({self.offset_seconds})"
+
+
+def to_summary_segments(rows: Iterable[Tuple]) -> Tuple[List[SummarySegment], int]:
+    """
+    (id, speaker, cleaned_text, offset_seconds) の行を SummarySegment に変換する
+
+    本文が空の行は除外する。offset が None または負の行（旧実装で extract_offset_from_line が
+    offset を取得できなかった行）も除外し、その件数を返す。
+
+    Returns:
+        (segments, skipped_count)
+    """
+    segments = []
+    skipped = 0
+    for segment_id, speaker, text, offset_seconds in rows:
+        if not text:
+            continue
+        if offset_seconds is None or float(offset_seconds) < 0:
+            skipped += 1
+            continue
+        segments.append(SummarySegment(segment_id, speaker, text, offset_seconds))
+    return segments, skipped
+
+
+def build_time_blocks(segments: Iterable[SummarySegment],
+                      block_seconds: int = DEFAULT_BLOCK_SECONDS) -> List[Dict[str, Any]]:
+    """
+    block_seconds 秒単位の固定幅ブロックに分割する
+
+    最初のブロックの番号は 0・start_offset は 0.0 から始まる（旧実装と同じ）。
+    各ブロックは segments（SummarySegment のリスト）, block_index, start_offset を持つ。
+    """
+    blocks = []
+    current_block = {"segments": [], "block_index": 0, "start_offset": 0.0}
+    for segment in segments:
+        block_index = int(segment.offset // block_seconds)
+        if block_index != current_block["block_index"]:
+            if current_block["segments"]:
+                blocks.append(current_block)
+            current_block = {"segments": [], "block_index": block_index, "start_offset": segment.offset}
+        current_block["segments"].append(segment)
+    if current_block["segments"]:
+        blocks.append(current_block)
+    return blocks
+
+
+def render_block_text(segments: Iterable[SummarySegment]) -> str:
+    """ブロックの会話テキスト（タイトル生成プロンプト用）"""
+    return "\n".join(segment.render_line() for segment in segments)
+
+
+def summary_segment_row(segment: SummarySegment) -> Tuple[int, str, Any, int]:
+    """
+    ConversationSummaries のセグメント行 (speaker, content, offset_seconds, is_summary=0)
+
+    speaker が整数でない場合は 0、本文が空白のみの場合は「（内容なし）」に置き換える。
+    """
+    speaker = segment.speaker if isinstance(segment.speaker, int) else 0
+    content = segment.text if segment.text.strip() else "（内容なし）"
+    return speaker, content, segment.offset_seconds, 0
@@ -0,0 +1,173 @@
+import json
+from typing import List, NamedTuple, Optional, Tuple
+
+# audio-converter-app2（converters/chunking.py）が WAV と同じコンテナに書き出すマニフェストの形式
+# （1: チャンクの重なりなし、2: 各チャンクに前のチャンクと重なる秒数 overlap_seconds を追加）
+CHUNK_MANIFEST_VERSIONS = (1, 2)
+CHUNK_MANIFEST_SUFFIX = ".chunks.json"
+
+# 重なった区間で同じ話者とみなす最小の同時発話秒数
+MIN_OVERLAP_MATCH_SECONDS = 0.5
+
+
+class TranscriptChunk(NamedTuple):
+    """
+    長時間録音を分割したチャンク（start_seconds は元の WAV 上の開始位置）
+
+    先頭の overlap_seconds は前のチャンクの末尾と同じ音声（区切り位置は start_seconds + overlap_seconds）。
+    """
+    index: int
+    container: str
+    blob: str
+    start_seconds: float
+    duration_seconds: float
+    overlap_seconds: float = 0.0
+
+
+class Phrase(NamedTuple):
+    """文字起こし結果の1フレーズ（offset_seconds が None の場合は offset を取得できなかった）"""
+    speaker: object
+    text: str
+    offset_seconds: Optional[float]
+    duration_seconds: float
+
+
+def chunk_manifest_name(wav_blob_name: str) -> str:
+    """rec.wav → rec.chunks.json"""
+    return wav_blob_name.rsplit(".", 1)[0] + CHUNK_MANIFEST_SUFFIX
+
+
+def parse_chunk_manifest(data: bytes) -> List[TranscriptChunk]:
+    """
+    マニフェスト（JSON）を読み込む（開始位置順）
+
+    バージョンが一致しない場合は ValueError
+    """
+    document = json.loads(data.decode("utf-8"))
+    if document.get("version") not in CHUNK_MANIFEST_VERSIONS:
+        raise ValueError(f"未対応のチャンクマニフェストです: version={document.get('version')}")
+    chunks = [
+        TranscriptChunk(int(chunk["index"]), chunk["container"], chunk["blob"],
+                        float(chunk["start_seconds"]), float(chunk["duration_seconds"]),
+                        float(chunk.get("overlap_seconds", 0.0)))
+        for chunk in document["chunks"]
+    ]
+    return sorted(chunks, key=lambda chunk: chunk.start_seconds)
+
+
+def speaker_totals(phrases: List[Phrase]) -> dict:
+    """話者ごとの発話秒数"""
+    totals = {}
+    for phrase in phrases:
+        totals[phrase.speaker] = totals.get(phrase.speaker, 0.0) + phrase.duration_seconds
+    return totals
+
+
+def overlap_votes(previous: List[Phrase], current: List[Phrase], region: Tuple[float, float]) -> dict:
+    """
+    重なった区間（region = (開始秒, 終了秒)）で、前のチャンクの話者とこのチャンクの話者が同時に発話している秒数
+
+    Returns:
+        dict: {(前のチャンクの話者, このチャンクの話者): 秒数}
+    """
+    start, end = region
+
+    def clipped(phrases):
+        intervals = []
+        for phrase in phrases:
+            if not isinstance(phrase.speaker, int) or phrase.offset_seconds is None:
+                continue
+            phrase_start = max(start, phrase.offset_seconds)
+            phrase_end = min(end, phrase.offset_seconds + phrase.duration_seconds)
+            if phrase_end > phrase_start:
+                intervals.append((phrase.speaker, phrase_start, phrase_end))
+        return intervals
+
+    votes = {}
+    current_intervals = clipped(current)
+    for previous_speaker, previous_start, previous_end in clipped(previous):
+        for speaker, phrase_start, phrase_end in current_intervals:
+            shared = min(previous_end, phrase_end) - max(previous_start, phrase_start)
+            if shared > 0:
+                votes[(previous_speaker, speaker)] = votes.get((previous_speaker, speaker), 0.0) + shared
+    return votes
+
+
+def reconcile_speakers(chunk_phrases: List[List[Phrase]],
+                       overlaps: Optional[List[Optional[Tuple[float, float]]]] = None) -> List[List[Phrase]]:
+    """
+    チャンクごとに独立して振られた話者番号をそろえる
+
+    Speech の話者分離はジョブごとに番号を振り直すため、前のチャンクと重なった区間（overlaps[i]、offset と同じ時間軸）で
+    同時に発話している秒数が多い組から順に、前のチャンクの（そろえた後の）話者に対応付ける。
+    重なりがない・重なった区間で発話しなかった話者は、発話秒数の多い順に、残りの話者のうち
+    それまでのチャンクの累計発話秒数の順位が同じ話者に対応付け、足りない場合は新しい番号を振る。
+    数値でない話者（Unknown など）はそのまま残す。
+    """
+    totals = {}
+    reconciled = []
+    for position, phrases in enumerate(chunk_phrases):
+        local = speaker_totals([phrase for phrase in phrases if isinstance(phrase.speaker, int)])
+        local_order = sorted(local, key=lambda speaker: (-local[speaker], speaker))
+        if not totals:
+            mapping = {speaker: speaker for speaker in local_order}
+        else:
+            mapping = {}
+            region = overlaps[position] if overlaps else None
+            if region:
+                votes = overlap_votes(reconciled[-1], phrases, region)
+                for (previous_speaker, speaker), seconds in sorted(votes.items(), key=lambda item: (-item[1], item[0])):
+                    if (seconds >= MIN_OVERLAP_MATCH_SECONDS and speaker not in mapping
+                            and previous_speaker not in mapping.values()):
+                        mapping[speaker] = previous_speaker
+
+            used = set(mapping.values())
+            global_order = [speaker for speaker in sorted(totals, key=lambda speaker: (-totals[speaker], speaker))
+                            if speaker not in used]
+            next_label = max(totals) + 1
+            for speaker in local_order:
+                if speaker in mapping:
+                    continue
+                if global_order:
+                    mapping[speaker] = global_order.pop(0)
+                else:
+                    mapping[speaker] = next_label
+                    next_label += 1
+
+        for speaker, seconds in local.items():
+            totals[mapping[speaker]] = totals.get(mapping[speaker], 0.0) + seconds
+        reconciled.append([phrase._replace(speaker=mapping.get(phrase.speaker, phrase.speaker)) for phrase in phrases])
+    return reconciled
+
+
+def stitch_phrases(chunks: List[TranscriptChunk], chunk_phrases: List[List[Phrase]]) -> List[Phrase]:
+    """
+    チャンクごとの文字起こし結果を1つにまとめる
+
+    offset にチャンクの開始位置を足して元の WAV 上の位置に戻し、話者番号をそろえてから offset 順に並べる。
+    前のチャンクと重なった区間（区切り位置より前）の発話は、話者の対応付けにのみ使い、前のチャンクの結果を残す。
+    """
+    shifted = []
+    for chunk, phrases in zip(chunks, chunk_phrases):
+        shifted.append([
+            phrase if phrase.offset_seconds is None
+            else phrase._replace(offset_seconds=phrase.offset_seconds + chunk.start_seconds)
+            for phrase in phrases
+        ])
+    overlaps = [
+        (chunk.start_seconds, chunk.start_seconds + chunk.overlap_seconds) if position and chunk.overlap_seconds > 0 else None
+        for position, chunk in enumerate(chunks)
+    ]
+    keyed = []
+    for chunk, phrases in zip(chunks, reconcile_speakers(shifted, overlaps)):
+        # offset を取得できなかったフレーズは直前のフレーズの位置に並べる（sorted は安定ソート）
+        cut = chunk.start_seconds + chunk.overlap_seconds
+        position = cut
+        duplicated = False
+        for phrase in phrases:
+            if phrase.offset_seconds is not None:
+                duplicated = phrase.offset_seconds < cut
+                position = phrase.offset_seconds
+            if not duplicated:
+                keyed.append((position, phrase))
+    return [phrase for _, phrase in sorted(keyed, key=lambda item: item[0])]
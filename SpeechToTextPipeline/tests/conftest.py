@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# pipeline_processing を SpeechToTextPipeline 直下から import する（function_app と同じ配置）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
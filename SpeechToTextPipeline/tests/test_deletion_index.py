@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from benchmarks.bench_deletion_index import GOLDEN_PATH, check_fuzz, merge_digest
+from benchmarks.synthetic_transcripts import generate_processing_records
+from pipeline_processing.deletion_index import DeletionIndex, split_sentences
+from pipeline_processing.merge_engine import merge_speaker_blocks, remove_delete_candidate
+
+# 正規表現版（基準実装）で生成した期待値（benchmarks/bench_deletion_index.py --update-golden）
+GOLDEN = json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", GOLDEN["remove_cases"], ids=lambda case: repr(case["word"]))
+def test_remove_matches_golden(case):
+    assert DeletionIndex().remove(case["text"], case["word"]) == case["expected"]
+
+
+@pytest.mark.parametrize("case", GOLDEN["remove_cases"], ids=lambda case: repr(case["word"]))
+def test_golden_matches_regex_reference(case):
+    assert remove_delete_candidate(case["text"], case["word"]) == case["expected"]
+
+
+@pytest.mark.parametrize("case", GOLDEN["merge"], ids=lambda case: f"seed{case['seed']}")
+def test_merge_output_matches_golden(case):
+    records = generate_processing_records(case["segments"], seed=case["seed"])
+    assert merge_digest(merge_speaker_blocks(records)) == case["sha256"]
+
+
+def test_remove_matches_regex_on_random_text():
+    assert check_fuzz(5000, seed=0) == []
+
+
+def test_sentences_are_split_once_per_line():
+    index = DeletionIndex([{"line_no": 1, "transcript_text_segment": " はい。 承知しました。。来週 "}])
+    assert index.sentences(1) == split_sentences(" はい。 承知しました。。来週 ") == ["はい", "承知しました", "来週"]
+    assert index.sentences(1) is index.sentences(1)
+    assert index.sentences(2) == []
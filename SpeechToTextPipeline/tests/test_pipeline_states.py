@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from pipeline_processing.pipeline_states import (
+    PipelineState, StageLease, can_release, decide_claim, find_resumable_stage
+)
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+LEASE_OWNER = "host:1:abcd1234"
+
+
+def state(name, lease_owner=None, lease_expires=None):
+    return PipelineState(1, name, 3, lease_owner, lease_expires, NOW - timedelta(minutes=5))
+
+
+@pytest.mark.parametrize("stage, current, expected", [
+    ("preprocessing", "transcribed", "ready"),
+    ("merging", "preprocessing_completed", "ready"),
+    ("export", "summary_completed", "ready"),
+    ("merging", "merging_failed", "retry"),
+    ("merging", "merging_paused", "unknown"),
+    ("merging", "merging_sharded", "sharded"),
+    ("merging", "merging_stitching", "sharded"),
+    ("preprocessing", "merging_failed", "passed"),
+    ("preprocessing", "AllStepCompleted", "passed"),
+    ("summary", "preprocessing_completed", "not_ready"),
+    ("merging", "transcribed", "not_ready"),
+    ("merging", "processing", "unknown"),
+    ("merging", "failed", "unknown"),
+])
+def test_decide_claim(stage, current, expected):
+    assert decide_claim(stage, state(current), NOW) == expected
+
+
+def test_decide_claim_in_progress_depends_on_lease():
+    live = state("merging_in_progress", LEASE_OWNER, NOW + timedelta(minutes=1))
+    expired = state("merging_in_progress", LEASE_OWNER, NOW - timedelta(seconds=1))
+    assert decide_claim("merging", live, NOW) == "leased"
+    assert decide_claim("merging", expired, NOW) == "lease_expired"
+    assert decide_claim("merging", state("merging_in_progress"), NOW) == "lease_expired"
+
+
+def test_can_release_by_owner_while_in_progress_or_just_completed():
+    lease = StageLease(1, "merging", LEASE_OWNER, NOW)
+    assert can_release(state("merging_in_progress", LEASE_OWNER), lease) == (True, "")
+    assert can_release(state("merging_completed", LEASE_OWNER), lease) == (True, "")
+
+
+@pytest.mark.parametrize("current", [
+    state("merging_in_progress", "other:2:ffff0000"),     # 他のワーカーが引き継いだ
+    state("merging_sharded", LEASE_OWNER),                # シャード実行に移行済み
+    state("summary_in_progress", LEASE_OWNER),            # 次ステージが claim 済み
+])
+def test_can_release_rejects_lost_lease(current):
+    released, reason = can_release(current, StageLease(1, "merging", LEASE_OWNER, NOW))
+    assert not released and reason
+
+
+@pytest.mark.parametrize("current, expected", [
+    (state("merging_failed"), ("merging", "retry")),
+    (state("summary_failed"), ("summary", "retry")),
+    (state("export_failed"), ("export", "retry")),
+    (state("merging_completed"), ("summary", "ready")),
+    (state("summary_in_progress", LEASE_OWNER, NOW - timedelta(seconds=1)), ("summary", "lease_expired")),
+    (state("export_in_progress", LEASE_OWNER, NOW + timedelta(minutes=1)), ("export", "leased")),
+    (state("merging_sharded"), (None, "sharded")),
+    (state("preprocessing_in_progress", LEASE_OWNER, NOW + timedelta(minutes=1)), (None, "not_ready")),
+    (state("AllStepCompleted"), (None, "passed")),
+])
+def test_find_resumable_stage_after_fast_path_stops(current, expected):
+    assert find_resumable_stage(current, NOW) == expected
@@ -0,0 +1,19 @@
+import pytest
+
+from pipeline_processing.priority_lanes import DEFAULT_LANE, choose_lane
+
+
+@pytest.mark.parametrize("duration_seconds", [None, 0, -1])
+def test_unknown_duration_goes_to_default_lane(duration_seconds):
+    assert choose_lane(duration_seconds) == DEFAULT_LANE
+
+
+def test_lane_by_duration():
+    assert choose_lane(600) == "high"
+    assert choose_lane(1800) == "normal"
+    assert choose_lane(7200) == "bulk"
+
+
+def test_explicit_and_manager_take_precedence_over_unknown_duration():
+    assert choose_lane(None, explicit="bulk") == "bulk"
+    assert choose_lane(None, is_manager=True, high_for_managers=True) == "high"
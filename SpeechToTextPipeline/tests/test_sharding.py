@@ -0,0 +1,30 @@
+from pipeline_processing.sharding import plan_shards
+
+
+def lines_for(speakers):
+    return [(line_no, speaker) for line_no, speaker in enumerate(speakers, start=1)]
+
+
+def ranges(shards):
+    return [(shard["start_line"], shard["end_line"]) for shard in shards]
+
+
+def test_boundary_moves_forward_to_speaker_change_first():
+    shards = plan_shards(lines_for([0, 0, 0, 0, 0, 1, 1, 1, 1, 1]), shard_size=4)
+    assert ranges(shards)[0] == (1, 5)
+
+
+def test_boundary_moves_backward_when_no_change_ahead():
+    shards = plan_shards(lines_for([0, 0, 1, 1, 1, 1, 1, 1, 1, 1]), shard_size=4)
+    assert ranges(shards)[0] == (1, 2)
+
+
+def test_single_speaker_is_cut_at_shard_size():
+    shards = plan_shards(lines_for([0] * 12), shard_size=4, overlap=1)
+    assert ranges(shards) == [(1, 4), (5, 8), (9, 12)]
+    assert (shards[1]["context_start_line"], shards[1]["context_end_line"]) == (4, 9)
+
+
+def test_tail_within_half_shard_joins_last_shard():
+    shards = plan_shards(lines_for([0] * 10), shard_size=4)
+    assert ranges(shards) == [(1, 4), (5, 10)]
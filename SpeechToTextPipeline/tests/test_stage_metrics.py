@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from pipeline_processing.stage_metrics import CountingConnection, CountingCursor
+
+
+class FakeCursor:
+    def __init__(self):
+        self.fast_executemany = False
+        self.calls = []
+
+    def executemany(self, sql, rows):
+        self.calls.append((sql, list(rows), self.fast_executemany))
+
+
+def test_attribute_writes_reach_wrapped_cursor():
+    raw = FakeCursor()
+    metrics = SimpleNamespace(db_round_trips=0)
+    cursor = CountingCursor(raw, metrics)
+    cursor.fast_executemany = True
+    cursor.executemany("INSERT", [(1,), (2,)])
+
+    assert raw.fast_executemany is True
+    assert cursor.fast_executemany is True
+    assert raw.calls == [("INSERT", [(1,), (2,)], True)]
+    assert metrics.db_round_trips == 1
+
+
+def test_attribute_writes_reach_wrapped_connection():
+    raw = SimpleNamespace(autocommit=False, cursor=FakeCursor)
+    conn = CountingConnection(raw, SimpleNamespace(db_round_trips=0))
+    conn.autocommit = True
+    assert raw.autocommit is True
+    assert isinstance(conn.cursor(), CountingCursor)
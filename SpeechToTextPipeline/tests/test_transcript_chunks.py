@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from pipeline_processing.transcript_chunks import (
+    Phrase, TranscriptChunk, parse_chunk_manifest, reconcile_speakers, stitch_phrases
+)
+
+
+def phrase(speaker, seconds, offset=0.0, text="x"):
+    return Phrase(speaker, text, offset, seconds)
+
+
+def speakers(phrases):
+    return [phrase.speaker for phrase in phrases]
+
+
+def test_renumbered_speakers_fall_back_to_talk_time_rank_without_overlap():
+    # 2チャンク目のジョブは同じ2人に逆の番号を振った（重なりがないため発話秒数の順位で対応付ける）
+    first = [phrase(0, 60.0), phrase(1, 20.0)]
+    second = [phrase(1, 50.0), phrase(0, 10.0)]
+    assert [speakers(chunk) for chunk in reconcile_speakers([first, second])] == [[0, 1], [0, 1]]
+
+
+def test_extra_speaker_gets_new_label_and_unknown_is_kept():
+    first = [phrase(0, 60.0), phrase(1, 20.0)]
+    second = [phrase(0, 40.0), phrase(1, 30.0), phrase(2, 5.0), phrase("Unknown", 3.0)]
+    assert speakers(reconcile_speakers([first, second])[1]) == [0, 1, 2, "Unknown"]
+
+
+def test_dominant_speaker_swap_is_matched_by_overlap():
+    # 前半は A（営業）、後半は B（顧客）が主に話す2者の商談。2チャンク目は区切り位置（100 秒）の 15 秒前から始まり、
+    # ジョブは A=1、B=0 と番号を振った。発話秒数の順位では B が A の番号になるが、重なった区間の発話で対応付ける
+    chunks = [TranscriptChunk(0, "c", "rec/chunk-000.wav", 0.0, 100.0),
+              TranscriptChunk(1, "c", "rec/chunk-001.wav", 85.0, 115.0, 15.0)]
+    first = [phrase(0, 60.0, 0.0, "a1"), phrase(1, 10.0, 60.0, "b1"), phrase(0, 20.0, 70.0, "a2"), phrase(1, 6.0, 92.0, "b2")]
+    second = [phrase(1, 5.0, 0.0, "a2-dup"), phrase(0, 6.0, 7.0, "b2-dup"),
+              phrase(0, 80.0, 15.0, "b3"), phrase(1, 5.0, 96.0, "a3")]
+    stitched = stitch_phrases(chunks, [first, second])
+    assert [(p.text, p.speaker, p.offset_seconds) for p in stitched] == [
+        ("a1", 0, 0.0), ("b1", 1, 60.0), ("a2", 0, 70.0), ("b2", 1, 92.0), ("b3", 1, 100.0), ("a3", 0, 181.0),
+    ]
+
+
+def test_speaker_silent_in_overlap_falls_back_to_remaining_rank():
+    chunks = [TranscriptChunk(0, "c", "a", 0.0, 100.0), TranscriptChunk(1, "c", "b", 90.0, 60.0, 10.0)]
+    first = [phrase(0, 50.0, 0.0), phrase(1, 30.0, 50.0), phrase(1, 8.0, 91.0)]
+    # 重なった区間で話したのは 1 のみ（→ 前のチャンクの 1）。残りの 0 は残りの話者 0 に対応付ける
+    second = [phrase(1, 8.0, 1.0), phrase(0, 40.0, 10.0), phrase(1, 5.0, 50.0)]
+    stitched = stitch_phrases(chunks, [first, second])
+    assert speakers(stitched) == [0, 1, 1, 0, 1]
+
+
+def test_stitch_shifts_offsets_and_orders_phrases():
+    chunks = [TranscriptChunk(0, "c", "rec/chunk-000.wav", 0.0, 100.0),
+              TranscriptChunk(1, "c", "rec/chunk-001.wav", 100.0, 50.0)]
+    stitched = stitch_phrases(chunks, [
+        [phrase(0, 5.0, 10.0, "a"), phrase(1, 2.0, 90.0, "b")],
+        [phrase(1, 5.0, 1.0, "c"), phrase(0, 1.0, None, "d")],
+    ])
+    assert [(p.text, p.offset_seconds, p.speaker) for p in stitched] == [
+        ("a", 10.0, 0), ("b", 90.0, 1), ("c", 101.0, 0), ("d", None, 1),
+    ]
+
+
+def test_parse_manifest_versions():
+    chunk = {"index": 0, "container": "c", "blob": "rec/chunk-000.wav", "start_seconds": 0, "duration_seconds": 10}
+    v1 = parse_chunk_manifest(json.dumps({"version": 1, "chunks": [chunk]}).encode("utf-8"))
+    v2 = parse_chunk_manifest(json.dumps({"version": 2, "chunks": [dict(chunk, overlap_seconds=15)]}).encode("utf-8"))
+    assert v1[0].overlap_seconds == 0.0 and v2[0].overlap_seconds == 15.0
+    with pytest.raises(ValueError):
+        parse_chunk_manifest(json.dumps({"version": 3, "chunks": []}).encode("utf-8"))
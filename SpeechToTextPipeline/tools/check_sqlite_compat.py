@@ -0,0 +1,74 @@
+"""
+SQLite バックエンドの互換性チェック
+
+SpeechToTextPipeline / saa-api-func の function_app.py と tools 内の SQL 文字列リテラルを取り出し、
+db_backend.translate_sql で書き換えたうえで、Tables.sql を適用した SQLite に対して EXPLAIN（構文・テーブル・列の確認）を行う。
+f-string で組み立てる SQL は対象外。
+
+使用例:
+    cd SpeechToTextPipeline
+    python tools/check_sqlite_compat.py
+    python tools/check_sqlite_compat.py --db local-pipeline.db   # ローカル DB を作成（スキーマ適用のみ）
+"""
+import argparse
+import ast
+import re
+import sys
+from pathlib import Path
+
+PIPELINE_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = PIPELINE_DIR.parent
+sys.path.append(str(PIPELINE_DIR))
+from pipeline_processing.db_backend import connect_sqlite, translate_sql  # noqa: E402
+
+DEFAULT_TARGETS = [
+    PIPELINE_DIR / "function_app.py",
+    REPO_ROOT / "saa-api-func" / "function_app.py",
+    *sorted((PIPELINE_DIR / "tools").glob("*.py")),
+]
+SQL_PATTERN = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE)\s", re.IGNORECASE)
+
+
+def extract_sql_literals(path: Path) -> list:
+    """(行番号, SQL) のリスト（f-string の一部は除く）"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    fstring_parts = {
+        id(value) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for value in node.values
+    }
+    literals = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in fstring_parts:
+            if SQL_PATTERN.match(node.value):
+                literals.append((node.lineno, node.value))
+    return literals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite バックエンドの互換性チェック")
+    parser.add_argument("files", nargs="*", type=Path, help="対象ファイル（既定は両 Function App と tools）")
+    parser.add_argument("--db", default=":memory:", help="チェックに使う SQLite（既定はインメモリ）")
+    args = parser.parse_args()
+
+    conn = connect_sqlite(args.db)
+    failures = 0
+    checked = 0
+    for path in args.files or DEFAULT_TARGETS:
+        for lineno, sql in extract_sql_literals(path):
+            translated = translate_sql(sql)
+            checked += 1
+            try:
+                # 書き換え後の SQL に EXPLAIN を付ける（先に付けると SELECT TOP の書き換えが効かない）
+                conn.execute(f"EXPLAIN {translated}", *[None] * translated.count("?"))
+            except Exception as e:
+                failures += 1
+                print(f"❌ {path.relative_to(REPO_ROOT)}:{lineno}: {e}")
+                print(f"   {' '.join(translated.split())[:200]}")
+    conn.close()
+
+    print(f"SQL {checked} 件中 {failures} 件が SQLite で実行できません")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+OpenAI 互換のローカルモックサーバー（chat.completions のみ）
+
+パイプラインのベンチマーク・負荷試験を OpenAI を呼ばずに行うためのスタンドイン。
+プロンプトの種類を判別し、決定的（同じ入力なら同じ出力）な応答を返す。
+
+- 自然さスコア判定（get_naturalness_score / step2）: 数値 or JSON スコア
+- 文章整形・フィラー削除（step6 / merging）: フィラーを除去したテキスト
+- 要約タイトル生成（step7）: 20文字以内のタイトル
+
+起動例:
+    python tools/mock_openai_server.py --port 8089 --profile realistic --rate-429 0.05
+
+パイプライン側の設定:
+    OPENAI_BASE_URL=http://localhost:8089/v1
+    OPENAI_API_KEY=dummy
+"""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 遅延・障害注入のプリセット
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "instant": {"latency": "fixed:0", "rate_429": 0.0, "rate_500": 0.0},
+    "realistic": {"latency": "lognormal:-0.7,0.5", "rate_429": 0.0, "rate_500": 0.0},
+    "degraded": {"latency": "lognormal:0.0,0.8", "rate_429": 0.05, "rate_500": 0.02},
+}
+
+FILLER_WORDS = [
+    "えっと", "えー", "あの", "うーん", "なんか", "そのー", "まあ", "ま、", "うん", "はい", "あ、",
+]
+FILLER_PATTERN = re.compile("(" + "|".join(re.escape(w) for w in FILLER_WORDS) + ")[、。]?")
+
+TITLE_CANDIDATES = ["業界紹介", "課題ヒアリング", "商品説明", "導入事例", "料金説明", "質疑応答", "次回日程調整"]
+
+
+def _stable_ratio(text: str) -> float:
+    """入力文字列から 0.0〜1.0 の決定的な値を生成する"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / float(1 << 64)
+
+
+def _estimate_tokens(text: str) -> int:
+    """日本語混じりテキストの概算トークン数（1文字≒1トークン、最低1）"""
+    return max(1, len(text))
+
+
+def _extract_between(text: str, start_marker: str, end_marker: str) -> Optional[str]:
+    start = text.find(start_marker)
+    if start < 0:
+        return None
+    start += len(start_marker)
+    end = text.find(end_marker, start)
+    return (text[start:end] if end >= 0 else text[start:]).strip()
+
+
+def parse_latency_spec(spec: str):
+    """
+    遅延指定文字列をサンプラー関数に変換する
+
+    fixed:S / uniform:MIN,MAX / normal:MEAN,STD / lognormal:MU,SIGMA（単位は秒）
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()] if params else []
+
+    if kind == "fixed":
+        seconds = values[0] if values else 0.0
+        return lambda rng: seconds
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "normal":
+        mean, std = values
+        return lambda rng: max(0.0, rng.gauss(mean, std))
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"不明な遅延指定です: {spec}")
+
+
+def build_completion(messages: list) -> Tuple[str, str]:
+    """
+    プロンプト内容から (種別, 応答テキスト) を決定的に生成する
+    """
+    full_text = "\n".join(str(m.get("content", "")) for m in messages)
+    user_text = str(messages[-1].get("content", "")) if messages else ""
+
+    # step2: JSON 形式の前後接続スコア
+    if "front_score" in full_text and "back_score" in full_text:
+        front = round(_stable_ratio("front:" + user_text), 2)
+        back = round(_stable_ratio("back:" + user_text), 2)
+        return "naturalness_pair", json.dumps({"front_score": front, "back_score": back})
+
+    # get_naturalness_score: 数値のみ
+    if "自然さを評価" in full_text:
+        target = _extract_between(user_text, "文：", "※") or user_text
+        return "naturalness", f"{round(_stable_ratio(target), 2)}"
+
+    # step7: 要約タイトル
+    if "タイトル" in full_text and "会話ブロック" in user_text:
+        suggested = _extract_between(user_text, "推奨タイトル：", "\n")
+        if suggested:
+            return "title", suggested
+        block_text = _extract_between(user_text, "：\n", "\n\n推奨タイトル") or user_text
+        index = int(_stable_ratio(block_text) * len(TITLE_CANDIDATES))
+        return "title", TITLE_CANDIDATES[index]
+
+    # merging / step6: 文章整形・フィラー削除
+    for start_marker in ("文字起こし結果：", "元の発話："):
+        source = _extract_between(user_text, start_marker, "修正後：")
+        if source is not None:
+            cleaned = FILLER_PATTERN.sub("", source).strip()
+            return "cleanup", cleaned or source
+
+    return "echo", user_text
+
+
+class MockOpenAIState:
+    """遅延・障害注入の設定と呼び出し統計を保持する"""
+
+    def __init__(self, latency: str = "fixed:0", rate_429: float = 0.0, rate_500: float = 0.0,
+                 seed: int = 0, model: str = "mock-gpt"):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency_spec(latency)
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.model = model
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "by_kind": {},
+                "errors_429": 0,
+                "errors_500": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "in_flight": 0,
+                "max_in_flight": 0,
+            }
+
+    def draw(self) -> Tuple[float, float]:
+        """(遅延秒, 障害判定用の乱数) を取得する（スレッドセーフ）"""
+        with self._lock:
+            return self.sample_latency(self._rng), self._rng.random()
+
+    def record(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                if key == "kind":
+                    self.stats["by_kind"][value] = self.stats["by_kind"].get(value, 0) + 1
+                else:
+                    self.stats[key] += value
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+
+def make_handler(state: MockOpenAIState):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug("mock-openai: " + format, *args)
+
+        def _send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send_json(200, state.snapshot())
+            elif self.path.rstrip("/") in ("/v1/models", "/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": state.model, "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length) if length else b"{}"
+
+            if self.path.rstrip("/") == "/reset":
+                state.reset()
+                self._send_json(200, {"reset": True})
+                return
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            try:
+                body = json.loads(raw.decode("utf-8"))
+            except ValueError:
+                self._send_json(400, {"error": {"message": "invalid JSON", "type": "invalid_request_error"}})
+                return
+
+            state.record(requests=1, in_flight=1)
+            try:
+                latency, roll = state.draw()
+                if latency > 0:
+                    time.sleep(latency)
+
+                if roll < state.rate_429:
+                    state.record(errors_429=1)
+                    self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                                    headers={"Retry-After": "1"})
+                    return
+                if roll < state.rate_429 + state.rate_500:
+                    state.record(errors_500=1)
+                    self._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+                    return
+
+                messages = body.get("messages") or []
+                kind, content = build_completion(messages)
+                prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) for m in messages)
+                completion_tokens = _estimate_tokens(content)
+                state.record(kind=kind, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model") or state.model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+            finally:
+                state.record(in_flight=-1)
+
+    return MockOpenAIHandler
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **state_kwargs) -> Tuple[ThreadingHTTPServer, MockOpenAIState]:
+    """
+    モックサーバーをバックグラウンドスレッドで起動する（ベンチマークからの利用向け）
+
+    port=0 の場合は空きポートが割り当てられる。base_url は
+    f"http://{host}:{server.server_address[1]}/v1" で組み立てる。
+    """
+    state = MockOpenAIState(**state_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 互換モックサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="instant",
+                        help="遅延・障害注入のプリセット（個別指定で上書き可）")
+    parser.add_argument("--latency", help="fixed:S / uniform:MIN,MAX / normal:MEAN,STD / lognormal:MU,SIGMA")
+    parser.add_argument("--rate-429", type=float, help="429 を返す割合（0.0〜1.0）")
+    parser.add_argument("--rate-500", type=float, help="500 を返す割合（0.0〜1.0）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    state = MockOpenAIState(
+        latency=args.latency or profile["latency"],
+        rate_429=profile["rate_429"] if args.rate_429 is None else args.rate_429,
+        rate_500=profile["rate_500"] if args.rate_500 is None else args.rate_500,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"🧪 mock OpenAI server: http://{args.host}:{args.port}/v1 "
+          f"(latency={state.latency_spec}, 429={state.rate_429}, 500={state.rate_500})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+パイプライン状態レポート
+
+PipelineStates から「同じ状態に N 分以上滞留している会議」を、PipelineStateTransitions から
+状態別のスループット（期間内に入った件数・出た件数）と滞在時間の p50/p95/p99 を表示する。
+
+使用例:
+    python tools/pipeline_state_report.py --stuck-minutes 30
+    python tools/pipeline_state_report.py --stuck-minutes 60 --state summary_in_progress
+    python tools/pipeline_state_report.py --since 2026-10-01 --until 2026-10-08 --json
+
+列の意味:
+    entered  : 期間内にその状態へ遷移した件数
+    exited   : 期間内にその状態から遷移した件数（状態別のスループット）
+    dwell    : 状態に入ってから出るまでの秒数（exited の各遷移の from_state_seconds）
+"""
+import argparse
+import json
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# function_app（get_db_connection）を import できるように sys.path を調整
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from function_app import get_db_connection  # noqa: E402
+from pipeline_processing.pipeline_states import ALL_COMPLETED_STATE  # noqa: E402
+from pipeline_processing.stage_metrics import parse_utc, summarize_latencies, utc_now  # noqa: E402
+
+
+def fetch_stuck_meetings(cursor, stuck_minutes: int, state: str = None) -> list:
+    """state_entered_datetime が N 分以上前の会議（state 未指定時は AllStepCompleted 以外）"""
+    conditions = ["state_entered_datetime < ?"]
+    params = [utc_now() - timedelta(minutes=stuck_minutes)]
+    if state:
+        conditions.append("state = ?")
+        params.append(state)
+    else:
+        conditions.append("state <> ?")
+        params.append(ALL_COMPLETED_STATE)
+
+    cursor.execute(f"""
+        SELECT meeting_id, state, state_entered_datetime, lease_owner, lease_expires_datetime
+        FROM dbo.PipelineStates
+        WHERE {' AND '.join(conditions)}
+        ORDER BY state_entered_datetime
+    """, params)
+    now = utc_now()
+    return [
+        {
+            "meeting_id": meeting_id,
+            "state": state,
+            "minutes_in_state": round((now - entered).total_seconds() / 60, 1),
+            "lease_owner": lease_owner,
+            "lease_expired": lease_expires is not None and lease_expires <= now,
+        }
+        for meeting_id, state, entered, lease_owner, lease_expires in cursor.fetchall()
+    ]
+
+
+def fetch_state_throughput(cursor, since, until) -> list:
+    """期間内の遷移を状態別に集計する（entered / exited / dwell）"""
+    cursor.execute("""
+        SELECT from_state, to_state, from_state_seconds
+        FROM dbo.PipelineStateTransitions
+        WHERE transitioned_datetime >= ? AND transitioned_datetime < ?
+    """, (since, until))
+
+    entered = {}
+    exits = []
+    for from_state, to_state, from_state_seconds in cursor.fetchall():
+        entered[to_state] = entered.get(to_state, 0) + 1
+        if from_state is not None:
+            exits.append({"state": from_state, "dwell": from_state_seconds})
+
+    results = {row["state"]: row for row in summarize_latencies(exits, ["state"], ["dwell"])}
+    for state in sorted(set(entered) | set(results)):
+        row = results.setdefault(state, {"state": state, "dwell_count": 0,
+                                         "dwell_p50": None, "dwell_p95": None, "dwell_p99": None})
+        row["entered"] = entered.get(state, 0)
+        row["exited"] = row["dwell_count"]
+    return [results[state] for state in sorted(results)]
+
+
+def format_value(value) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パイプライン状態レポート")
+    parser.add_argument("--stuck-minutes", type=int, default=30, help="滞留とみなす分数（既定 30）")
+    parser.add_argument("--state", help="滞留を確認する状態（未指定は AllStepCompleted 以外のすべて）")
+    parser.add_argument("--since", help="スループット集計の開始（UTC、YYYY-MM-DD、以上。既定は24時間前）")
+    parser.add_argument("--until", help="スループット集計の終了（UTC、YYYY-MM-DD、未満。既定は現在）")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    until = parse_utc(args.until) or utc_now()
+    since = parse_utc(args.since) or until - timedelta(days=1)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        stuck = fetch_stuck_meetings(cursor, args.stuck_minutes, args.state)
+        throughput = fetch_state_throughput(cursor, since, until)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps({"stuck": stuck, "throughput": throughput}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"\n=== {args.stuck_minutes} 分以上滞留している会議: {len(stuck)} 件 ===")
+    print("\t".join(["meeting_id", "state", "minutes", "lease_owner", "lease_expired"]))
+    for row in stuck:
+        print("\t".join([str(row["meeting_id"]), row["state"], format_value(row["minutes_in_state"]),
+                         row["lease_owner"] or "-", "yes" if row["lease_expired"] else "no"]))
+
+    print(f"\n=== 状態別スループット（{since:%Y-%m-%d %H:%M} 〜 {until:%Y-%m-%d %H:%M} UTC、秒） ===")
+    print("\t".join(["state", "entered", "exited", "dwell.p50", "dwell.p95", "dwell.p99"]))
+    for row in throughput:
+        print("\t".join([row["state"], str(row["entered"]), str(row["exited"]),
+                         *(format_value(row[f"dwell_p{p}"]) for p in (50, 95, 99))]))
+
+
+if __name__ == "__main__":
+    main()
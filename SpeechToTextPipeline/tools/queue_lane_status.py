@@ -0,0 +1,65 @@
+"""
+レーン別キュー状況の表示
+
+各ステージの high / normal / bulk キューについて、滞留件数と最古メッセージの待ち時間を表示する。
+
+使用例:
+    python tools/queue_lane_status.py
+    python tools/queue_lane_status.py --json
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# function_app（get_queue_service_client）を import できるように sys.path を調整
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from function_app import get_queue_service_client  # noqa: E402
+from pipeline_processing.priority_lanes import LANES, lane_queue_name  # noqa: E402
+
+STAGE_QUEUES = ["queue-preprocessing", "queue-merging", "queue-summary", "queue-export"]
+
+
+def get_lane_status(service_client, queue_name: str) -> dict:
+    """滞留件数（概算）と、先頭メッセージの投入からの経過秒数を取得する"""
+    queue_client = service_client.get_queue_client(queue_name)
+    try:
+        depth = queue_client.get_queue_properties().approximate_message_count or 0
+        peeked = queue_client.peek_messages(max_messages=1)
+    except Exception as e:
+        return {"queue": queue_name, "depth": None, "oldest_wait_seconds": None, "error": str(e)}
+
+    oldest_wait = None
+    if peeked and peeked[0].inserted_on:
+        oldest_wait = (datetime.now(timezone.utc) - peeked[0].inserted_on).total_seconds()
+    return {"queue": queue_name, "depth": depth, "oldest_wait_seconds": oldest_wait, "error": None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="レーン別キュー状況の表示")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    service_client = get_queue_service_client()
+    statuses = []
+    for stage_queue in STAGE_QUEUES:
+        for lane in LANES:
+            status = get_lane_status(service_client, lane_queue_name(stage_queue, lane))
+            statuses.append({"stage_queue": stage_queue, "lane": lane, **status})
+
+    if args.json:
+        print(json.dumps(statuses, ensure_ascii=False, indent=2))
+        return
+
+    print("queue\tlane\tdepth\toldest_wait_s")
+    for status in statuses:
+        if status["error"]:
+            print(f"{status['queue']}\t{status['lane']}\t-\t-\t❌ {status['error']}")
+            continue
+        oldest = "-" if status["oldest_wait_seconds"] is None else f"{status['oldest_wait_seconds']:.1f}"
+        print(f"{status['queue']}\t{status['lane']}\t{status['depth']}\t{oldest}")
+
+
+if __name__ == "__main__":
+    main()
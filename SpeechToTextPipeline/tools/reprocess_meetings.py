@@ -0,0 +1,272 @@
+"""
+パイプラインステージの一括再処理 CLI
+
+プロンプト変更・不具合修正後に、条件に合う会議のステージ出力を削除して再実行する。
+
+使用例:
+    # merging_failed の会議を merging から再実行（キュー投入、同時4件・毎秒2件まで）
+    python tools/reprocess_meetings.py --stage merging --status merging_failed --concurrency 4 --rate 2
+
+    # 通常の処理を妨げないよう bulk レーンに投入
+    python tools/reprocess_meetings.py --stage merging --status merging_failed --priority bulk
+
+    # 期間・ユーザー指定で summary から再実行（対象確認のみ）
+    python tools/reprocess_meetings.py --stage summary --since 2026-09-01 --until 2026-10-01 --user-id 12 --dry-run
+
+    # キューを経由せずこのプロセス内でステージ関数を直接実行
+    python tools/reprocess_meetings.py --stage preprocessing --meeting-id 91 --meeting-id 92 --inline
+
+--state-file を指定すると完了した meeting_id を記録し、中断後に同じコマンドを再実行すると完了済みをスキップする。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# function_app（get_db_connection / send_queue_message / 各ステージ関数）を import できるように sys.path を調整
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from function_app import (  # noqa: E402
+    get_db_connection,
+    send_queue_message,
+    set_pipeline_state,
+    claim_pipeline_stage,
+    complete_pipeline_stage,
+    fail_pipeline_stage,
+    run_preprocessing_stage,
+    run_merging_stage,
+    run_summary_stage,
+    run_export_stage,
+)
+from pipeline_processing.priority_lanes import LANES, lane_queue_name  # noqa: E402
+
+STAGES = ["preprocessing", "merging", "summary", "export"]
+
+# ステージごとの投入キュー・出力テーブル・再処理前に戻すステータス
+STAGE_QUEUES = {
+    "preprocessing": "queue-preprocessing",
+    "merging": "queue-merging",
+    "summary": "queue-summary",
+    "export": "queue-export",
+}
+STAGE_OUTPUT_TABLES = {
+    "preprocessing": "dbo.TranscriptProcessingSegments",
+    "merging": "dbo.ProcessedTranscriptSegments",
+    "summary": "dbo.ConversationSummaries",
+    "export": "dbo.ConversationSegments",
+}
+STAGE_RESET_STATUS = {
+    "preprocessing": "transcribed",
+    "merging": "preprocessing_completed",
+    "summary": "merging_completed",
+    "export": "summary_completed",
+}
+
+
+class RateLimiter:
+    """毎秒 rate 件までに投入を制限する（rate <= 0 は無制限）"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_seconds = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+
+def select_meetings(cursor, args) -> list:
+    """条件に一致する meeting_id を取得する"""
+    conditions = ["deleted_datetime IS NULL"]
+    params = []
+
+    if args.meeting_id:
+        conditions.append(f"meeting_id IN ({', '.join('?' for _ in args.meeting_id)})")
+        params.extend(args.meeting_id)
+    if args.status:
+        conditions.append(f"status IN ({', '.join('?' for _ in args.status)})")
+        params.extend(args.status)
+    if args.user_id:
+        conditions.append("user_id = ?")
+        params.append(args.user_id)
+    if args.since:
+        conditions.append("meeting_datetime >= ?")
+        params.append(args.since)
+    if args.until:
+        conditions.append("meeting_datetime < ?")
+        params.append(args.until)
+
+    cursor.execute(f"""
+        SELECT meeting_id FROM dbo.Meetings
+        WHERE {' AND '.join(conditions)}
+        ORDER BY meeting_id
+    """, params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def clear_stage_outputs(conn, meeting_id: int, stage: str):
+    """
+    指定ステージ以降の出力を1トランザクションで削除し、ステータスを再処理前の状態に戻す
+
+    各ステージは既存の出力をチェックポイントとして再利用するため、
+    再処理するステージとその下流の出力はすべて削除しておく必要がある。
+    """
+    cursor = conn.cursor()
+    downstream = STAGES[STAGES.index(stage):]
+
+    if "export" in downstream:
+        # コメントが付いた ConversationSegments は外部キー制約により削除できない
+        cursor.execute("SELECT COUNT(*) FROM dbo.Comments WHERE meeting_id = ?", (meeting_id,))
+        if cursor.fetchone()[0] > 0:
+            raise ValueError("コメントが登録済みのため ConversationSegments を削除できません")
+
+    try:
+        for target in reversed(downstream):
+            cursor.execute(f"DELETE FROM {STAGE_OUTPUT_TABLES[target]} WHERE meeting_id = ?", (meeting_id,))
+            cursor.execute("DELETE FROM dbo.PipelineShards WHERE meeting_id = ? AND stage = ?", (meeting_id, target))
+        # PIPELINE_STATE_ENABLED=true の場合は PipelineStates もリセットする（処理中のワーカーはリースを失う）
+        set_pipeline_state(conn, meeting_id, STAGE_RESET_STATUS[stage], note=f"reprocess:{stage}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_stages_inline(conn, meeting_id: int, stage: str):
+    """指定ステージ以降をこのプロセス内で順に実行する（前ステージの結果はメモリ上で受け渡す）"""
+    result = None
+    for target in STAGES[STAGES.index(stage):]:
+        lease = claim_pipeline_stage(conn, meeting_id, target)
+        if lease is None:
+            return
+        try:
+            if target == "preprocessing":
+                result = run_preprocessing_stage(conn, meeting_id)
+            elif target == "merging":
+                result = run_merging_stage(conn, meeting_id, result)
+            elif target == "summary":
+                result = run_summary_stage(conn, meeting_id, result)
+            else:
+                run_export_stage(conn, meeting_id)
+        except Exception as e:
+            conn.rollback()
+            fail_pipeline_stage(conn, lease, e)
+            raise
+        if not complete_pipeline_stage(conn, lease) or target == "export" or result is None:
+            return
+
+
+def reprocess_meeting(meeting_id: int, args, limiter: RateLimiter):
+    """1会議分の再処理（出力削除 → キュー投入 or インライン実行）"""
+    limiter.wait()
+    conn = get_db_connection()
+    try:
+        clear_stage_outputs(conn, meeting_id, args.stage)
+        if args.inline:
+            run_stages_inline(conn, meeting_id, args.stage)
+        else:
+            send_queue_message(lane_queue_name(STAGE_QUEUES[args.stage], args.priority),
+                               {"meeting_id": meeting_id, "priority": args.priority})
+    finally:
+        conn.close()
+
+
+def load_completed(state_file: str) -> set:
+    if not state_file or not os.path.exists(state_file):
+        return set()
+    completed = set()
+    with open(state_file, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("ok"):
+                    completed.add(entry["meeting_id"])
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パイプラインステージの一括再処理")
+    parser.add_argument("--stage", choices=STAGES, required=True, help="再実行を開始するステージ")
+    parser.add_argument("--meeting-id", type=int, action="append", help="対象 meeting_id（複数指定可）")
+    parser.add_argument("--status", action="append", help="対象の Meetings.status（複数指定可）")
+    parser.add_argument("--user-id", type=int, help="対象ユーザー")
+    parser.add_argument("--since", help="meeting_datetime の開始（YYYY-MM-DD、以上）")
+    parser.add_argument("--until", help="meeting_datetime の終了（YYYY-MM-DD、未満）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時処理数")
+    parser.add_argument("--rate", type=float, default=0.0, help="毎秒の投入上限（0 は無制限）")
+    parser.add_argument("--priority", choices=LANES, default="normal", help="投入するレーン（既定 normal）")
+    parser.add_argument("--inline", action="store_true", help="キューを経由せずステージ関数を直接実行する")
+    parser.add_argument("--state-file", help="進捗記録ファイル（JSON Lines）。再実行時は完了済みをスキップ")
+    parser.add_argument("--dry-run", action="store_true", help="対象の一覧表示のみ")
+    args = parser.parse_args()
+
+    if not any([args.meeting_id, args.status, args.user_id, args.since, args.until]):
+        parser.error("対象条件（--meeting-id / --status / --user-id / --since / --until）を1つ以上指定してください")
+
+    logging.basicConfig(level=logging.WARNING)
+
+    conn = get_db_connection()
+    try:
+        meeting_ids = select_meetings(conn.cursor(), args)
+    finally:
+        conn.close()
+
+    completed = load_completed(args.state_file)
+    targets = [m for m in meeting_ids if m not in completed]
+    print(f"🎯 対象 {len(meeting_ids)} 件（完了済みスキップ {len(meeting_ids) - len(targets)} 件）stage={args.stage}")
+
+    if args.dry_run:
+        print(", ".join(str(m) for m in targets))
+        return
+
+    limiter = RateLimiter(args.rate)
+    state_lock = threading.Lock()
+    state_fp = open(args.state_file, "a", encoding="utf-8") if args.state_file else None
+    started_at = time.monotonic()
+    done = failed = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            futures = {executor.submit(reprocess_meeting, m, args, limiter): m for m in targets}
+            for future in as_completed(futures):
+                meeting_id = futures[future]
+                error = future.exception()
+                if error is None:
+                    done += 1
+                else:
+                    failed += 1
+                    print(f"❌ meeting_id={meeting_id}: {error}")
+
+                if state_fp:
+                    with state_lock:
+                        state_fp.write(json.dumps({"meeting_id": meeting_id, "ok": error is None,
+                                                   "error": str(error) if error else None}) + "\n")
+                        state_fp.flush()
+
+                elapsed = time.monotonic() - started_at
+                processed = done + failed
+                print(f"⏳ {processed}/{len(targets)} 完了（失敗 {failed}）"
+                      f" {processed / elapsed if elapsed else 0:.2f} 件/秒", flush=True)
+    finally:
+        if state_fp:
+            state_fp.close()
+
+    elapsed = time.monotonic() - started_at
+    print(f"✅ 再処理完了: 成功 {done} 件 / 失敗 {failed} 件 / {elapsed:.1f} 秒")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
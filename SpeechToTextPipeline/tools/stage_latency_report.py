@@ -0,0 +1,126 @@
+"""
+ステージ別レイテンシ・スループットレポート
+
+PipelineStageMetrics を集計し、ステージ別・レーン別・会議サイズ（音声時間）区分別に
+キュー待ち時間・起動時間・処理時間の p50/p95/p99 を表示する。
+
+使用例:
+    python tools/stage_latency_report.py --since 2026-10-01
+    python tools/stage_latency_report.py --since 2026-10-01 --stage summary --json
+
+列の意味:
+    queue_wait  : 前ステージの投入 → Queue Trigger 起動（キュー滞留 + ポーリング間隔）
+    startup     : Queue Trigger 起動 → DB 接続取得完了
+    processing  : ステージ処理本体（DB 接続取得後 → 完了）
+    end_to_end  : 投入 → 完了
+    items_per_s : 処理件数 / processing
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# function_app（get_db_connection）を import できるように sys.path を調整
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from function_app import get_db_connection  # noqa: E402
+from pipeline_processing.stage_metrics import size_bucket, summarize_latencies  # noqa: E402
+
+LATENCY_METRICS = ["queue_wait", "startup", "processing", "end_to_end", "items_per_s"]
+
+
+def seconds_between(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
+
+
+def fetch_stage_runs(cursor, args) -> list:
+    """PipelineStageMetrics を会議の音声時間と合わせて取得し、集計用の行に変換する"""
+    conditions = ["1 = 1"]
+    params = []
+    if not args.include_failed:
+        conditions.append("m.status = 'completed'")
+    if args.stage:
+        conditions.append("m.stage = ?")
+        params.append(args.stage)
+    if args.since:
+        conditions.append("m.started_datetime >= ?")
+        params.append(args.since)
+    if args.until:
+        conditions.append("m.started_datetime < ?")
+        params.append(args.until)
+
+    cursor.execute(f"""
+        SELECT m.stage, m.lane, m.via_fast_path, m.enqueued_datetime, m.dequeued_datetime,
+               m.started_datetime, m.ended_datetime, m.item_count, mt.duration_seconds
+        FROM dbo.PipelineStageMetrics m
+        LEFT JOIN dbo.Meetings mt ON mt.meeting_id = m.meeting_id
+        WHERE {' AND '.join(conditions)}
+    """, params)
+
+    rows = []
+    for stage, lane, via_fast_path, enqueued, dequeued, started, ended, item_count, duration_seconds in cursor.fetchall():
+        processing = seconds_between(started, ended)
+        rows.append({
+            "stage": stage + (" (fast)" if via_fast_path else ""),
+            "lane": lane,
+            "size": size_bucket(duration_seconds),
+            "queue_wait": seconds_between(enqueued, dequeued),
+            "startup": seconds_between(dequeued, started),
+            "processing": processing,
+            "end_to_end": seconds_between(enqueued, ended),
+            "items_per_s": item_count / processing if item_count and processing else None,
+        })
+    return rows
+
+
+def format_value(value) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_table(title: str, results: list, group_keys: list):
+    print(f"\n=== {title} ===")
+    header = [*group_keys, "n"]
+    for m in LATENCY_METRICS:
+        header.extend([f"{m}.p50", f"{m}.p95", f"{m}.p99"])
+    print("\t".join(header))
+    for result in results:
+        line = [str(result[k]) for k in group_keys]
+        line.append(str(result["processing_count"]))
+        for m in LATENCY_METRICS:
+            line.extend(format_value(result[f"{m}_p{p}"]) for p in (50, 95, 99))
+        print("\t".join(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ステージ別レイテンシ・スループットレポート")
+    parser.add_argument("--stage", help="対象ステージ（未指定は全ステージ）")
+    parser.add_argument("--since", help="started_datetime の開始（UTC、YYYY-MM-DD、以上）")
+    parser.add_argument("--until", help="started_datetime の終了（UTC、YYYY-MM-DD、未満）")
+    parser.add_argument("--include-failed", action="store_true", help="失敗したステージ実行も集計に含める")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        rows = fetch_stage_runs(conn.cursor(), args)
+    finally:
+        conn.close()
+
+    by_stage = summarize_latencies(rows, ["stage"], LATENCY_METRICS)
+    by_stage_lane = summarize_latencies(rows, ["stage", "lane"], LATENCY_METRICS)
+    by_stage_size = summarize_latencies(rows, ["stage", "size"], LATENCY_METRICS)
+
+    if args.json:
+        print(json.dumps({"by_stage": by_stage, "by_stage_and_lane": by_stage_lane,
+                          "by_stage_and_size": by_stage_size}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"📊 集計対象: {len(rows)} 件（秒、items_per_s は件/秒）")
+    print_table("ステージ別", by_stage, ["stage"])
+    print_table("ステージ × レーン別", by_stage_lane, ["stage", "lane"])
+    print_table("ステージ × 会議サイズ別", by_stage_size, ["stage", "size"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,18 @@
+import atexit
 from flask import Flask, request, jsonify
 from converters.convert_audio import convert_to_wav
-from threading import Thread
+from converters.job_store import DEFAULT_LIST_LIMIT, JOB_STATUSES, MAX_LIST_LIMIT, JobStore, get_store_settings
+from converters.worker_pool import ConversionWorkerPool, PoolClosedError, QueueFullError, get_pool_settings
 
 app = Flask(__name__)
 
-def background_convert(blob_url):
-    print("🚀 [background_convert] スレッド開始")
-    print(f"🧾 [background_convert] 処理対象 blob_url: {blob_url}")
-    try:
-        output_url = convert_to_wav(blob_url)
-        print(f"✅ [background_convert] 変換完了: {output_url}")
-    except Exception as e:
-        print(f"❌ [background_convert] エラー発生: {str(e)}")
+# 変換は固定数のワーカーで実行する（リクエストごとにスレッドを起動すると ffmpeg が CPU を奪い合うため）
+# ジョブの状態は SQLite に記録し、再起動時は未完了のジョブを再投入する
+store = JobStore(**get_store_settings())
+pool = ConversionWorkerPool(convert_to_wav, store, **get_pool_settings())
+pool.start()
+# 停止時は実行中・実行待ちのジョブの完了を待つ（gunicorn の --graceful-timeout を CONVERT_DRAIN_TIMEOUT_SECONDS 以上にする）
+atexit.register(pool.shutdown)
 
 @app.route("/convert", methods=["POST"])
 def convert():
@@ -32,10 +33,43 @@ def convert():
 
     print(f"🔔 blob_url を受信: {blob_url}")
 
-    # バックグラウンド処理を開始するが、ログだけは返す
-    Thread(target=background_convert, args=(blob_url,)).start()
+    # ワーカープールに登録（満杯の場合は Retry-After 付きで 429 を返す）
+    try:
+        job_id = pool.submit(blob_url)
+    except QueueFullError as e:
+        print(f"⏳ キューが満杯のため受付不可（Retry-After: {e.retry_after}s）")
+        response = jsonify({"error": "Converter is busy", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    except PoolClosedError:
+        print("🛑 シャットダウン中のため受付不可")
+        response = jsonify({"error": "Converter is shutting down"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
 
     return jsonify({
-        "message": "Conversion started",
-        "log": "✅ convert 受信済、変換スレッド起動"
+        "message": "Conversion queued",
+        "job_id": job_id,
+        "log": "✅ convert 受信済、変換キューに登録"
     }), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """ジョブの状態・フェーズ別の処理時間・出力 URL"""
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job), 200
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    """ジョブ一覧（新しい順）。?status=queued|running|done|failed&limit=50"""
+    status = request.args.get("status")
+    if status and status not in JOB_STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(JOB_STATUSES)}"}), 400
+    try:
+        limit = min(MAX_LIST_LIMIT, max(1, int(request.args.get("limit", DEFAULT_LIST_LIMIT))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    jobs = store.list(status, limit)
+    return jsonify({"jobs": jobs, "count": len(jobs)}), 200
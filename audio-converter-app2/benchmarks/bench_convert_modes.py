@@ -0,0 +1,169 @@
+"""
+変換方法（copy / remux / transcode）のベンチマーク
+
+ffmpeg の lavfi で合成した音声（正弦波）を入力形式ごとに作成し、converters/probe.py の判定と、
+判定された方法での処理時間を、従来どおり常に再エンコードした場合と比べる。ネットワーク（ダウンロード・
+アップロード）は含まない。copy はサーバー側コピーのため手元では計測できず、ローカルのファイルコピーで代用する。
+
+| 入力 | 想定 |
+|------|------|
+| wav_16k_mono | 既に出力形式の WAV（copy） |
+| mka_pcm_16k_mono | Matroska に入った 16kHz / モノラル / 16bit PCM（remux） |
+| wav_48k_stereo | 48kHz / ステレオの WAV（transcode） |
+| webm_opus_48k | ブラウザの MediaRecorder と同じ Opus / WebM（transcode。libopus がない ffmpeg では skipped） |
+
+--downstream-seconds に WAV 配置 → AllStepCompleted の実測秒数（文字起こしの所要時間 +
+tools/stage_latency_report.py の end_to_end）を渡すと、エンドツーエンドに占める変換の割合を
+従来（常に再エンコード）と判定後で表示する。
+
+使用例:
+    cd audio-converter-app2
+    python benchmarks/bench_convert_modes.py --ffmpeg bin/ffmpeg
+    python benchmarks/bench_convert_modes.py --durations 600,3600 --downstream-seconds 420 --json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from converters.probe import (  # noqa: E402
+    MODE_COPY, MODE_REMUX, PROBE_BYTES, REMUX_ARGS, TRANSCODE_ARGS, probe_head
+)
+
+DEFAULT_FFMPEG = Path(__file__).resolve().parent.parent / "bin" / "ffmpeg"
+DEFAULT_DURATIONS = [300, 1800, 3600]
+
+# 入力名 → (lavfi のサンプリングレート, ffmpeg の出力オプション, 拡張子)
+INPUTS = {
+    "wav_16k_mono": (16000, ["-ac", "1", "-c:a", "pcm_s16le"], "wav"),
+    "mka_pcm_16k_mono": (16000, ["-ac", "1", "-c:a", "pcm_s16le", "-f", "matroska"], "mka"),
+    "wav_48k_stereo": (48000, ["-ac", "2", "-c:a", "pcm_s16le"], "wav"),
+    "webm_opus_48k": (48000, ["-ac", "1", "-c:a", "libopus", "-b:a", "32k", "-f", "webm"], "webm"),
+}
+
+
+def run_ffmpeg(ffmpeg, args):
+    return subprocess.run([str(ffmpeg), "-hide_banner", "-loglevel", "error", "-y", *args],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def create_input(ffmpeg, workdir, name, duration):
+    """合成音声を作成する（ffmpeg が対応していない形式は None）"""
+    sample_rate, output_args, extension = INPUTS[name]
+    path = os.path.join(workdir, f"{name}_{duration}.{extension}")
+    result = run_ffmpeg(ffmpeg, [
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate={sample_rate}:duration={duration}",
+        *output_args, path,
+    ])
+    return path if result.returncode == 0 else None
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def convert(ffmpeg, source, target, codec_args):
+    result = run_ffmpeg(ffmpeg, ["-i", source, *codec_args, target])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="replace"))
+
+
+def measure(ffmpeg, workdir, name, duration, repeat):
+    """判定・判定後の処理・従来の再エンコードの秒数（repeat 回の最良値）"""
+    source = create_input(ffmpeg, workdir, name, duration)
+    if source is None:
+        return {"input": name, "duration": duration, "status": "skipped"}
+    target = os.path.join(workdir, "output.wav")
+
+    def probe():
+        with open(source, "rb") as f:
+            head = f.read(PROBE_BYTES)
+        return probe_head(str(ffmpeg), head, os.path.getsize(source))
+
+    result = probe()
+    if result.mode == MODE_COPY:
+        shortcut = lambda: shutil.copyfile(source, target)  # noqa: E731
+    elif result.mode == MODE_REMUX:
+        shortcut = lambda: convert(ffmpeg, source, target, REMUX_ARGS)  # noqa: E731
+    else:
+        shortcut = lambda: convert(ffmpeg, source, target, TRANSCODE_ARGS)  # noqa: E731
+
+    probe_seconds = min(timed(probe) for _ in range(repeat))
+    shortcut_seconds = min(timed(shortcut) for _ in range(repeat))
+    transcode_seconds = min(timed(lambda: convert(ffmpeg, source, target, TRANSCODE_ARGS)) for _ in range(repeat))
+    os.remove(source)
+    return {
+        "input": name,
+        "duration": duration,
+        "status": "ok",
+        "mode": result.mode,
+        "probe": round(probe_seconds, 4),
+        "converter": round(probe_seconds + shortcut_seconds, 4),
+        "transcode": round(transcode_seconds, 4),
+        "speedup": round(transcode_seconds / (probe_seconds + shortcut_seconds), 1),
+    }
+
+
+def add_share(row, downstream_seconds):
+    """エンドツーエンド（変換 + 下流）に占める変換の割合（%）"""
+    for key in ("transcode", "converter"):
+        row[f"{key}_share"] = round(100 * row[key] / (row[key] + downstream_seconds), 1)
+
+
+def format_value(value):
+    return "-" if value is None else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="変換方法（copy / remux / transcode）のベンチマーク")
+    parser.add_argument("--ffmpeg", default=str(DEFAULT_FFMPEG), help="ffmpeg の実行パス（既定 bin/ffmpeg）")
+    parser.add_argument("--durations", default=",".join(str(d) for d in DEFAULT_DURATIONS),
+                        help="音声の長さ（秒、カンマ区切り）")
+    parser.add_argument("--inputs", default=",".join(INPUTS), help="計測する入力（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=1, help="計測回数（最良値を使用）")
+    parser.add_argument("--downstream-seconds", type=float,
+                        help="WAV 配置 → AllStepCompleted の実測秒数（指定時は変換の割合を表示）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    durations = [int(d) for d in args.durations.split(",")]
+    names = args.inputs.split(",")
+    unknown = [name for name in names if name not in INPUTS]
+    if unknown:
+        parser.error(f"未対応の入力: {', '.join(unknown)}")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for duration in durations:
+            for name in names:
+                row = measure(args.ffmpeg, workdir, name, duration, max(1, args.repeat))
+                if row["status"] == "ok" and args.downstream_seconds is not None:
+                    add_share(row, args.downstream_seconds)
+                rows.append(row)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+
+    columns = ["input", "duration", "mode", "probe", "converter", "transcode", "speedup"]
+    if args.downstream_seconds is not None:
+        columns += ["transcode_share", "converter_share"]
+    print("\t".join(columns))
+    for row in rows:
+        if row["status"] != "ok":
+            print("\t".join([row["input"], str(row["duration"]), row["status"]]))
+            continue
+        print("\t".join(format_value(row.get(column)) for column in columns))
+    print("\n（秒。converter = 判定 + 判定後の処理、transcode = 従来の再エンコード、share = エンドツーエンドに占める割合 %）")
+
+
+if __name__ == "__main__":
+    main()
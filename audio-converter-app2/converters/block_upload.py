@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import ResourceNotFoundError
+
+DEFAULT_BLOCK_SIZE_MB = 4
+DEFAULT_CONCURRENCY = 4
+MAX_BLOCKS = 50000               # 1つの blob に commit できるブロック数の上限
+
+
+def get_upload_settings():
+    """
+    ブロックアップロードの設定
+
+    環境変数:
+        CONVERT_BLOCK_SIZE_MB: stage_block 1回あたりのサイズ（既定 4MB）
+        CONVERT_UPLOAD_CONCURRENCY: 同時に stage_block する数（既定 4）。メモリ上限 = (この値 + 1) × ブロックサイズ
+        CONVERT_UPLOAD_MD5: "true" でブロックごとに Content-MD5 を付けて送信し、Storage 側で検証する（既定は無効）
+    """
+    return {
+        "block_size": max(1, int(os.environ.get("CONVERT_BLOCK_SIZE_MB", str(DEFAULT_BLOCK_SIZE_MB)))) * 1024 * 1024,
+        "concurrency": max(1, int(os.environ.get("CONVERT_UPLOAD_CONCURRENCY", str(DEFAULT_CONCURRENCY)))),
+        "validate_md5": os.environ.get("CONVERT_UPLOAD_MD5", "false").lower() == "true",
+    }
+
+
+def block_id(index, data):
+    """
+    ブロック ID（連番 5 桁 + 内容の MD5 先頭 7 桁）
+
+    同じ blob 内のブロック ID は同じ長さにする必要がある。内容を含めるため、前回の実行で stage 済みの
+    ブロックは ID とサイズが一致すれば内容も同じとみなして再送しない。
+    """
+    return base64.b64encode(f"{index:05d}{hashlib.md5(data).hexdigest()[:7]}".encode()).decode()
+
+
+class BlockUploader:
+    """
+    ブロックを並列に stage_block し、commit で確定する
+
+    stage() は送信中のブロックが concurrency 個に達すると空くまで待つ（メモリ使用量の上限）。
+    プロセスが落ちるなどで commit されなかった前回のブロックは未確定のまま Storage に残るため
+    （7日で削除）、開始時に一覧を取得し、ID とサイズが一致するブロックは再送しない。
+    """
+
+    def __init__(self, blob_client, concurrency, validate_md5=False):
+        self.blob_client = blob_client
+        self.validate_md5 = validate_md5
+        self.uploaded_bytes = 0
+        self.uploaded_blocks = 0
+        self.resumed_blocks = 0
+        self._ids = {}
+        self._errors = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="block-upload")
+        self._staged = self._uncommitted_blocks()
+
+    def _uncommitted_blocks(self):
+        try:
+            _, uncommitted = self.blob_client.get_block_list("uncommitted")
+        except ResourceNotFoundError:
+            return set()
+        return {(block.id, block.size) for block in uncommitted}
+
+    def stage(self, index, data):
+        """index 番目のブロックを送信する（送信は別スレッド、失敗していた場合は例外）"""
+        if self._errors:
+            raise self._errors[0]
+        if index >= MAX_BLOCKS:
+            raise Exception(f"❌ ブロック数が上限（{MAX_BLOCKS}）を超えます。CONVERT_BLOCK_SIZE_MB を大きくしてください")
+        current_id = block_id(index, data)
+        self._ids[index] = current_id
+        if (current_id, len(data)) in self._staged:
+            self.resumed_blocks += 1
+            return
+
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._stage_block, current_id, data)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _stage_block(self, current_id, data):
+        try:
+            if self._errors:
+                return  # 失敗後の残りは送らない
+            self.blob_client.stage_block(current_id, data, length=len(data), validate_content=self.validate_md5)
+            with self._lock:
+                self.uploaded_bytes += len(data)
+                self.uploaded_blocks += 1
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._slots.release()
+
+    def wait(self):
+        """送信中のブロックの完了を待つ（失敗していた場合は例外）"""
+        self._executor.shutdown(wait=True)
+        if self._errors:
+            raise self._errors[0]
+
+    def commit(self, content_settings=None):
+        """stage したブロックを index 順に並べて確定する"""
+        self.wait()
+        self.blob_client.commit_block_list(
+            [self._ids[index] for index in sorted(self._ids)], content_settings=content_settings
+        )
+
+    def abort(self):
+        """失敗時に未送信のブロックを破棄する（stage 済みのブロックは次回の再開に使う）"""
+        self._errors.append(Exception("aborted"))
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "upload_bytes": self.uploaded_bytes,
+            "upload_blocks": self.uploaded_blocks,
+            "resumed_blocks": self.resumed_blocks,
+        }
@@ -0,0 +1,134 @@
+import json
+import math
+import os
+import uuid
+
+import numpy as np
+
+from converters.vad import FRAME_SECONDS, frame_features, open_pcm_samples, write_wav
+
+DEFAULT_MAX_SECONDS = 1800
+DEFAULT_SEARCH_SECONDS = 120
+DEFAULT_CHUNK_CONTAINER = "meeting-audio-chunks"
+DEFAULT_OVERLAP_SECONDS = 15
+SMOOTH_SECONDS = 1.0             # 区切り位置を探すエネルギーの平滑化（発話の合間の短い無音で切らない）
+
+# SpeechToTextPipeline（pipeline_processing/transcript_chunks.py）が読み込むマニフェストの形式
+# （2: 各チャンクに前のチャンクと重なる秒数 overlap_seconds を追加）
+CHUNK_MANIFEST_VERSION = 2
+CHUNK_MANIFEST_SUFFIX = ".chunks.json"
+
+
+def get_chunk_settings():
+    """
+    長時間録音の分割の設定
+
+    環境変数:
+        CONVERT_CHUNKING: "true" で有効化（既定は無効）
+        CONVERT_CHUNK_MAX_SECONDS: 1チャンクの最大の長さ（既定 1800 秒）。これより長い録音を分割する
+        CONVERT_CHUNK_SEARCH_SECONDS: 区切り位置（最も静かな位置）を探す範囲（既定 120 秒）
+        CONVERT_CHUNK_CONTAINER: チャンクを配置するコンテナ（既定 meeting-audio-chunks。文字起こしを起動しないコンテナ）
+        CONVERT_CHUNK_OVERLAP_SECONDS: 2つ目以降のチャンクを区切り位置より前から始める秒数（既定 15 秒）。
+            重なった区間の発話で、チャンクごとに振られる話者番号を対応付ける
+    """
+    return {
+        "enabled": os.environ.get("CONVERT_CHUNKING", "false").lower() == "true",
+        "max_seconds": float(os.environ.get("CONVERT_CHUNK_MAX_SECONDS", str(DEFAULT_MAX_SECONDS))),
+        "search_seconds": float(os.environ.get("CONVERT_CHUNK_SEARCH_SECONDS", str(DEFAULT_SEARCH_SECONDS))),
+        "container": os.environ.get("CONVERT_CHUNK_CONTAINER", DEFAULT_CHUNK_CONTAINER),
+        "overlap_seconds": max(0.0, float(os.environ.get("CONVERT_CHUNK_OVERLAP_SECONDS", str(DEFAULT_OVERLAP_SECONDS)))),
+    }
+
+
+def plan_chunk_boundaries(energy, max_frames, search_frames, smooth_frames):
+    """
+    区切り位置（フレーム）のリスト。分割しない場合は空
+
+    残りを均等に分けた位置の前後 search_frames の範囲（各チャンクが max_frames を超えない範囲）で、
+    平滑化したエネルギーが最小のフレームで区切る。
+    """
+    frame_count = len(energy)
+    if frame_count <= max_frames:
+        return []
+    if smooth_frames > 1:
+        smoothed = np.convolve(energy, np.ones(smooth_frames, dtype=np.float32) / smooth_frames, mode="same")
+    else:
+        smoothed = energy
+
+    boundaries = []
+    start = 0
+    half = max(1, search_frames // 2)
+    while frame_count - start > max_frames:
+        remaining_chunks = math.ceil((frame_count - start) / max_frames)
+        ideal = start + (frame_count - start) // remaining_chunks
+        window_end = min(start + max_frames, ideal + half)
+        window_start = min(max(start + 1, ideal - half), window_end - 1)
+        cut = window_start + int(np.argmin(smoothed[window_start:window_end]))
+        boundaries.append(cut)
+        start = cut
+    return boundaries
+
+
+def chunk_blob_name(wav_blob_name, index):
+    """rec.wav の index 番目のチャンク（rec/chunk-000.wav）"""
+    return f"{wav_blob_name.rsplit('.', 1)[0]}/chunk-{index:03d}.wav"
+
+
+def chunk_manifest_name(wav_blob_name):
+    """WAV と同じコンテナに置くマニフェストの blob 名（rec.wav → rec.chunks.json）"""
+    return wav_blob_name.rsplit(".", 1)[0] + CHUNK_MANIFEST_SUFFIX
+
+
+def build_chunk_manifest(chunks, duration_seconds):
+    """chunks は {"index", "container", "blob", "start_seconds", "duration_seconds", "overlap_seconds"} のリスト"""
+    return {
+        "version": CHUNK_MANIFEST_VERSION,
+        "duration_seconds": duration_seconds,
+        "chunks": chunks,
+    }
+
+
+def encode_chunk_manifest(manifest) -> bytes:
+    return json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+
+
+def split_wav(input_path, max_seconds, search_seconds, overlap_seconds=0.0, temp_dir="/tmp"):
+    """
+    16kHz / モノラル / 16bit の WAV を静かな位置で max_seconds 以下のチャンクに分割する
+
+    2つ目以降のチャンクは区切り位置の overlap_seconds 前から始める（前のチャンクの末尾と重なる。
+    その分だけ max_seconds を超える）。
+
+    Returns:
+        list: [(チャンクのパス, 開始秒, 長さ秒, 前のチャンクと重なる秒数), ...]。max_seconds 以下の録音は空（ファイルは作らない）
+    """
+    samples, sample_rate = open_pcm_samples(input_path)
+    frame_size = int(sample_rate * FRAME_SECONDS)
+    energy, _ = frame_features(samples, frame_size)
+    boundaries = plan_chunk_boundaries(
+        energy, int(max_seconds / FRAME_SECONDS), int(search_seconds / FRAME_SECONDS), int(SMOOTH_SECONDS / FRAME_SECONDS)
+    )
+    if not boundaries:
+        return []
+
+    # フレーム単位の区切りをサンプル単位に変換する（最後のフレームに満たない末尾は最後のチャンクに含める）
+    edges = [0] + [boundary * frame_size for boundary in boundaries] + [len(samples)]
+    overlap = int(overlap_seconds * sample_rate)
+    chunks = []
+    try:
+        for cut, end in zip(edges[:-1], edges[1:]):
+            start = max(0, cut - overlap)
+            path = os.path.join(temp_dir, f"{uuid.uuid4()}.chunk.wav")
+            chunks.append((path, round(start / sample_rate, 3), round((end - start) / sample_rate, 3),
+                           round((cut - start) / sample_rate, 3)))
+            write_wav(path, samples, [(start, end)], sample_rate)
+    except BaseException:
+        remove_chunks(chunks)
+        raise
+    return chunks
+
+
+def remove_chunks(chunks):
+    for path, *_ in chunks:
+        if os.path.exists(path):
+            os.remove(path)
@@ -2,8 +2,21 @@ import requests
 import subprocess
 import uuid
 import os
+import struct
+import threading
+import time
+from collections import deque
+from azure.core.exceptions import ResourceNotFoundError
 from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobClient
+from azure.storage.blob import BlobClient, ContentSettings
+from converters.block_upload import BlockUploader, get_upload_settings
+from converters.chunking import (
+    build_chunk_manifest, chunk_blob_name, chunk_manifest_name, encode_chunk_manifest, get_chunk_settings,
+    remove_chunks, split_wav
+)
+from converters.playback import PLAYBACK_CONTENT_TYPE, get_playback_settings, playback_args, playback_blob_name
+from converters.probe import MODE_COPY, MODE_REMUX, MODE_TRANSCODE, REMUX_ARGS, TRANSCODE_ARGS, probe_input
+from converters.vad import encode_offset_remap, get_vad_settings, offset_remap_name, trim_silence
 
 UPLOAD_ACCOUNT_NAME = "passrgmoc83cf"
 UPLOAD_CONTAINER_NAME = "meeting-audio"
@@ -12,45 +25,47 @@ UPLOAD_CONTAINER_NAME = "meeting-audio"
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 FFMPEG_PATH = os.path.join(THIS_DIR, "../bin/ffmpeg")
 
-def convert_to_wav(blob_url):
-    """SAS付きURLからDL → WAV変換 → Managed Identityでアップロード"""
-    print("🧪 convert_to_wav() 開始")
-    print(f"🔗 入力 blob_url: {blob_url}")
+# 出力形式（Speech 向け 16kHz / モノラル / 16bit PCM）
+SAMPLE_RATE = 16000
+CHANNELS = 1
+BITS_PER_SAMPLE = 16
 
-    temp_input = f"/tmp/{uuid.uuid4()}.input"
-    temp_output = f"/tmp/{uuid.uuid4()}.wav"
-    print(f"📄 一時ファイル: {temp_input}, {temp_output}")
+COPY_POLL_SECONDS = 1
+COPY_TIMEOUT_SECONDS = 600
+
+# ストリーミング変換の設定
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+FFMPEG_STDERR_LINES = 50         # エラー時に表示する ffmpeg 標準エラーの末尾行数
+
+
+class StreamingConversionError(Exception):
+    """ストリーミング変換で ffmpeg が失敗した（入力がパイプから読めない形式など）"""
+
+
+def streaming_enabled():
+    """
+    ストリーミング変換（ダウンロード → ffmpeg → ブロックアップロードをパイプで接続）を使うか
 
-    # 🎧 ダウンロード
-    print("⬇️ 音声データをダウンロード開始")
-    r = requests.get(blob_url, stream=True)
-    print(f"🌐 ダウンロードステータス: {r.status_code}")
-    if r.status_code != 200:
-        raise Exception(f"❌ ダウンロード失敗: {r.status_code}")
-    with open(temp_input, "wb") as f:
-        for chunk in r.iter_content(8192):
-            f.write(chunk)
-    print("✅ ダウンロード完了")
-
-    # 🔄 ffmpeg 変換
-    print("🎬 ffmpeg 変換開始")
-    print(f"🛠️ 実行パス: {FFMPEG_PATH}")
-    print(f"⚙️ コマンド: {FFMPEG_PATH} -y -i {temp_input} -ar 16000 -ac 1 -c:a pcm_s16le {temp_output}")
-    result = subprocess.run([
-        FFMPEG_PATH, "-y", "-i", temp_input,
-        "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", temp_output
-    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    print(f"🎞️ ffmpeg 標準出力:\n{result.stdout}")
-    print(f"⚠️ ffmpeg 標準エラー:\n{result.stderr}")
-
-    if result.returncode != 0:
-        raise Exception(f"❌ ffmpeg 変換失敗: return code {result.returncode}")
-
-    print("✅ ffmpeg 変換完了")
-
-    # 🆙 アップロード先 blob 名
-    # 🆙 アップロード先 blob 名を入力ファイル名に基づいて作成
+    環境変数:
+        CONVERT_STREAMING: "true" で有効化（既定は無効 = 一時ファイル経由）
+
+    アップロードのブロックサイズ・並列数は block_upload.get_upload_settings を参照。
+    """
+    return os.environ.get("CONVERT_STREAMING", "false").lower() == "true"
+
+
+def probe_enabled():
+    """
+    変換前に入力の形式を判定し、不要な再エンコードを省くか
+
+    環境変数:
+        CONVERT_PROBE_INPUT: "true" で有効化（既定は無効 = 常に再エンコード）
+    """
+    return os.environ.get("CONVERT_PROBE_INPUT", "false").lower() == "true"
+
+
+def output_blob_client(blob_url):
+    """入力ファイル名に基づくアップロード先（拡張子を .wav に変更）の BlobClient と URL"""
     original_name = os.path.basename(blob_url.split('?')[0])  # クエリパラメータを除去
     output_blob_name = original_name.rsplit('.', 1)[0] + ".wav"
     print(f"🗃️ アップロード先 blob 名: {output_blob_name}")
@@ -59,15 +74,441 @@ def convert_to_wav(blob_url):
     print("🪪 DefaultAzureCredential を取得")
     credential = DefaultAzureCredential()
 
-    blob_url = f"https://{UPLOAD_ACCOUNT_NAME}.blob.core.windows.net/{UPLOAD_CONTAINER_NAME}/{output_blob_name}"
-    print(f"🚀 アップロード先 URL: {blob_url}")
+    output_url = f"https://{UPLOAD_ACCOUNT_NAME}.blob.core.windows.net/{UPLOAD_CONTAINER_NAME}/{output_blob_name}"
+    print(f"🚀 アップロード先 URL: {output_url}")
+    return BlobClient.from_blob_url(output_url, credential=credential), output_url
+
+
+def build_wav_header(data_size, sample_rate=SAMPLE_RATE, channels=CHANNELS, bits_per_sample=BITS_PER_SAMPLE):
+    """PCM の WAV ヘッダー（44 バイト）"""
+    block_align = channels * bits_per_sample // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample,
+        b"data", data_size,
+    )
+
+
+def convert_to_wav(blob_url, timings=None):
+    """
+    SAS付きURLからDL → WAV変換 → Managed Identityでアップロード
+
+    timings（dict）を渡すと、フェーズ別の処理時間（probe / download / ffmpeg / upload、秒）と
+    変換方法（mode: copy / remux / transcode）、アップロードの件数（upload_bytes / upload_blocks /
+    resumed_blocks）、無音の圧縮（vad 秒、removed_seconds）、長時間録音の分割（chunk 秒、chunks）、再生用の音声の作成（playback 秒）を書き込む。
+    """
+    timings = {} if timings is None else timings
+    mode = MODE_TRANSCODE
+    if probe_enabled():
+        started = time.monotonic()
+        try:
+            probe = probe_input(FFMPEG_PATH, blob_url)
+            mode = probe.mode
+            print(f"🔍 入力の判定: {probe.mode}（{probe.container}, {probe.reason}）")
+        except Exception as e:
+            print(f"⚠️ 入力の判定に失敗したため再エンコードします: {e}")
+        timings["probe"] = elapsed(started)
+
+    if mode == MODE_COPY and needs_whole_file():
+        # 無音の圧縮・分割には中身を読む必要があるため、コピーせずに詰め替える
+        mode = MODE_REMUX
+    timings["mode"] = mode
+    if mode == MODE_COPY:
+        return copy_to_wav(blob_url, timings)
+    if mode == MODE_REMUX:
+        try:
+            return run_ffmpeg(blob_url, timings, REMUX_ARGS)
+        except Exception as e:
+            print(f"⚠️ 再エンコードなしの変換に失敗したため再エンコードで再実行: {e}")
+            timings["mode"] = MODE_TRANSCODE
+    return run_ffmpeg(blob_url, timings, TRANSCODE_ARGS)
+
+
+def needs_whole_file():
+    """無音の圧縮・長時間録音の分割は録音全体を読んで判定するため、一時ファイル経由で変換する"""
+    return get_vad_settings()["enabled"] or get_chunk_settings()["enabled"]
+
+
+def run_ffmpeg(blob_url, timings, codec_args):
+    if streaming_enabled() and not needs_whole_file():
+        try:
+            return convert_to_wav_streaming(blob_url, timings, codec_args)
+        except StreamingConversionError as e:
+            # MP4 系で moov が末尾にあるなど、パイプからは読めない入力は一時ファイル経由でやり直す
+            print(f"⚠️ ストリーミング変換に失敗したため一時ファイル経由で再実行: {e}")
+    return convert_to_wav_file(blob_url, timings, codec_args)
+
+
+def copy_to_wav(blob_url, timings):
+    """既に出力形式の WAV はダウンロードせずに Blob のサーバー側コピーで配置する（timings の upload はコピーの秒数）"""
+    blob_client, output_url = output_blob_client(blob_url)
+    print("📋 サーバー側コピーを開始")
+    started = time.monotonic()
+    blob_client.start_copy_from_url(blob_url)
+    deadline = started + COPY_TIMEOUT_SECONDS
+    while True:
+        copy = blob_client.get_blob_properties().copy
+        if copy.status != "pending":
+            break
+        if time.monotonic() > deadline:
+            blob_client.abort_copy(copy.id)
+            raise Exception(f"❌ コピーがタイムアウトしました（{COPY_TIMEOUT_SECONDS} 秒）")
+        time.sleep(COPY_POLL_SECONDS)
+    if copy.status != "success":
+        raise Exception(f"❌ コピー失敗: {copy.status} {copy.status_description}")
+    timings["upload"] = elapsed(started)
+    print("✅ コピー完了")
+    create_playback_rendition(blob_url, output_url, blob_client.credential, timings)
+    return output_url
+
+
+def elapsed(started):
+    return round(time.monotonic() - started, 3)
+
+
+def convert_to_wav_file(blob_url, timings, codec_args=TRANSCODE_ARGS):
+    """一時ファイル経由の変換（ダウンロード完了 → ffmpeg → アップロードを順に行う）"""
+    print("🧪 convert_to_wav() 開始")
+    print(f"🔗 入力 blob_url: {blob_url}")
+
+    temp_input = f"/tmp/{uuid.uuid4()}.input"
+    temp_output = f"/tmp/{uuid.uuid4()}.wav"
+    temp_trimmed = f"/tmp/{uuid.uuid4()}.trimmed.wav"
+    print(f"📄 一時ファイル: {temp_input}, {temp_output}")
+
+    try:
+        # 🎧 ダウンロード
+        print("⬇️ 音声データをダウンロード開始")
+        started = time.monotonic()
+        r = requests.get(blob_url, stream=True)
+        print(f"🌐 ダウンロードステータス: {r.status_code}")
+        if r.status_code != 200:
+            raise Exception(f"❌ ダウンロード失敗: {r.status_code}")
+        with open(temp_input, "wb") as f:
+            for chunk in r.iter_content(8192):
+                f.write(chunk)
+        timings["download"] = elapsed(started)
+        print("✅ ダウンロード完了")
+
+        # 🔄 ffmpeg 変換
+        print("🎬 ffmpeg 変換開始")
+        started = time.monotonic()
+        print(f"🛠️ 実行パス: {FFMPEG_PATH}")
+        command = [FFMPEG_PATH, "-y", "-i", temp_input, *codec_args, temp_output]
+        print(f"⚙️ コマンド: {' '.join(command)}")
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+        print(f"🎞️ ffmpeg 標準出力:\n{result.stdout}")
+        print(f"⚠️ ffmpeg 標準エラー:\n{result.stderr}")
+
+        timings["ffmpeg"] = elapsed(started)
+        if result.returncode != 0:
+            raise Exception(f"❌ ffmpeg 変換失敗: return code {result.returncode}")
+
+        print("✅ ffmpeg 変換完了")
+
+        blob_client, output_url = output_blob_client(blob_url)
+        upload_path = trim_silence_before_upload(blob_client, output_url, temp_output, temp_trimmed, timings)
+        split_before_upload(blob_client, output_url, upload_path, timings)
+
+        # ⬆️ アップロード実行
+        print("📤 WAV をアップロード中...")
+        started = time.monotonic()
+        upload_file_in_blocks(blob_client, upload_path, timings)
+        timings["upload"] = elapsed(started)
+        print("✅ アップロード完了")
+
+        # 無音を圧縮した WAV は元の音声の offset で再生位置を合わせられないため、再生用の音声を必ず作成する
+        create_playback_rendition(temp_input, output_url, blob_client.credential, timings,
+                                  required=upload_path == temp_trimmed)
+        return output_url
+    finally:
+        # 🧹 一時ファイルを削除
+        for path in (temp_input, temp_output, temp_trimmed):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def trim_silence_before_upload(blob_client, output_url, wav_path, trimmed_path, timings):
+    """
+    長い無音を圧縮し（CONVERT_VAD が有効な場合）、アップロードする WAV のパスを返す
+
+    文字起こしの offset を元の音声の位置に戻すための対応表（rec.offsets.json）は、WAV の
+    アップロード（文字起こしの起動）より先に同じコンテナへ配置する。
+    """
+    settings = get_vad_settings()
+    if not settings["enabled"]:
+        return wav_path
+
+    started = time.monotonic()
+    remap = None
+    try:
+        remap = trim_silence(wav_path, trimmed_path, settings["min_silence"], settings["keep_silence"], settings["threshold_db"])
+    except Exception as e:
+        print(f"⚠️ 無音の圧縮に失敗したため元の WAV をアップロード: {e}")
+    timings["vad"] = elapsed(started)
+
+    remap_client = BlobClient.from_blob_url(offset_remap_name(output_url), credential=blob_client.credential)
+    if remap is None:
+        # 再変換で前回の対応表が残っていると offset がずれるため削除する
+        try:
+            remap_client.delete_blob()
+        except ResourceNotFoundError:
+            pass
+        return wav_path
+
+    timings["removed_seconds"] = round(remap["original_duration_seconds"] - remap["trimmed_duration_seconds"], 3)
+    print(f"✂️ 無音を圧縮: {remap['original_duration_seconds']} 秒 → {remap['trimmed_duration_seconds']} 秒（{len(remap['segments'])} 区間）")
+    remap_client.upload_blob(encode_offset_remap(remap), overwrite=True)
+    return trimmed_path
+
+
+def split_before_upload(blob_client, output_url, wav_path, timings):
+    """
+    長時間録音をチャンクに分割して配置する（CONVERT_CHUNKING が有効な場合）
+
+    チャンクは文字起こしを起動しないコンテナ（CONVERT_CHUNK_CONTAINER）に置き、各チャンクの開始位置を
+    記録したマニフェスト（rec.chunks.json）を、WAV のアップロード（文字起こしの起動）より先に同じコンテナへ配置する。
+    分割に失敗した場合は WAV 全体を1つのジョブで文字起こしする。
+    """
+    settings = get_chunk_settings()
+    if not settings["enabled"]:
+        return
+
+    started = time.monotonic()
+    output_blob_name = output_url.rsplit("/", 1)[-1]
+    manifest_client = BlobClient.from_blob_url(chunk_manifest_name(output_url), credential=blob_client.credential)
+    chunks = []
+    manifest = None
+    try:
+        chunks = split_wav(wav_path, settings["max_seconds"], settings["search_seconds"], settings["overlap_seconds"])
+        entries = []
+        for index, (path, start_seconds, duration_seconds, overlap_seconds) in enumerate(chunks):
+            blob_name = chunk_blob_name(output_blob_name, index)
+            chunk_url = f"https://{UPLOAD_ACCOUNT_NAME}.blob.core.windows.net/{settings['container']}/{blob_name}"
+            chunk_client = BlobClient.from_blob_url(chunk_url, credential=blob_client.credential)
+            upload_file_in_blocks(chunk_client, path, {})
+            entries.append({
+                "index": index,
+                "container": settings["container"],
+                "blob": blob_name,
+                "start_seconds": start_seconds,
+                "duration_seconds": duration_seconds,
+                "overlap_seconds": overlap_seconds,
+            })
+        if entries:
+            # チャンクは重なるため、録音の長さは最後のチャンクの終了位置
+            manifest = build_chunk_manifest(entries, round(entries[-1]["start_seconds"] + entries[-1]["duration_seconds"], 3))
+    except Exception as e:
+        print(f"⚠️ 長時間録音の分割に失敗したため WAV 全体を文字起こしします: {e}")
+    finally:
+        remove_chunks(chunks)
+
+    if manifest is None:
+        # 再変換で前回のマニフェストが残っていると古いチャンクを文字起こしするため削除する
+        try:
+            manifest_client.delete_blob()
+        except ResourceNotFoundError:
+            pass
+    else:
+        manifest_client.upload_blob(encode_chunk_manifest(manifest), overwrite=True)
+        timings["chunks"] = len(manifest["chunks"])
+        print(f"🧩 {manifest['duration_seconds']} 秒の録音を {len(manifest['chunks'])} チャンクに分割")
+    timings["chunk"] = elapsed(started)
+
+
+def create_playback_rendition(source, output_url, credential, timings, required=False):
+    """
+    再生用の音声（rec.m4a）を作成して配置する（CONVERT_PLAYBACK が有効な場合、または required の場合）
+
+    無音を圧縮した場合（required）は、meeting-audio の WAV が圧縮後の音声で元の音声の offset と位置が合わないため、
+    CONVERT_PLAYBACK が無効でも作成する。
+
+    文字起こしを待たせないよう WAV のアップロード後に行う。offset は元の音声の位置のため、無音の圧縮・分割の前の
+    入力から作成する。source は変換時にダウンロードした一時ファイル（一時ファイル経由・ストリーミング変換）か、
+    ダウンロード用の URL（サーバー側コピー。アプリが入力を読むのはこの1回のみ）。
+    失敗しても変換は成功とする（再生は WAV にフォールバックする。無音を圧縮した場合は再生できる音声なしになる）。
+    """
+    settings = get_playback_settings()
+    if not settings["enabled"] and not required:
+        return
+
+    started = time.monotonic()
+    temp_playback = f"/tmp/{uuid.uuid4()}.m4a"
+    try:
+        command = [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+            *playback_args(settings["bitrate"]), temp_playback
+        ]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg return code {result.returncode}: {result.stderr[-500:]}")
+
+        playback_name = playback_blob_name(output_url.rsplit("/", 1)[-1])
+        playback_url = f"https://{UPLOAD_ACCOUNT_NAME}.blob.core.windows.net/{settings['container']}/{playback_name}"
+        playback_client = BlobClient.from_blob_url(playback_url, credential=credential)
+        upload_file_in_blocks(playback_client, temp_playback, {}, ContentSettings(content_type=PLAYBACK_CONTENT_TYPE))
+        print(f"🎧 再生用の音声をアップロード: {playback_url}（{os.path.getsize(temp_playback)} バイト）")
+    except Exception as e:
+        print(f"⚠️ 再生用の音声の作成に失敗（文字起こしには影響なし）: {e}")
+    finally:
+        if os.path.exists(temp_playback):
+            os.remove(temp_playback)
+    timings["playback"] = elapsed(started)
+
+
+def upload_file_in_blocks(blob_client, path, timings, content_settings=None):
+    """ファイルをブロックに分けて並列に stage_block し、commit する"""
+    settings = get_upload_settings()
+    uploader = BlockUploader(blob_client, settings["concurrency"], settings["validate_md5"])
+    try:
+        with open(path, "rb") as f:
+            index = 0
+            while True:
+                data = f.read(settings["block_size"])
+                if not data:
+                    break
+                uploader.stage(index, data)
+                index += 1
+        uploader.commit(content_settings)
+    except BaseException:
+        uploader.abort()
+        raise
+    finally:
+        timings.update(uploader.stats())
+
+
+def feed_download(blob_url, stdin, errors, timings, started, tee_path=None):
+    """
+    ダウンロードしたデータを ffmpeg の標準入力に書き込む（別スレッド）
+
+    tee_path を指定した場合は同じデータを一時ファイルにも書き出す（再生用の音声の作成で入力を読み直さない）。
+    最後まで書き出せた場合のみ timings に download が入る。
+    """
+    tee = open(tee_path, "wb") if tee_path else None
+    try:
+        with requests.get(blob_url, stream=True) as r:
+            print(f"🌐 ダウンロードステータス: {r.status_code}")
+            if r.status_code != 200:
+                raise Exception(f"❌ ダウンロード失敗: {r.status_code}")
+            for chunk in r.iter_content(DOWNLOAD_CHUNK_SIZE):
+                if tee:
+                    tee.write(chunk)
+                stdin.write(chunk)
+        timings["download"] = elapsed(started)
+        print("✅ ダウンロード完了")
+    except BrokenPipeError:
+        # ffmpeg が先に終了した（終了コードで判定する）
+        pass
+    except Exception as e:
+        errors.append(e)
+    finally:
+        if tee:
+            tee.close()
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def drain_stderr(stderr, lines):
+    """ffmpeg の標準エラーを読み捨てる（パイプが詰まって ffmpeg が止まらないように末尾のみ保持）"""
+    for line in iter(stderr.readline, b""):
+        lines.append(line.decode("utf-8", errors="replace").rstrip())
+
+
+def convert_to_wav_streaming(blob_url, timings, codec_args=TRANSCODE_ARGS):
+    """
+    ダウンロード → ffmpeg → ブロックアップロードをパイプで接続して同時に進める（再生用の音声を作成する場合のみ入力を一時ファイルにも書き出す）
+
+    ffmpeg は生の PCM（s16le）を標準出力に書き出し、ブロックごとに（並列に）stage_block する。
+    パイプ出力では WAV ヘッダーのサイズを書き戻せないため、データ長が確定した最後にヘッダーを
+    別ブロックとして stage し、commit_block_list で先頭に並べる。
+    メモリ使用量はブロックサイズ × (並列数 + 1) 程度で、音声の長さに依存しない。
+
+    3つのフェーズは重なって進むため、timings はいずれも開始からの経過秒数
+    （download: ダウンロード完了、ffmpeg: ffmpeg 終了、upload: commit 完了）。
+    """
+    print("🧪 convert_to_wav_streaming() 開始")
+    print(f"🔗 入力 blob_url: {blob_url}")
+
+    blob_client, output_url = output_blob_client(blob_url)
+    settings = get_upload_settings()
+    block_size = settings["block_size"]
+    uploader = BlockUploader(blob_client, settings["concurrency"], settings["validate_md5"])
+
+    command = [
+        FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *codec_args, "-f", "s16le", "pipe:1"
+    ]
+    print(f"⚙️ コマンド: {' '.join(command)}")
+    started = time.monotonic()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    download_errors = []
+    stderr_lines = deque(maxlen=FFMPEG_STDERR_LINES)
+    # 再生用の音声を作成する場合は、入力を一時ファイルにも書き出しておく（ディスクは入力のサイズ分使う）
+    temp_source = f"/tmp/{uuid.uuid4()}.input" if get_playback_settings()["enabled"] else None
+
+    threads = [
+        threading.Thread(target=feed_download, args=(blob_url, process.stdin, download_errors, timings, started, temp_source),
+                         daemon=True),
+        threading.Thread(target=drain_stderr, args=(process.stderr, stderr_lines), daemon=True),
+    ]
+    print("⬇️🎬📤 ダウンロード・変換・アップロードを開始")
+    for thread in threads:
+        thread.start()
+
+    # ブロック 0 は WAV ヘッダー用に空けておく
+    data_size = 0
+    block_count = 0
+    try:
+        try:
+            while True:
+                data = process.stdout.read(block_size)
+                if not data:
+                    break
+                # read は要求サイズ未満で返ることがあるため、ブロックサイズに達するまで読み足す
+                while len(data) < block_size:
+                    more = process.stdout.read(block_size - len(data))
+                    if not more:
+                        break
+                    data += more
+                block_count += 1
+                data_size += len(data)
+                uploader.stage(block_count, data)
+        except BaseException:
+            # 読み出しを止めると ffmpeg・ダウンロード側が書き込みで止まるため、先に終了させる
+            process.kill()
+            raise
+        finally:
+            returncode = process.wait()
+            timings["ffmpeg"] = elapsed(started)
+            for thread in threads:
+                thread.join()
 
-    blob_client = BlobClient.from_blob_url(blob_url, credential=credential)
+        if download_errors:
+            raise download_errors[0]
+        if returncode != 0 or data_size == 0:
+            stderr_text = "\n".join(stderr_lines)
+            print(f"⚠️ ffmpeg 標準エラー:\n{stderr_text}")
+            raise StreamingConversionError(f"ffmpeg 変換失敗: return code {returncode}, 出力 {data_size} バイト")
+        print(f"✅ ffmpeg 変換完了（{data_size} バイト、{block_count} ブロック）")
 
-    # ⬆️ アップロード実行
-    print("📤 WAV をアップロード中...")
-    with open(temp_output, "rb") as data:
-        blob_client.upload_blob(data, overwrite=True)
-    print("✅ アップロード完了")
+        # ヘッダーを先頭に並べて確定する（未確定のブロックは commit しなければ blob に反映されない）
+        uploader.stage(0, build_wav_header(data_size))
+        uploader.commit()
+        timings["upload"] = elapsed(started)
+        print("✅ アップロード完了")
 
-    return blob_url
+        # ダウンロード時に書き出した入力から作成する（ffmpeg が入力を最後まで読まずに終了した場合のみ URL から読み直す）
+        source = temp_source if "download" in timings else blob_url
+        create_playback_rendition(source, output_url, blob_client.credential, timings)
+        return output_url
+    except BaseException:
+        uploader.abort()
+        raise
+    finally:
+        timings.update(uploader.stats())
+        if temp_source and os.path.exists(temp_source):
+            os.remove(temp_source)
@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ジョブの状態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED)
+
+# フェーズ別の処理時間（秒）
+PHASES = ("probe", "download", "ffmpeg", "vad", "chunk", "upload", "playback")
+# アップロードの件数（送信したバイト数・ブロック数、前回の実行から再利用したブロック数）
+UPLOAD_COUNTS = ("upload_bytes", "upload_blocks", "resumed_blocks")
+
+DEFAULT_LIST_LIMIT = 50
+MAX_LIST_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversion_jobs (
+    job_id TEXT PRIMARY KEY,
+    source_url TEXT NOT NULL,          -- SAS 付きの入力 URL（再起動時の再実行用。API では返さない）
+    status TEXT NOT NULL,
+    queued_at REAL NOT NULL,           -- 以下の時刻は UNIX 時間（秒）
+    started_at REAL NULL,
+    finished_at REAL NULL,
+    mode TEXT NULL,                    -- copy / remux / transcode
+    probe_seconds REAL NULL,
+    download_seconds REAL NULL,
+    ffmpeg_seconds REAL NULL,
+    vad_seconds REAL NULL,
+    chunk_seconds REAL NULL,
+    upload_seconds REAL NULL,
+    playback_seconds REAL NULL,        -- 再生用の音声の作成（WAV のアップロード後）
+    upload_bytes INTEGER NULL,
+    upload_blocks INTEGER NULL,
+    resumed_blocks INTEGER NULL,
+    removed_seconds REAL NULL,         -- 無音の圧縮で削除した秒数
+    chunks INTEGER NULL,               -- 長時間録音を分割したチャンク数（分割しなかった場合は NULL）
+    output_url TEXT NULL,
+    error TEXT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_conversion_jobs_status ON conversion_jobs(status, queued_at);
+CREATE INDEX IF NOT EXISTS idx_conversion_jobs_queued_at ON conversion_jobs(queued_at);
+"""
+
+# 既存のファイルに後から追加した列
+ADDED_COLUMNS = {
+    "mode": "TEXT NULL",
+    "probe_seconds": "REAL NULL",
+    "upload_bytes": "INTEGER NULL",
+    "upload_blocks": "INTEGER NULL",
+    "resumed_blocks": "INTEGER NULL",
+    "vad_seconds": "REAL NULL",
+    "removed_seconds": "REAL NULL",
+    "chunk_seconds": "REAL NULL",
+    "chunks": "INTEGER NULL",
+    "playback_seconds": "REAL NULL",
+}
+
+
+def get_store_settings():
+    """
+    ジョブストアの設定
+
+    環境変数:
+        CONVERT_JOB_DB_PATH: ジョブを記録する SQLite のファイル（既定 $HOME/data/convert-jobs.db。App Service では再起動後も残る /home 配下）
+        CONVERT_JOB_RETENTION_DAYS: 完了・失敗したジョブを保持する日数（既定 30）
+    """
+    default_path = os.path.join(os.environ.get("HOME", "/tmp"), "data", "convert-jobs.db")
+    return {
+        "db_path": os.environ.get("CONVERT_JOB_DB_PATH", default_path),
+        "retention_days": float(os.environ.get("CONVERT_JOB_RETENTION_DAYS", "30")),
+    }
+
+
+def strip_query(url):
+    """SAS トークン（クエリ文字列）を除いた URL"""
+    return url.split("?", 1)[0] if url else url
+
+
+class JobStore:
+    """変換ジョブの状態・フェーズ別の処理時間を SQLite に記録する（ワーカースレッドから共有）"""
+
+    def __init__(self, db_path, retention_days=30):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(conversion_jobs)")}
+            for name, definition in ADDED_COLUMNS.items():
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE conversion_jobs ADD COLUMN {name} {definition}")
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def create(self, job_id, source_url):
+        self._execute(
+            "INSERT INTO conversion_jobs (job_id, source_url, status, queued_at) VALUES (?, ?, ?, ?)",
+            (job_id, source_url, JOB_QUEUED, time.time()),
+        )
+
+    def delete(self, job_id):
+        self._execute("DELETE FROM conversion_jobs WHERE job_id = ?", (job_id,))
+
+    def mark_running(self, job_id):
+        self._execute(
+            "UPDATE conversion_jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+            (JOB_RUNNING, time.time(), job_id),
+        )
+
+    def mark_finished(self, job_id, status, timings, output_url=None, error=None):
+        self._execute("""
+            UPDATE conversion_jobs
+            SET status = ?, finished_at = ?, mode = ?,
+                probe_seconds = ?, download_seconds = ?, ffmpeg_seconds = ?, vad_seconds = ?, chunk_seconds = ?,
+                upload_seconds = ?, playback_seconds = ?, upload_bytes = ?, upload_blocks = ?, resumed_blocks = ?, removed_seconds = ?,
+                chunks = ?, output_url = ?, error = ?
+            WHERE job_id = ?
+        """, (status, time.time(), timings.get("mode"), *(timings.get(phase) for phase in PHASES),
+              *(timings.get(key) for key in UPLOAD_COUNTS), timings.get("removed_seconds"),
+              timings.get("chunks"), output_url, error, job_id))
+
+    def unfinished(self):
+        """queued / running のジョブ（再起動時の再投入用、登録順）"""
+        rows = self._query(
+            "SELECT job_id, source_url, status, attempts FROM conversion_jobs WHERE status IN (?, ?) ORDER BY queued_at",
+            (JOB_QUEUED, JOB_RUNNING),
+        )
+        return [dict(row) for row in rows]
+
+    def requeue(self, job_id):
+        self._execute("UPDATE conversion_jobs SET status = ?, started_at = NULL WHERE job_id = ?", (JOB_QUEUED, job_id))
+
+    def prune(self):
+        """保持期間を過ぎた完了・失敗ジョブを削除する"""
+        cutoff = time.time() - self.retention_days * 86400
+        return self._execute(
+            "DELETE FROM conversion_jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (JOB_DONE, JOB_FAILED, cutoff),
+        )
+
+    def get_source(self, job_id):
+        """ワーカー用（SAS 付きの入力 URL を含む）"""
+        rows = self._query("SELECT job_id, source_url FROM conversion_jobs WHERE job_id = ?", (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def get(self, job_id):
+        rows = self._query("SELECT * FROM conversion_jobs WHERE job_id = ?", (job_id,))
+        return to_job_response(rows[0]) if rows else None
+
+    def list(self, status=None, limit=DEFAULT_LIST_LIMIT):
+        """新しい順のジョブ一覧"""
+        if status:
+            rows = self._query(
+                "SELECT * FROM conversion_jobs WHERE status = ? ORDER BY queued_at DESC LIMIT ?", (status, limit)
+            )
+        else:
+            rows = self._query("SELECT * FROM conversion_jobs ORDER BY queued_at DESC LIMIT ?", (limit,))
+        return [to_job_response(row) for row in rows]
+
+    def recent_durations(self, limit):
+        """直近に完了したジョブの処理時間（秒）"""
+        rows = self._query("""
+            SELECT finished_at - started_at AS duration FROM conversion_jobs
+            WHERE status IN (?, ?) AND started_at IS NOT NULL
+            ORDER BY finished_at DESC LIMIT ?
+        """, (JOB_DONE, JOB_FAILED, limit))
+        return [row["duration"] for row in rows]
+
+
+def to_job_response(row):
+    """API で返す形式（入力 URL は SAS を除く）"""
+    job = dict(row)
+    source_url = job.pop("source_url")
+    job["source"] = strip_query(source_url)
+    job["timings"] = {phase: job.pop(f"{phase}_seconds") for phase in PHASES}
+    job["upload"] = {key.replace("upload_", ""): job.pop(key) for key in UPLOAD_COUNTS}
+    # 送信したバイト数 / アップロードの秒数（ストリーミング変換では変換開始からの経過秒数で割る）
+    upload_seconds = job["timings"]["upload"]
+    if job["upload"]["bytes"] is not None and upload_seconds:
+        job["upload"]["mb_per_second"] = round(job["upload"]["bytes"] / upload_seconds / 1024 / 1024, 2)
+    if job["started_at"] is not None:
+        job["wait_seconds"] = round(job["started_at"] - job["queued_at"], 3)
+    if job["finished_at"] is not None and job["started_at"] is not None:
+        job["total_seconds"] = round(job["finished_at"] - job["started_at"], 3)
+    return job
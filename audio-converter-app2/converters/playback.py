@@ -0,0 +1,36 @@
+import os
+
+DEFAULT_PLAYBACK_CONTAINER = "meeting-audio-playback"
+DEFAULT_PLAYBACK_BITRATE = "48k"
+PLAYBACK_EXTENSION = ".m4a"
+PLAYBACK_CONTENT_TYPE = "audio/mp4"
+
+
+def get_playback_settings():
+    """
+    再生用の音声（AAC / MP4）の設定
+
+    環境変数:
+        CONVERT_PLAYBACK: "true" で文字起こし用の WAV とは別に再生用の音声を作成する（既定は無効）
+        CONVERT_PLAYBACK_CONTAINER: 再生用の音声を配置するコンテナ（既定 meeting-audio-playback。文字起こしを起動しないコンテナ）
+        CONVERT_PLAYBACK_BITRATE: AAC のビットレート（既定 48k）
+    """
+    return {
+        "enabled": os.environ.get("CONVERT_PLAYBACK", "false").lower() == "true",
+        "container": os.environ.get("CONVERT_PLAYBACK_CONTAINER", DEFAULT_PLAYBACK_CONTAINER),
+        "bitrate": os.environ.get("CONVERT_PLAYBACK_BITRATE", DEFAULT_PLAYBACK_BITRATE),
+    }
+
+
+def playback_args(bitrate):
+    """
+    ffmpeg の出力オプション（モノラル AAC / MP4）
+
+    +faststart で moov（シークに使う索引）を先頭に置き、ブラウザが先頭の Range 要求だけで再生・シークできるようにする。
+    """
+    return ["-vn", "-map", "0:a:0", "-ac", "1", "-c:a", "aac", "-b:a", bitrate, "-movflags", "+faststart"]
+
+
+def playback_blob_name(wav_blob_name):
+    """rec.wav → rec.m4a"""
+    return wav_blob_name.rsplit(".", 1)[0] + PLAYBACK_EXTENSION
@@ -0,0 +1,158 @@
+import re
+import struct
+import subprocess
+from typing import NamedTuple, Optional
+
+import requests
+
+# 変換方法
+MODE_COPY = "copy"            # 既に 16kHz / モノラル / 16bit PCM の WAV → Blob のサーバー側コピー
+MODE_REMUX = "remux"          # コーデックは同じでコンテナ（ヘッダー）のみ異なる → 再エンコードせずに詰め替え
+MODE_TRANSCODE = "transcode"  # デコード → リサンプリング → エンコード（従来の変換）
+MODES = (MODE_COPY, MODE_REMUX, MODE_TRANSCODE)
+
+# Speech 向けの出力形式
+TARGET_CODEC = "pcm_s16le"
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+TARGET_BITS_PER_SAMPLE = 16
+
+# ffmpeg の出力オプション（remux は再エンコードせずに最初の音声ストリームを詰め替える）
+TRANSCODE_ARGS = ["-ar", str(TARGET_SAMPLE_RATE), "-ac", str(TARGET_CHANNELS), "-c:a", TARGET_CODEC]
+REMUX_ARGS = ["-map", "0:a:0", "-c:a", "copy"]
+
+PROBE_BYTES = 256 * 1024      # 判定に使う先頭のバイト数（コンテナのヘッダーが収まる大きさ）
+PROBE_TIMEOUT_SECONDS = 30
+MAX_TRAILING_BYTES = 64 * 1024  # data チャンクの後ろに許容する他のチャンク（LIST など）の大きさ
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# ffmpeg -i の標準エラーのストリーム情報（例: "Stream #0:0: Audio: pcm_s16le, 16000 Hz, mono, s16, 256 kb/s"）
+AUDIO_STREAM_PATTERN = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+)[^,]*, (\d+) Hz, ([^,]+)")
+
+
+class ProbeResult(NamedTuple):
+    """入力の判定結果"""
+    mode: str
+    container: Optional[str]
+    codec: Optional[str]
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    reason: str
+
+
+class WavHeader(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+
+def parse_wav_header(head: bytes) -> Optional[WavHeader]:
+    """
+    RIFF / WAVE の fmt・data チャンクを読む（WAV でない、または先頭に data チャンクがない場合は None）
+
+    LIST などの他のチャンクは読み飛ばす。
+    """
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(head):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", head, offset)
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(head):
+            fmt = struct.unpack_from("<HHIIHH", head, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, _, _, bits_per_sample = fmt
+            return WavHeader(format_tag, channels, sample_rate, bits_per_sample, body, chunk_size)
+        # チャンクは2バイト境界に揃える
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def decide_wav(header: WavHeader, total_size: Optional[int]) -> ProbeResult:
+    """WAV ヘッダーから変換方法を決める"""
+    if (header.channels, header.sample_rate, header.bits_per_sample) != (
+            TARGET_CHANNELS, TARGET_SAMPLE_RATE, TARGET_BITS_PER_SAMPLE):
+        return ProbeResult(MODE_TRANSCODE, "wav", None, header.sample_rate, header.channels,
+                           f"{header.sample_rate} Hz / {header.channels} ch / {header.bits_per_sample} bit")
+
+    def matched(mode, reason):
+        return ProbeResult(mode, "wav", TARGET_CODEC, header.sample_rate, header.channels, reason)
+
+    if header.format_tag == WAVE_FORMAT_EXTENSIBLE:
+        # 中身は同じ PCM でも WAVE_FORMAT_EXTENSIBLE を読めないツールがあるため標準の fmt に書き換える
+        return matched(MODE_REMUX, "WAVE_FORMAT_EXTENSIBLE")
+    if header.format_tag != WAVE_FORMAT_PCM:
+        return ProbeResult(MODE_TRANSCODE, "wav", None, header.sample_rate, header.channels,
+                           f"format_tag=0x{header.format_tag:04x}")
+    data_end = header.data_offset + header.data_size
+    if (total_size is None or header.data_size == 0 or data_end > total_size
+            or total_size - data_end > MAX_TRAILING_BYTES):
+        # 録音中に書かれたヘッダー（サイズ 0 / 0xFFFFFFFF）などはサイズを書き直す
+        return matched(MODE_REMUX, f"data チャンクのサイズがファイルサイズと一致しません (data={header.data_size}, file={total_size})")
+    return matched(MODE_COPY, "16kHz / モノラル / 16bit PCM の WAV")
+
+
+def parse_audio_stream(ffmpeg_stderr: str):
+    """ffmpeg -i の出力から最初の音声ストリームの (コーデック, サンプリングレート, チャンネル) を取り出す"""
+    match = AUDIO_STREAM_PATTERN.search(ffmpeg_stderr)
+    if not match:
+        return None
+    codec, sample_rate, layout = match.groups()
+    layout = layout.strip()
+    channels = 1 if layout == "mono" else 2 if layout == "stereo" else None
+    if channels is None:
+        channel_match = re.match(r"(\d+) channels", layout)
+        channels = int(channel_match.group(1)) if channel_match else None
+    return codec, int(sample_rate), channels
+
+
+def decide_stream(container: str, stream) -> ProbeResult:
+    """WAV 以外のコンテナの音声ストリームから変換方法を決める"""
+    if stream is None:
+        return ProbeResult(MODE_TRANSCODE, container, None, None, None, "音声ストリームを判定できません")
+    codec, sample_rate, channels = stream
+    if codec == TARGET_CODEC and sample_rate == TARGET_SAMPLE_RATE and channels == TARGET_CHANNELS:
+        return ProbeResult(MODE_REMUX, container, codec, sample_rate, channels, "コンテナのみ変更")
+    return ProbeResult(MODE_TRANSCODE, container, codec, sample_rate, channels,
+                       f"{codec} / {sample_rate} Hz / {channels} ch")
+
+
+def probe_head(ffmpeg_path: str, head: bytes, total_size: Optional[int]) -> ProbeResult:
+    """先頭のバイト列から変換方法を決める（WAV はヘッダーを直接読み、それ以外は ffmpeg に読ませる）"""
+    header = parse_wav_header(head)
+    if header is not None:
+        return decide_wav(header, total_size)
+
+    # 出力を指定しないため ffmpeg は終了コード 1 で終わるが、ストリーム情報は標準エラーに出る
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-i", "pipe:0"],
+        input=head, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=PROBE_TIMEOUT_SECONDS,
+    )
+    stderr = result.stderr.decode("utf-8", errors="replace")
+    container = re.search(r"Input #0, ([^,]+)", stderr)
+    return decide_stream(container.group(1) if container else None, parse_audio_stream(stderr))
+
+
+def fetch_head(blob_url: str):
+    """Range 指定で先頭 PROBE_BYTES を取得する（戻り値: 先頭のバイト列, ファイルサイズ）"""
+    r = requests.get(blob_url, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"}, timeout=PROBE_TIMEOUT_SECONDS)
+    if r.status_code == 200:
+        return r.content, len(r.content)
+    if r.status_code != 206:
+        raise Exception(f"❌ 先頭の取得失敗: {r.status_code}")
+    # Content-Range: bytes 0-262143/123456789
+    total = r.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+    return r.content, int(total) if total.isdigit() else None
+
+
+def probe_input(ffmpeg_path: str, blob_url: str) -> ProbeResult:
+    head, total_size = fetch_head(blob_url)
+    return probe_head(ffmpeg_path, head, total_size)
@@ -0,0 +1,185 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from converters.probe import TARGET_SAMPLE_RATE, parse_wav_header
+
+FRAME_SECONDS = 0.03             # 判定の単位（30ms）
+CHUNK_FRAMES = 2000              # 特徴量を計算する単位（約60秒分ずつ読み、メモリ使用量を音声の長さに依存させない）
+NOISE_FLOOR_PERCENTILE = 10      # 無音のレベルとみなすフレームエネルギーのパーセンタイル
+MIN_SPEECH_DB = -55.0            # これ以下のフレームは常に無音（dBFS）
+MAX_SILENCE_DB = -35.0           # これを超えるフレームは常に音声（無音のない録音・保留音を削らない）
+UNVOICED_ZCR = 0.25              # 無声子音（サ行など）とみなすゼロ交差率
+HANGOVER_SECONDS = 0.3           # 音声の前後に残す余白（語頭・語尾の切り落とし防止）
+WRITE_CHUNK_SAMPLES = 1024 * 1024
+
+OFFSET_REMAP_VERSION = 1
+OFFSET_REMAP_SUFFIX = ".offsets.json"
+
+
+def get_vad_settings():
+    """
+    無音区間の圧縮の設定
+
+    環境変数:
+        CONVERT_VAD: "true" で有効化（既定は無効）
+        CONVERT_VAD_MIN_SILENCE_SECONDS: これ以上続く無音を圧縮する（既定 2.0 秒）
+        CONVERT_VAD_KEEP_SILENCE_SECONDS: 圧縮後に残す無音の長さ（既定 0.5 秒、前後に半分ずつ）
+        CONVERT_VAD_THRESHOLD_DB: 無音のレベル（エネルギーの下位 10%）からこの値以上大きいフレームを音声とみなす（既定 10dB）
+    """
+    return {
+        "enabled": os.environ.get("CONVERT_VAD", "false").lower() == "true",
+        "min_silence": float(os.environ.get("CONVERT_VAD_MIN_SILENCE_SECONDS", "2.0")),
+        "keep_silence": float(os.environ.get("CONVERT_VAD_KEEP_SILENCE_SECONDS", "0.5")),
+        "threshold_db": float(os.environ.get("CONVERT_VAD_THRESHOLD_DB", "10")),
+    }
+
+
+def frame_features(samples, frame_size):
+    """フレームごとのエネルギー（dBFS）とゼロ交差率"""
+    frame_count = len(samples) // frame_size
+    energy = np.empty(frame_count, dtype=np.float32)
+    zcr = np.empty(frame_count, dtype=np.float32)
+    for start in range(0, frame_count, CHUNK_FRAMES):
+        end = min(frame_count, start + CHUNK_FRAMES)
+        frames = np.asarray(samples[start * frame_size:end * frame_size], dtype=np.float32).reshape(-1, frame_size)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energy[start:end] = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+        signs = np.signbit(frames)
+        zcr[start:end] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy, zcr
+
+
+def detect_speech(energy, zcr, threshold_db, hangover_frames):
+    """
+    音声フレームの判定（True = 音声）
+
+    無音のレベルはエネルギーの下位パーセンタイルから推定し、それより threshold_db 以上大きいフレームを音声とする
+    （閾値は MIN_SPEECH_DB 〜 MAX_SILENCE_DB の範囲に収める）。
+    エネルギーが小さくゼロ交差率が高い無声子音も音声として扱い、前後に hangover_frames の余白を付ける。
+    """
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    floor = float(np.percentile(energy, NOISE_FLOOR_PERCENTILE))
+    threshold = min(max(floor + threshold_db, MIN_SPEECH_DB), MAX_SILENCE_DB)
+    speech = energy > threshold
+    unvoiced_threshold = min(max(floor + threshold_db / 2, MIN_SPEECH_DB), MAX_SILENCE_DB)
+    speech |= (energy > unvoiced_threshold) & (zcr > UNVOICED_ZCR)
+    if hangover_frames > 0:
+        window = np.ones(2 * hangover_frames + 1, dtype=np.int32)
+        speech = np.convolve(speech.astype(np.int32), window, mode="same") > 0
+    return speech
+
+
+def plan_kept_spans(speech, min_silence_frames, keep_silence_frames):
+    """
+    残すフレームの区間 [(開始, 終了), ...]
+
+    min_silence_frames 以上続く無音は、前後に keep_silence_frames の半分ずつを残して中間を削除する。
+    """
+    frame_count = len(speech)
+    spans = []
+    span_start = 0
+    head = keep_silence_frames // 2
+    tail = keep_silence_frames - head
+    # 無音の連続区間（np.diff で音声 ↔ 無音の切り替わりを検出）
+    padded = np.concatenate(([True], speech, [True])).astype(np.int8)
+    changes = np.flatnonzero(np.diff(padded)).tolist()
+    for silence_start, silence_end in zip(changes[0::2], changes[1::2]):
+        if silence_end - silence_start < min_silence_frames:
+            continue
+        cut_start = silence_start + head
+        cut_end = silence_end - tail
+        if cut_start > span_start:
+            spans.append((span_start, cut_start))
+        span_start = cut_end
+    if span_start < frame_count:
+        spans.append((span_start, frame_count))
+    return spans
+
+
+def build_offset_remap(spans, sample_rate, original_samples):
+    """
+    削除後の位置 → 元の位置の対応表
+
+    segments の各要素は削除後の音声で連続する区間（trimmed_start から duration 秒が、元の音声の original_start から）。
+    """
+    segments = []
+    trimmed = 0
+    for start, end in spans:
+        segments.append({
+            "trimmed_start": round(trimmed / sample_rate, 3),
+            "original_start": round(start / sample_rate, 3),
+            "duration": round((end - start) / sample_rate, 3),
+        })
+        trimmed += end - start
+    return {
+        "version": OFFSET_REMAP_VERSION,
+        "original_duration_seconds": round(original_samples / sample_rate, 3),
+        "trimmed_duration_seconds": round(trimmed / sample_rate, 3),
+        "segments": segments,
+    }
+
+
+def encode_offset_remap(remap) -> bytes:
+    return json.dumps(remap, ensure_ascii=False).encode("utf-8")
+
+
+def offset_remap_name(wav_blob_name):
+    """WAV と同じコンテナに置く対応表の blob 名（rec.wav → rec.offsets.json）"""
+    return wav_blob_name.rsplit(".", 1)[0] + OFFSET_REMAP_SUFFIX
+
+
+def write_wav(path, samples, spans_in_samples, sample_rate):
+    """残す区間をつなげた 16bit モノラル WAV を書き出す"""
+    data_size = 2 * sum(end - start for start, end in spans_in_samples)
+    block_align = 2
+    with open(path, "wb") as f:
+        f.write(struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + data_size, b"WAVE",
+            b"fmt ", 16, 1, 1, sample_rate, sample_rate * block_align, block_align, 16,
+            b"data", data_size,
+        ))
+        for start, end in spans_in_samples:
+            for chunk_start in range(start, end, WRITE_CHUNK_SAMPLES):
+                f.write(np.asarray(samples[chunk_start:min(end, chunk_start + WRITE_CHUNK_SAMPLES)]).tobytes())
+
+
+def open_pcm_samples(path):
+    """16kHz / モノラル / 16bit の WAV のサンプル列（memmap）とサンプリングレート"""
+    with open(path, "rb") as f:
+        header = parse_wav_header(f.read(64 * 1024))
+    if header is None or header.channels != 1 or header.bits_per_sample != 16:
+        raise ValueError("16bit モノラルの WAV のみ対応しています")
+    sample_rate = header.sample_rate or TARGET_SAMPLE_RATE
+    sample_count = min(header.data_size, os.path.getsize(path) - header.data_offset) // 2
+    samples = np.memmap(path, dtype="<i2", mode="r", offset=header.data_offset, shape=(sample_count,))
+    return samples, sample_rate
+
+
+def trim_silence(input_path, output_path, min_silence, keep_silence, threshold_db):
+    """
+    16kHz / モノラル / 16bit の WAV から長い無音を圧縮して output_path に書き出す
+
+    Returns:
+        dict | None: 対応表（build_offset_remap の形式）。圧縮する無音がない場合は None（output_path は作らない）
+    """
+    samples, sample_rate = open_pcm_samples(input_path)
+    sample_count = len(samples)
+
+    frame_size = int(sample_rate * FRAME_SECONDS)
+    energy, zcr = frame_features(samples, frame_size)
+    speech = detect_speech(energy, zcr, threshold_db, int(HANGOVER_SECONDS / FRAME_SECONDS))
+    spans = plan_kept_spans(speech, int(min_silence / FRAME_SECONDS), int(keep_silence / FRAME_SECONDS))
+    if spans == [(0, len(speech))]:
+        return None
+
+    # フレーム単位の区間をサンプル単位に変換する（最後のフレームに満たない末尾は最後の区間に含める）
+    spans_in_samples = [(start * frame_size, end * frame_size) for start, end in spans]
+    if spans and spans[-1][1] == len(speech):
+        spans_in_samples[-1] = (spans_in_samples[-1][0], sample_count)
+    write_wav(output_path, samples, spans_in_samples, sample_rate)
+    return build_offset_remap(spans_in_samples, sample_rate, sample_count)
@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+import uuid
+
+from converters.job_store import JOB_DONE, JOB_FAILED
+
+DEFAULT_RETRY_AFTER_SECONDS = 30
+MAX_RETRY_AFTER_SECONDS = 600
+DURATION_SAMPLES = 20            # Retry-After の見積もりに使う直近の処理時間の件数
+MAX_ATTEMPTS = 3                 # 再起動時に再投入する実行回数の上限
+
+
+class QueueFullError(Exception):
+    """キューが満杯（retry_after 秒後の再送を促す）"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"queue is full (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class PoolClosedError(Exception):
+    """シャットダウン中のため受け付けない"""
+
+
+def get_pool_settings():
+    """
+    変換ワーカープールの設定
+
+    環境変数:
+        CONVERT_WORKERS: 同時に実行する変換の数（既定は CPU コア数）
+        CONVERT_QUEUE_SIZE: 実行待ちにできるジョブ数（既定はワーカー数 × 4）。超えた場合は 429 を返す
+        CONVERT_DRAIN_TIMEOUT_SECONDS: シャットダウン時に実行中・実行待ちのジョブの完了を待つ秒数（既定 300）
+    """
+    workers = max(1, int(os.environ.get("CONVERT_WORKERS", str(os.cpu_count() or 1))))
+    return {
+        "workers": workers,
+        "queue_size": max(1, int(os.environ.get("CONVERT_QUEUE_SIZE", str(workers * 4)))),
+        "drain_timeout": float(os.environ.get("CONVERT_DRAIN_TIMEOUT_SECONDS", "300")),
+    }
+
+
+class ConversionWorkerPool:
+    """
+    固定数のワーカースレッドで変換ジョブを実行する
+
+    実行待ちのジョブ数に上限を設け、満杯の場合は QueueFullError（Retry-After の秒数付き）を送出する。
+    ジョブの状態（queued / running / done / failed）とフェーズ別の処理時間は JobStore に記録する。
+    handler(blob_url, timings) は出力 URL を返し、timings（dict）にフェーズ別の秒数を書き込む。
+    """
+
+    def __init__(self, handler, store, workers, queue_size, drain_timeout):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._durations = []
+        self._threads = []
+
+    def start(self):
+        self._durations = self.store.recent_durations(DURATION_SAMPLES)
+        pruned = self.store.prune()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"convert-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 変換ワーカー起動: workers={self.workers}, queue_size={self._queue.maxsize}, 期限切れ削除 {pruned} 件")
+
+        # 前回の停止時に未完了だったジョブを再投入する（キューが空くのを待つため別スレッド）
+        unfinished = self.store.unfinished()
+        if unfinished:
+            threading.Thread(target=self._resume, args=(unfinished,), name="convert-resume", daemon=True).start()
+
+    def _resume(self, jobs):
+        resumed = 0
+        for job in jobs:
+            if self.closed:
+                break
+            if job["attempts"] >= MAX_ATTEMPTS:
+                # 実行中にプロセスが落ち続けるジョブは再投入しない
+                self.store.mark_finished(job["job_id"], JOB_FAILED, {}, error=f"再起動後の再試行が上限（{MAX_ATTEMPTS} 回）に達しました")
+                continue
+            self.store.requeue(job["job_id"])
+            self._queue.put(job["job_id"])
+            resumed += 1
+        print(f"🔁 未完了のジョブを再投入: {resumed}/{len(jobs)} 件")
+
+    def submit(self, blob_url):
+        """ジョブを登録して job_id を返す"""
+        if self.closed:
+            raise PoolClosedError("shutting down")
+
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, blob_url)
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            self.store.delete(job_id)
+            raise QueueFullError(self.retry_after())
+        return job_id
+
+    def retry_after(self):
+        """キューが空くまでの秒数の見積もり（直近の平均処理時間 × 実行待ち / ワーカー数）"""
+        with self._lock:
+            durations = list(self._durations)
+        if not durations:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        average = sum(durations) / len(durations)
+        estimate = average * max(1, self._queue.qsize()) / self.workers
+        return int(min(MAX_RETRY_AFTER_SECONDS, max(1, estimate)))
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                if job_id is None:
+                    return
+                self._execute(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job_id):
+        job = self.store.get_source(job_id)
+        if job is None:
+            return
+        self.store.mark_running(job_id)
+        started = time.time()
+        timings = {}
+        print(f"🚀 [worker] 変換開始 job_id={job_id}")
+        try:
+            output_url = self.handler(job["source_url"], timings)
+            self.store.mark_finished(job_id, JOB_DONE, timings, output_url=output_url)
+            print(f"✅ [worker] 変換完了 job_id={job_id}: {output_url}")
+        except Exception as e:
+            self.store.mark_finished(job_id, JOB_FAILED, timings, error=str(e))
+            print(f"❌ [worker] エラー発生 job_id={job_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._durations.append(time.time() - started)
+                del self._durations[:-DURATION_SAMPLES]
+
+    def shutdown(self):
+        """
+        新規受付を止め、実行中・実行待ちのジョブの完了を drain_timeout 秒まで待つ
+
+        時間内に終わらなかったジョブは次回起動時に再投入する。
+        """
+        if self.closed:
+            return
+        self.closed = True
+        print(f"🛑 変換ワーカー停止: 実行待ち {self._queue.qsize()} 件の完了を最大 {self.drain_timeout} 秒待機")
+
+        deadline = time.time() + self.drain_timeout
+        for _ in self._threads:
+            # 実行待ちのジョブの後ろに終了の合図を積む（キューが満杯の場合は空くまで待つ）
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.time()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.time()))
+
+        # 未完了のジョブはストアに queued / running のまま残り、次回起動時に再投入される
+        unfinished = self.store.unfinished()
+        for job in unfinished:
+            print(f"⚠️ 未完了のジョブ job_id={job['job_id']}, status={job['status']}")
+        print(f"🛑 変換ワーカー停止完了（未完了 {len(unfinished)} 件は次回起動時に再投入）")
@@ -1,4 +1,5 @@
 #!/bin/bash
 cd /home/site/wwwroot
 pip install -r requirements.txt
-exec gunicorn app:app --bind=0.0.0.0:8000 --capture-output --log-level debug --access-logfile - --error-logfile -
\ No newline at end of file
+# 変換ワーカープールは1プロセス内で動くため gunicorn のワーカーは1つにする。停止時はジョブの完了を待つ
+exec gunicorn app:app --bind=0.0.0.0:8000 --workers 1 --graceful-timeout "${CONVERT_DRAIN_TIMEOUT_SECONDS:-300}" --capture-output --log-level debug --access-logfile - --error-logfile -
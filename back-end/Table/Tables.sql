@@ -22,7 +22,8 @@ CREATE TABLE Users (
     password_reset_expires DATETIME NULL,
     login_attempt_count INT DEFAULT 0,
     is_manager BIT NULL,
-    manager_id INT NULL
+    manager_id INT NULL,
+    activation_token VARCHAR(100) NULL          -- メール認証用ワンタイムトークン（認証後は NULL）
 )
 
 -- 基本情報テーブル
@@ -239,5 +240,128 @@ CREATE INDEX idx_comment_reads_datetime ON CommentReads(read_datetime) -- 既読
         [additional_info] [nvarchar](MAX) NULL
     );
 
+-- 音声文字起こしパイプライン中間テーブル（Queue Trigger 各ステージの出力）
+CREATE TABLE dbo.TranscriptProcessingSegments (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    meeting_id INT NOT NULL,
+    line_no INT NOT NULL,
+    speaker INT NOT NULL,
+    transcript_text_segment NVARCHAR(MAX) NOT NULL,
+    offset_seconds FLOAT NULL,
+    is_filler BIT NOT NULL DEFAULT 0,
+    front_score FLOAT NULL,
+    after_score FLOAT NULL,
+    merged_text_with_prev NVARCHAR(MAX) NULL,  -- フィラー判定前：前文との結合
+    merged_text_with_next NVARCHAR(MAX) NULL,  -- フィラー判定後：次文との結合
+    delete_candidate_word NVARCHAR(MAX) NULL,
+    inserted_datetime DATETIME DEFAULT GETDATE(),
+    updated_datetime DATETIME DEFAULT GETDATE()
+);
 
+CREATE TABLE dbo.ProcessedTranscriptSegments (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    meeting_id INT NOT NULL,
+    line_no INT NOT NULL,
+    speaker INT NOT NULL,
+    merged_text NVARCHAR(MAX) NOT NULL,
+    cleaned_text NVARCHAR(MAX) NULL,           -- NULL = 文章整形未完了（リトライ時の再開位置）
+    offset_seconds FLOAT NULL,
+    inserted_datetime DATETIME DEFAULT GETDATE(),
+    updated_datetime DATETIME DEFAULT GETDATE()
+);
 
+CREATE TABLE dbo.ConversationSummaries (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    meeting_id INT NOT NULL,
+    speaker INT NOT NULL,
+    content NVARCHAR(MAX) NOT NULL,
+    offset_seconds FLOAT NULL,
+    is_summary BIT NOT NULL DEFAULT 0,
+    inserted_datetime DATETIME DEFAULT GETDATE(),
+    updated_datetime DATETIME DEFAULT GETDATE()
+);
+
+-- 再配信・リトライ時の重複登録防止（ステージ書き込みの冪等性）
+CREATE UNIQUE INDEX ux_transcript_processing_segments_line ON dbo.TranscriptProcessingSegments(meeting_id, line_no);
+CREATE UNIQUE INDEX ux_processed_transcript_segments_line ON dbo.ProcessedTranscriptSegments(meeting_id, line_no);
+CREATE INDEX idx_conversation_summaries_meeting ON dbo.ConversationSummaries(meeting_id, offset_seconds);
+
+-- ステージ遷移ごとの計測値（キュー待ち時間・処理時間・DB往復回数・LLM呼び出し回数）
+CREATE TABLE dbo.PipelineStageMetrics (
+    id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    meeting_id INT NOT NULL,
+    stage NVARCHAR(50) NOT NULL,                -- preprocessing / merging / summary / export
+    lane NVARCHAR(10) NOT NULL DEFAULT 'normal', -- high / normal / bulk
+    status NVARCHAR(20) NOT NULL,               -- completed / failed
+    via_fast_path BIT NOT NULL DEFAULT 0,
+    dequeue_count INT NULL,
+    enqueued_datetime DATETIME2 NULL,           -- 以下の日時はすべて UTC
+    dequeued_datetime DATETIME2 NULL,
+    started_datetime DATETIME2 NOT NULL,
+    ended_datetime DATETIME2 NOT NULL,
+    item_count INT NULL,
+    db_round_trips INT NULL,
+    llm_calls INT NULL,
+    error_message NVARCHAR(1000) NULL,
+    inserted_datetime DATETIME DEFAULT GETDATE()
+);
+CREATE INDEX idx_pipeline_stage_metrics_stage ON dbo.PipelineStageMetrics(stage, started_datetime);
+CREATE INDEX idx_pipeline_stage_metrics_meeting ON dbo.PipelineStageMetrics(meeting_id);
+
+-- 長い会議のステージ処理をシャードに分割して並列実行するための管理テーブル
+CREATE TABLE dbo.PipelineShards (
+    meeting_id INT NOT NULL,
+    stage NVARCHAR(50) NOT NULL,                -- preprocessing / merging
+    shard_no INT NOT NULL,
+    start_line INT NOT NULL,                    -- 担当範囲（両端を含む）
+    end_line INT NOT NULL,
+    context_start_line INT NOT NULL,            -- 前後の文脈として参照する範囲
+    context_end_line INT NOT NULL,
+    status NVARCHAR(20) NOT NULL DEFAULT 'pending', -- pending / completed
+    inserted_datetime DATETIME DEFAULT GETDATE(),
+    updated_datetime DATETIME DEFAULT GETDATE(),
+
+    CONSTRAINT PK_PipelineShards PRIMARY KEY (meeting_id, stage, shard_no)
+);
+
+-- パイプラインの状態（会議ごとに1行）。各ステージは version の compare-and-set で遷移し、処理中はリースを持つ
+CREATE TABLE dbo.PipelineStates (
+    meeting_id INT NOT NULL PRIMARY KEY,
+    state NVARCHAR(50) NOT NULL,                -- transcribed / {stage}_in_progress / {stage}_completed / {stage}_failed / AllStepCompleted など
+    version INT NOT NULL DEFAULT 0,             -- 遷移ごとに +1
+    lease_owner NVARCHAR(100) NULL,             -- 最後に claim したワーカー（ホスト名:PID:乱数）
+    lease_expires_datetime DATETIME2 NULL,      -- 以下の日時はすべて UTC。処理中のみ設定
+    state_entered_datetime DATETIME2 NOT NULL,  -- 現在の状態に入った日時
+    updated_datetime DATETIME DEFAULT GETDATE()
+);
+-- 「状態 X に N 分以上滞留」の検索用
+CREATE INDEX idx_pipeline_states_state ON dbo.PipelineStates(state, state_entered_datetime);
+
+-- 状態遷移の履歴（1遷移 = 1行）
+CREATE TABLE dbo.PipelineStateTransitions (
+    id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    meeting_id INT NOT NULL,
+    from_state NVARCHAR(50) NULL,               -- 初回登録時は NULL
+    to_state NVARCHAR(50) NOT NULL,
+    lease_owner NVARCHAR(100) NULL,
+    transitioned_datetime DATETIME2 NOT NULL,   -- UTC
+    from_state_seconds FLOAT NULL,              -- from_state に滞在した秒数
+    note NVARCHAR(1000) NULL,                   -- claim の理由（ready / retry / lease_expired）・エラー内容など
+    inserted_datetime DATETIME DEFAULT GETDATE()
+);
+-- 状態別スループット（期間内の遷移数・滞在時間）の集計用
+CREATE INDEX idx_pipeline_state_transitions_time ON dbo.PipelineStateTransitions(transitioned_datetime, to_state) INCLUDE (from_state, from_state_seconds);
+CREATE INDEX idx_pipeline_state_transitions_meeting ON dbo.PipelineStateTransitions(meeting_id, transitioned_datetime);
+
+-- 長時間録音を分割したチャンクごとの文字起こしジョブ（分割しない録音は Meetings.file_path のジョブ ID のみ）
+CREATE TABLE dbo.TranscriptionJobs (
+    meeting_id INT NOT NULL,
+    chunk_index INT NOT NULL,                   -- チャンクマニフェストの index
+    job_id NVARCHAR(100) NOT NULL,              -- Speech-to-Text のジョブ ID
+    chunk_container NVARCHAR(100) NOT NULL,
+    chunk_blob NVARCHAR(1000) NOT NULL,
+    start_seconds FLOAT NOT NULL,               -- 元の WAV 上の開始位置
+    inserted_datetime DATETIME DEFAULT GETDATE(),
+
+    CONSTRAINT PK_TranscriptionJobs PRIMARY KEY (meeting_id, chunk_index)
+);
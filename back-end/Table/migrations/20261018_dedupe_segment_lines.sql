@@ -0,0 +1,35 @@
+-- 20261018: (meeting_id, line_no) のユニークインデックス追加（既存データベース向け）
+--
+-- Tables.sql の ux_transcript_processing_segments_line / ux_processed_transcript_segments_line は
+-- 新規作成時のみ適用される。既存のデータベースにはリトライ時の統合で登録された重複行があり、
+-- そのままではインデックスを作成できないため、重複を削除（(meeting_id, line_no) ごとに MIN(id) を残す）してから作成する。
+-- 関数アプリ（user-028 以降）のデプロイ前に1回実行する。再実行しても問題ない。
+
+SET XACT_ABORT ON;
+BEGIN TRANSACTION;
+
+DELETE s
+FROM dbo.TranscriptProcessingSegments s
+WHERE s.id NOT IN (
+    SELECT MIN(id) FROM dbo.TranscriptProcessingSegments GROUP BY meeting_id, line_no
+);
+
+DELETE s
+FROM dbo.ProcessedTranscriptSegments s
+WHERE s.id NOT IN (
+    SELECT MIN(id) FROM dbo.ProcessedTranscriptSegments GROUP BY meeting_id, line_no
+);
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ux_transcript_processing_segments_line' AND object_id = OBJECT_ID('dbo.TranscriptProcessingSegments')
+)
+    CREATE UNIQUE INDEX ux_transcript_processing_segments_line ON dbo.TranscriptProcessingSegments(meeting_id, line_no);
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ux_processed_transcript_segments_line' AND object_id = OBJECT_ID('dbo.ProcessedTranscriptSegments')
+)
+    CREATE UNIQUE INDEX ux_processed_transcript_segments_line ON dbo.ProcessedTranscriptSegments(meeting_id, line_no);
+
+COMMIT TRANSACTION;
@@ -0,0 +1,219 @@
+"""
+DB バックエンドの切り替え（SQL Server / SQLite）
+
+SpeechToTextPipeline/pipeline_processing/db_backend.py と同じ内容（Function App ごとにデプロイするため複製している）。
+
+本番は pyodbc + Azure SQL（SQL はそのまま実行）。DB_BACKEND=sqlite の場合は標準ライブラリの sqlite3 に接続し、
+back-end/Table/Tables.sql のスキーマを適用したうえで、実行する T-SQL を SQLite 向けに書き換える。
+ベンチマーク・回帰確認を Azure SQL なしで1台のマシン上で行うためのもの。
+
+書き換えるのはこのリポジトリで使っている構文のみ:
+    GETDATE() / GETUTCDATE() / SYSUTCDATETIME()、SELECT TOP n、ISNULL、テーブルヒント WITH (UPDLOCK, ...)、
+    OUTPUT INSERTED.col（→ RETURNING）、CAST(... AS NVARCHAR(n))、dbo. / [dbo]. の接頭辞
+
+環境変数:
+    DB_BACKEND: "sqlserver"（既定）/ "sqlite"
+    SQLITE_DB_PATH: SQLite のファイル（既定 local-pipeline.db）
+    SQLITE_SCHEMA_PATH: 適用するスキーマ（既定 back-end/Table/Tables.sql）
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+BACKENDS = ["sqlserver", "sqlite"]
+DEFAULT_BACKEND = "sqlserver"
+DEFAULT_SQLITE_DB_PATH = "local-pipeline.db"
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parents[1] / "back-end" / "Table" / "Tables.sql"
+
+_NOW_PATTERN = re.compile(r"\b(?:GETDATE|GETUTCDATE|SYSUTCDATETIME)\s*\(\s*\)", re.IGNORECASE)
+_SCHEMA_PREFIX_PATTERN = re.compile(r"(?:\[dbo\]|\bdbo)\.", re.IGNORECASE)
+_TOP_PATTERN = re.compile(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)TOP\s*\(?\s*(\d+|\?)\s*\)?\s+", re.IGNORECASE)
+_ISNULL_PATTERN = re.compile(r"\bISNULL\s*\(", re.IGNORECASE)
+_TABLE_HINT_PATTERN = re.compile(
+    r"\bWITH\s*\(\s*(?:UPDLOCK|HOLDLOCK|NOLOCK|ROWLOCK|READPAST|XLOCK|TABLOCKX?|PAGLOCK|SERIALIZABLE)"
+    r"(?:\s*,\s*(?:UPDLOCK|HOLDLOCK|NOLOCK|ROWLOCK|READPAST|XLOCK|TABLOCKX?|PAGLOCK|SERIALIZABLE))*\s*\)",
+    re.IGNORECASE,
+)
+_OUTPUT_PATTERN = re.compile(r"\bOUTPUT\s+((?:INSERTED\.\w+\s*,?\s*)+)", re.IGNORECASE)
+_CAST_TEXT_PATTERN = re.compile(r"\bAS\s+N?(?:VAR)?CHAR\s*\(\s*(?:\d+|MAX)\s*\)", re.IGNORECASE)
+
+
+def get_backend_name() -> str:
+    """DB_BACKEND の値（不明な値は ValueError）"""
+    backend = os.environ.get("DB_BACKEND", DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"不明な DB_BACKEND です: {backend}（{' / '.join(BACKENDS)}）")
+    return backend
+
+
+def translate_sql(sql: str) -> str:
+    """T-SQL の1文を SQLite で実行できる形に書き換える"""
+    sql = _NOW_PATTERN.sub("CURRENT_TIMESTAMP", sql)
+    sql = _SCHEMA_PREFIX_PATTERN.sub("", sql)
+    sql = _ISNULL_PATTERN.sub("IFNULL(", sql)
+    sql = _TABLE_HINT_PATTERN.sub("", sql)
+    sql = _CAST_TEXT_PATTERN.sub("AS TEXT", sql)
+
+    top = _TOP_PATTERN.match(sql)
+    if top:
+        sql = f"{top.group(1)}{sql[top.end():].rstrip().rstrip(';')} LIMIT {top.group(2)}"
+
+    output = _OUTPUT_PATTERN.search(sql)
+    if output:
+        columns = [c.strip().split(".", 1)[1] for c in output.group(1).split(",") if c.strip()]
+        sql = f"{sql[:output.start()]}{sql[output.end():].rstrip().rstrip(';')} RETURNING {', '.join(columns)}"
+
+    return sql
+
+
+def translate_schema(script: str) -> List[str]:
+    """
+    Tables.sql（T-SQL の DDL）を SQLite の CREATE 文のリストに変換する
+
+    外部キー制約は適用しない（SQLite は既定で外部キーを検査せず、スキーマ内の参照順にも依存しないため）。
+    """
+    script = script.replace("\r\n", "\n")
+    script = re.sub(r"--[^\n]*", "", script)
+    statements = re.split(r"\n\s*(?=CREATE\s)", "\n" + script, flags=re.IGNORECASE)
+
+    translated = []
+    for statement in statements:
+        statement = statement.strip().rstrip(";").strip()
+        if not statement:
+            continue
+        statement = _SCHEMA_PREFIX_PATTERN.sub("", statement)
+        statement = re.sub(r"\[(\w+)\]", r"\1", statement)
+        statement = re.sub(
+            r",?\s*CONSTRAINT\s+\w+\s+FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\)",
+            "", statement, flags=re.IGNORECASE,
+        )
+        statement = re.sub(
+            r"\b(?:BIG)?INT\s+(?:PRIMARY\s+KEY\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)|IDENTITY\s*\(\s*1\s*,\s*1\s*\)\s+PRIMARY\s+KEY)",
+            "INTEGER PRIMARY KEY AUTOINCREMENT", statement, flags=re.IGNORECASE,
+        )
+        statement = re.sub(r"\bIDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)", "", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\(\s*MAX\s*\)", "", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\b(?:NON)?CLUSTERED\b", "", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\s+INCLUDE\s*\([^)]*\)", "", statement, flags=re.IGNORECASE)
+        statement = _NOW_PATTERN.sub("CURRENT_TIMESTAMP", statement)
+        translated.append(statement)
+    return translated
+
+
+def _convert_datetime(value: bytes) -> Optional[datetime]:
+    text = value.decode("utf-8")
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+# DATETIME / DATETIME2 列は pyodbc と同じく datetime で返す
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("DATETIME2", _convert_datetime)
+
+
+class SQLiteCursor:
+    """pyodbc の cursor と同じ使い方ができる sqlite3 cursor のラッパー（SQL は translate_sql で書き換える）"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        # pyodbc 専用の設定（SQLite では無視する）
+        self.fast_executemany = False
+
+    @staticmethod
+    def _params(params: tuple):
+        # pyodbc は execute(sql, (a, b)) と execute(sql, a, b) の両方を受け付ける
+        if len(params) == 1 and isinstance(params[0], (tuple, list)):
+            return tuple(params[0])
+        return params
+
+    def execute(self, sql: str, *params):
+        self._cursor.execute(translate_sql(sql), self._params(params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        self._cursor.executemany(translate_sql(sql), [tuple(p) for p in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class SQLiteConnection:
+    """pyodbc の Connection と同じ使い方ができる sqlite3 接続のラッパー"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._conn.cursor())
+
+    def execute(self, sql: str, *params) -> SQLiteCursor:
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # pyodbc と同じく、例外がなければコミットする（接続は閉じない）
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+
+def apply_schema(conn: sqlite3.Connection, schema_path: Path):
+    """スキーマを適用する（作成済みのテーブル・インデックスは変更しない）"""
+    for statement in translate_schema(Path(schema_path).read_text(encoding="utf-8")):
+        statement = re.sub(r"^CREATE\s+(UNIQUE\s+)?(TABLE|INDEX)\s+", r"CREATE \1\2 IF NOT EXISTS ", statement,
+                           flags=re.IGNORECASE)
+        conn.execute(statement)
+    conn.commit()
+
+
+def connect_sqlite(db_path: Optional[str] = None, schema_path: Optional[str] = None) -> SQLiteConnection:
+    """
+    SQLite に接続する（初回はスキーマを適用する）
+
+    db_path=":memory:" の場合は接続ごとに別の DB になるため、1接続で完結する検証でのみ使う。
+    """
+    db_path = db_path or os.environ.get("SQLITE_DB_PATH", DEFAULT_SQLITE_DB_PATH)
+    schema_path = schema_path or os.environ.get("SQLITE_SCHEMA_PATH") or DEFAULT_SCHEMA_PATH
+    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+    apply_schema(conn, Path(schema_path))
+    return SQLiteConnection(conn)
@@ -8,13 +8,16 @@ import json
 from typing import Optional, Dict, List, Any
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
 import struct
+import threading
+import time
 from urllib.parse import urlparse, parse_qs
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import BlobClient, generate_blob_sas, BlobSasPermissions
 from datetime import datetime, timedelta
 import bcrypt
 import uuid
 import smtplib
 from email.mime.text import MIMEText 
+from db_backend import connect_sqlite, get_backend_name
 
 
 app = FunctionApp()
@@ -32,7 +35,12 @@ def get_db_connection():
     ローカル：ClientSecretCredential（pyodbc）
     本番環境：Microsoft Entra ID（Managed Identity）を使用して Azure SQL Database に接続する。
     ODBC Driver 17 for SQL Server + Authentication=ActiveDirectoryMsi を使用。
+    DB_BACKEND=sqlite の場合はローカルの SQLite に接続する（db_backend.py）。
     """
+    if get_backend_name() == "sqlite":
+        logging.info("[DB接続] SQLite（DB_BACKEND=sqlite）")
+        return connect_sqlite()
+
     try:
         logging.info("[DB接続] 開始")
 
@@ -817,6 +825,64 @@ def generate_sas_url(container_name: str, blob_name: str) -> str:
 
     return f"https://{account_name}.blob.core.windows.net/{actual_container}/{actual_blob_name}?{sas_token}"
 
+# 再生用の音声の有無（file_name → (blob パス, 有効期限)）。作成済みの音声は変わらないため期限なしで保持し、
+# 未作成の結果は後から作成される場合があるため PLAYBACK_MISS_TTL_SECONDS だけ保持する
+PLAYBACK_MISS_TTL_SECONDS = 300
+PLAYBACK_CACHE_MAX_ENTRIES = 10000
+_playback_paths = {}
+_playback_paths_lock = threading.Lock()
+
+def resolve_playback_blob_path(file_name: str) -> Optional[str]:
+    """
+    再生に使う音声の blob パス（"コンテナ/ファイル名"）
+
+    audio-converter-app2 が再生用の音声（CONVERT_PLAYBACK、rec.wav に対して rec.m4a）を作成していればそれを、
+    ない場合（作成前の会議・作成に失敗した場合）は文字起こし用の WAV を返す。
+    ただし無音を圧縮した WAV（rec.offsets.json がある）は offset と再生位置が合わないため返さず、None を返す。
+    コンテナは audio-converter-app2 と同じ CONVERT_PLAYBACK_CONTAINER を参照する。
+    存在確認の結果はプロセス内に保持し、セグメント取得のたびに Storage へ問い合わせない。
+    """
+    wav_path = f"meeting-audio/{file_name}"
+    account_name = os.getenv("ALT_STORAGE_ACCOUNT_NAME")
+    account_key = os.getenv("ALT_STORAGE_ACCOUNT_KEY")
+    if not account_name or not account_key:
+        return wav_path
+
+    now = time.monotonic()
+    with _playback_paths_lock:
+        cached = _playback_paths.get(file_name)
+    if cached and (cached[1] is None or cached[1] > now):
+        return cached[0]
+
+    def blob_exists(container_name: str, blob_name: str) -> bool:
+        return BlobClient(
+            account_url=f"https://{account_name}.blob.core.windows.net",
+            container_name=container_name,
+            blob_name=blob_name,
+            credential=account_key
+        ).exists()
+
+    playback_container = os.getenv("CONVERT_PLAYBACK_CONTAINER", "meeting-audio-playback")
+    base_name = file_name.rsplit(".", 1)[0]
+    try:
+        if blob_exists(playback_container, base_name + ".m4a"):
+            entry = (f"{playback_container}/{base_name}.m4a", None)
+        elif blob_exists("meeting-audio", base_name + ".offsets.json"):
+            print(f'playback rendition missing for trimmed wav: {file_name}')
+            entry = (None, now + PLAYBACK_MISS_TTL_SECONDS)
+        else:
+            entry = (wav_path, now + PLAYBACK_MISS_TTL_SECONDS)
+    except Exception as e:
+        # 確認できなかった場合は保持せず、次回のリクエストで再確認する
+        print(f'playback rendition check error: {e}')
+        return wav_path
+
+    with _playback_paths_lock:
+        if len(_playback_paths) >= PLAYBACK_CACHE_MAX_ENTRIES:
+            _playback_paths.clear()
+        _playback_paths[file_name] = entry
+    return entry[0]
+
 # 会話セグメント取得エンドポイント
 @app.function_name(name="GetConversationSegmentsByMeetingId")
 @app.route(route="conversation/segments/{meeting_id}", methods=["GET", "OPTIONS"], auth_level=func.AuthLevel.ANONYMOUS)
@@ -855,12 +921,15 @@ def get_conversation_segments_by_meeting_id(req: func.HttpRequest) -> func.HttpR
         segments = execute_query(query, (meeting_id,))
         print(f"Query result: {len(segments)} segments found")
 
-        # 各セグメントに対して SAS付きURLを生成して追加
+        # 各セグメントに対して SAS付きURLを生成して追加（再生用の音声があればそちらを返す）
+        # 同じ会議のセグメントは同じファイルを参照するため、存在確認はファイルごとに1回にする
+        blob_paths = {}
         for segment in segments:
             file_name = segment.get("file_name")
             if file_name:
-                blob_path = f"meeting-audio/{file_name}"
-                segment["audio_path"] = generate_sas_url("", blob_path)
+                if file_name not in blob_paths:
+                    blob_paths[file_name] = resolve_playback_blob_path(file_name)
+                segment["audio_path"] = generate_sas_url("", blob_paths[file_name]) if blob_paths[file_name] else ""
             else:
                 segment["audio_path"] = ""
 